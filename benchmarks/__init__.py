@@ -0,0 +1,10 @@
+"""
+Python init file
+
+Benchmarks for the AI Newspipe.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
@@ -0,0 +1,292 @@
+"""
+Synthetic feed server
+
+A local HTTP server for benchmarks: it serves generated RSS and Atom
+feeds of configurable count, size, latency and error rate, and a stub of
+the OpenAI chat completions endpoint with configurable latency, so the
+whole pipeline can run without network access or API costs.
+
+Feeds are generated from a seed and the current date, so every run of a
+benchmark sees the same documents. Entries are sorted newest first, the
+first half of them published today.
+
+Usage:
+    python -m benchmarks.feed_server --feeds 100 --entries 50 --latency 0.05 --error-rate 0.02
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# benchmarks/feed_server.py
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from xml.sax.saxutils import escape
+
+FEED_PATH = re.compile(r'/feeds/(\d+)\.xml')
+
+# Words of the generated text, the first ones keep entries relevant to the default filter
+AI_WORDS = ['llm', 'model', 'agents', 'inference', 'gpu', 'training', 'transformer', 'openai',
+            'embeddings', 'robotics', 'benchmark', 'diffusion', 'alignment', 'fine-tuning', 'dataset']
+WORDS = ['company', 'release', 'research', 'team', 'open', 'source', 'performance', 'latency', 'paper',
+         'startup', 'funding', 'cloud', 'chip', 'data', 'users', 'product', 'policy', 'market', 'code',
+         'update', 'platform', 'results', 'quality', 'memory', 'context', 'window', 'tokens', 'pricing',
+         'developers', 'hardware', 'safety', 'evaluation', 'speed', 'accuracy', 'scale', 'launch',
+         'partnership', 'lab', 'engineers', 'customers', 'tool', 'framework', 'library', 'version']
+
+# Text of every stub completion, streamed in pieces of a few characters
+SUMMARY = ("# AI News Summary\n\n"
+           "## Models\n\n- A synthetic model release with better benchmark results.\n\n"
+           "## Research\n\n- A synthetic paper on inference at scale.\n")
+
+class SyntheticFeeds:
+    """Generates the feed documents served by the benchmark server."""
+
+    def __init__(self, feeds: int, entries: int = 20, description_chars: int = 500, seed: int = 1):
+        """
+        Initialize SyntheticFeeds.
+
+        Args:
+            feeds (int): Number of feeds
+            entries (int): Entries per feed
+            description_chars (int): Approximate length of every description
+            seed (int): Seed of the generated text
+        """
+        self.feeds = feeds
+        self.entries = entries
+        self.description_chars = description_chars
+        self.seed = seed
+        self._now = datetime.now(timezone.utc).replace(microsecond=0)
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def _text(self, rng: random.Random, chars: int) -> str:
+        """Random words up to about the given length, mostly general ones with some AI terms."""
+        words = []
+        length = 0
+        while length < chars:
+            word = rng.choice(AI_WORDS) if rng.random() < 0.15 else rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return ' '.join(words)
+
+    def _items(self, index: int) -> List[dict]:
+        """Entries of a feed, newest first, the first half from today."""
+        rng = random.Random(self.seed * 1000003 + index)
+        today = self._now.replace(hour=0, minute=0, second=0)
+        fresh = max(1, self.entries // 2)
+        items = []
+        for number in range(self.entries):
+            if number < fresh:
+                published = self._now - (self._now - today) * (number + 1) / (fresh + 1)
+            else:
+                published = today - timedelta(hours=6 * (number - fresh + 1))
+            items.append({
+                'title': f"{rng.choice(AI_WORDS).capitalize()} {self._text(rng, 40)}",
+                'link': f"https://feed{index}.example.com/posts/{number}",
+                'description': self._text(rng, self.description_chars),
+                'published': published.replace(microsecond=0)
+            })
+        return items
+
+    def rss(self, index: int) -> bytes:
+        """An RSS 2.0 document."""
+        items = ''.join(
+            f"<item><title>{escape(item['title'])}</title><link>{item['link']}</link>"
+            f"<guid>{item['link']}</guid><pubDate>{format_datetime(item['published'])}</pubDate>"
+            f"<description>{escape(item['description'])}</description></item>\n"
+            for item in self._items(index)
+        )
+        return (f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+                f"<title>Synthetic feed {index}</title><link>https://feed{index}.example.com/</link>"
+                f"<description>Generated for benchmarks</description>\n{items}</channel></rss>\n").encode('utf-8')
+
+    def atom(self, index: int) -> bytes:
+        """An Atom 1.0 document."""
+        entries = ''.join(
+            f"<entry><title>{escape(item['title'])}</title><link href=\"{item['link']}\"/>"
+            f"<id>{item['link']}</id><updated>{item['published'].isoformat()}</updated>"
+            f"<published>{item['published'].isoformat()}</published>"
+            f"<summary>{escape(item['description'])}</summary></entry>\n"
+            for item in self._items(index)
+        )
+        return (f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+                f"<title>Synthetic feed {index}</title><id>https://feed{index}.example.com/</id>"
+                f"<updated>{self._now.isoformat()}</updated>\n{entries}</feed>\n").encode('utf-8')
+
+    def document(self, index: int) -> bytes:
+        """The document of a feed, RSS for even and Atom for odd numbers, generated once."""
+        with self._lock:
+            if index not in self._documents:
+                self._documents[index] = self.rss(index) if index % 2 == 0 else self.atom(index)
+            return self._documents[index]
+
+class FeedServer:
+    """Serves synthetic feeds and a stub OpenAI endpoint from background threads."""
+
+    def __init__(self, feeds: SyntheticFeeds, latency: float = 0.0, error_rate: float = 0.0,
+                 openai_latency: float = 0.5, hosts: int = 1, port: int = 0):
+        """
+        Initialize FeedServer.
+
+        Args:
+            feeds (SyntheticFeeds): Generated feed documents
+            latency (float): Seconds before every feed response
+            error_rate (float): Share of feeds answering with HTTP 500, always the same feeds
+            openai_latency (float): Seconds before the first token of a completion
+            hosts (int): Number of loopback addresses 127.0.0.1, 127.0.0.2, ... the feeds are
+                spread over, like feeds of different hosts. More than one needs Linux
+            port (int): Port of the server, 0 picks a free one
+        """
+        self.feeds = feeds
+        self.latency = latency
+        self.openai_latency = openai_latency
+        self.hosts = hosts
+        self.requests = 0
+        rng = random.Random(feeds.seed)
+        self.failing = {index for index in range(feeds.feeds) if rng.random() < error_rate}
+
+        handler = self._handler()
+        self._servers = [ThreadingHTTPServer(('127.0.0.1', port), handler)]
+        self.port = self._servers[0].server_address[1]
+        for host in range(2, hosts + 1):
+            self._servers.append(ThreadingHTTPServer((f'127.0.0.{host}', self.port), handler))
+        for server in self._servers:
+            server.daemon_threads = True
+        self._threads = []
+
+    def feed_urls(self) -> List[str]:
+        """URLs of all feeds, spread over the hosts."""
+        return [f"http://127.0.0.{index % self.hosts + 1}:{self.port}/feeds/{index}.xml"
+                for index in range(self.feeds.feeds)]
+
+    @property
+    def openai_url(self) -> str:
+        """Base URL of the stub OpenAI API, e.g. for OPENAI_BASE_URL."""
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _handler(self):
+        """Request handler class bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Streaming readers hang up once the remaining entries are older than today
+                    self.close_connection = True
+
+            def do_GET(self):
+                server.requests += 1
+                match = FEED_PATH.fullmatch(self.path)
+                if not match or int(match.group(1)) >= server.feeds.feeds:
+                    self._send(404, b'Not found', 'text/plain')
+                    return
+                time.sleep(server.latency)
+                index = int(match.group(1))
+                if index in server.failing:
+                    self._send(500, b'Synthetic error', 'text/plain')
+                    return
+                content_type = 'application/rss+xml' if index % 2 == 0 else 'application/atom+xml'
+                self._send(200, server.feeds.document(index), f'{content_type}; charset=utf-8')
+
+            def do_POST(self):
+                server.requests += 1
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path != '/v1/chat/completions':
+                    self._send(404, b'{"error": {"message": "Not found"}}', 'application/json')
+                    return
+                time.sleep(server.openai_latency)
+                prompt_tokens = sum(len(message.get('content', '')) for message in request.get('messages', [])) // 4
+                usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(SUMMARY) // 4,
+                         'total_tokens': prompt_tokens + len(SUMMARY) // 4}
+                base = {'id': 'chatcmpl-benchmark', 'created': int(time.time()),
+                        'model': request.get('model', 'gpt-4')}
+
+                if not request.get('stream'):
+                    body = dict(base, object='chat.completion', usage=usage, choices=[
+                        {'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': SUMMARY}}])
+                    self._send(200, json.dumps(body).encode('utf-8'), 'application/json')
+                    return
+
+                chunks = [dict(base, object='chat.completion.chunk', choices=[
+                    {'index': 0, 'finish_reason': None, 'delta': {'content': SUMMARY[start:start + 16]}}])
+                    for start in range(0, len(SUMMARY), 16)]
+                chunks.append(dict(base, object='chat.completion.chunk', choices=[], usage=usage))
+                events = [f"data: {json.dumps(chunk)}\n\n".encode('utf-8') for chunk in chunks]
+                events.append(b"data: [DONE]\n\n")
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Content-Length', str(sum(len(event) for event in events)))
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> 'FeedServer':
+        """Start serving in background threads."""
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop serving and close the sockets."""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self) -> 'FeedServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic feeds and a stub OpenAI API")
+    parser.add_argument('--feeds', type=int, default=100, help="Number of feeds")
+    parser.add_argument('--entries', type=int, default=20, help="Entries per feed")
+    parser.add_argument('--description-chars', type=int, default=500, help="Length of every description")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before every feed response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of feeds answering with HTTP 500")
+    parser.add_argument('--openai-latency', type=float, default=0.5, help="Seconds before a completion")
+    parser.add_argument('--hosts', type=int, default=1, help="Loopback addresses the feeds are spread over")
+    parser.add_argument('--port', type=int, default=8000, help="Port of the server")
+    args = parser.parse_args()
+
+    feeds = SyntheticFeeds(args.feeds, args.entries, args.description_chars)
+    server = FeedServer(feeds, args.latency, args.error_rate, args.openai_latency, args.hosts, args.port)
+    with server:
+        print(f"Serving {args.feeds} feeds, OPENAI_BASE_URL={server.openai_url}")
+        print('\n'.join(server.feed_urls()[:3] + ['...']))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Pipeline benchmark
+
+Runs the whole main.py pipeline against the synthetic feed server and
+the stub OpenAI endpoint of benchmarks/feed_server.py, at 10, 100 and
+1000 feeds by default. Every run is a fresh process with empty caches,
+measured for wall time, peak RSS and throughput; the stage timings and
+counters come from the run report main.py writes.
+
+The results can be saved as a baseline and later runs compared against
+it, failing when wall time or peak RSS grew by more than the tolerance.
+Baselines depend on the machine, so compare against one recorded on the
+same kind of machine.
+
+Usage:
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --feeds 10 100 --entries 50 --latency 0.05 --error-rate 0.02
+    python -m benchmarks.pipeline --save benchmarks/baselines/pipeline.json
+    python -m benchmarks.pipeline --compare benchmarks/baselines/pipeline.json --tolerance 0.25
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# benchmarks/pipeline.py
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.feed_server import FeedServer, SyntheticFeeds
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings of the synthetic feeds and the server, stored with the results
+CONFIG_KEYS = ['entries', 'description_chars', 'latency', 'error_rate', 'openai_latency', 'hosts']
+
+def run_pipeline(server: FeedServer, feeds: int, extra_args: List[str]) -> Dict:
+    """
+    Run main.py once against the first feeds of the server.
+
+    Args:
+        server (FeedServer): Running synthetic feed server
+        feeds (int): Number of feeds in the sources file
+        extra_args (List[str]): Additional options of main.py, e.g. ['--all-entries']
+
+    Returns:
+        Dict: Wall time, peak RSS, throughput, counters and stage times of the run
+
+    Raises:
+        RuntimeError: If main.py fails
+    """
+    with tempfile.TemporaryDirectory(prefix='newspipe-benchmark-') as directory:
+        sources_file = os.path.join(directory, 'sources.txt')
+        with open(sources_file, 'w') as f:
+            f.write('\n'.join(server.feed_urls()[:feeds]) + '\n')
+        state_dir = os.path.join(directory, 'state')
+
+        # Proxies would send the loopback requests elsewhere
+        env = {key: value for key, value in os.environ.items() if 'proxy' not in key.lower()}
+        env.update(OPENAI_API_KEY='benchmark', OPENAI_BASE_URL=server.openai_url)
+
+        command = [sys.executable, os.path.join(ROOT_DIR, 'main.py'), '--sources', sources_file,
+                   '--output-dir', os.path.join(directory, 'summaries'), '--state-dir', state_dir] + extra_args
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=directory, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        # wait4() reports the resources of this child alone
+        stderr = process.stderr.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_seconds = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        process.stderr.close()
+        if process.returncode != 0:
+            raise RuntimeError(f"main.py failed with {feeds} feeds:\n{stderr.decode('utf-8', 'replace')[-2000:]}")
+
+        reports = glob.glob(os.path.join(state_dir, 'reports', 'run_*.json'))
+        report = {}
+        if reports:
+            with open(reports[0], 'r', encoding='utf-8') as f:
+                report = json.load(f)
+
+    # Linux reports kilobytes, macOS bytes
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    counters = report.get('counters', {})
+    return {
+        'feeds': feeds,
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_rss_mb': round(peak_rss, 1),
+        'feeds_per_second': round(feeds / wall_seconds, 1),
+        'entries_per_second': round(counters.get('entries_parsed', 0) / wall_seconds, 1),
+        'counters': counters,
+        'stages': {name: stage['seconds'] for name, stage in report.get('stages', {}).items()}
+    }
+
+def measure(server: FeedServer, feeds: int, repeat: int, extra_args: List[str]) -> Dict:
+    """Run a scenario several times and keep the run with the median wall time."""
+    runs = sorted((run_pipeline(server, feeds, extra_args) for _ in range(repeat)),
+                  key=lambda result: result['wall_seconds'])
+    result = runs[len(runs) // 2]
+    result['min_wall_seconds'] = runs[0]['wall_seconds']
+    return result
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Find regressions against a baseline.
+
+    Args:
+        results (List[Dict]): Results of this run
+        baseline (Dict): Saved benchmark file with config and results
+        tolerance (float): Allowed relative growth, e.g. 0.25 for 25%
+
+    Returns:
+        List[str]: One message per regression, empty if there is none
+    """
+    previous = {result['feeds']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(result['feeds'])
+        if before is None:
+            continue
+        for key in ('wall_seconds', 'peak_rss_mb'):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['feeds']} feeds: {key} {result[key]} > {before[key]} "
+                                   f"(+{result[key] / before[key] - 1:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the whole pipeline against synthetic feeds")
+    parser.add_argument('--feeds', type=int, nargs='+', default=[10, 100, 1000], help="Feed counts to run")
+    parser.add_argument('--entries', type=int, default=20, help="Entries per feed, half of them from today")
+    parser.add_argument('--description-chars', type=int, default=500, help="Length of every description")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds before every feed response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of feeds answering with HTTP 500")
+    parser.add_argument('--openai-latency', type=float, default=0.2, help="Seconds before a completion")
+    parser.add_argument('--hosts', type=int, default=8 if sys.platform.startswith('linux') else 1,
+                        help="Loopback addresses the feeds are spread over (default: 8 on Linux)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per feed count, the median is kept")
+    parser.add_argument('--save', metavar='FILE', help="Write the results as a baseline to this file")
+    parser.add_argument('--compare', metavar='FILE', help="Exit with 1 if a result regressed against this baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed growth of wall time and peak RSS over the baseline (default: 0.25)")
+    parser.add_argument('pipeline_args', nargs=argparse.REMAINDER,
+                        help="Options passed on to main.py after --, e.g. -- --all-entries")
+    args = parser.parse_args()
+    extra_args = [arg for arg in args.pipeline_args if arg != '--']
+    config = {key: getattr(args, key) for key in CONFIG_KEYS}
+
+    feeds = SyntheticFeeds(max(args.feeds), args.entries, args.description_chars)
+    with FeedServer(feeds, args.latency, args.error_rate, args.openai_latency, args.hosts) as server:
+        results = []
+        for count in args.feeds:
+            result = measure(server, count, args.repeat, extra_args)
+            results.append(result)
+            slowest = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in list(result['stages'].items())[:3])
+            print(f"{count:>6} feeds {result['wall_seconds']:>8.2f}s {result['peak_rss_mb']:>7.1f}MB "
+                  f"{result['feeds_per_second']:>7.1f} feeds/s {result['entries_per_second']:>8.1f} entries/s  {slowest}")
+
+    output = {'python': sys.version.split()[0], 'platform': platform.platform(), 'cpus': os.cpu_count(),
+              'config': config, 'pipeline_args': extra_args, 'results': results}
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config or baseline.get('pipeline_args', []) != extra_args:
+            print(f"Warning: {args.compare} was recorded with other settings: {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Serialization benchmark
+
+Counts the prompt tokens every entry format needs for the same entries,
+using feed snapshots stored in benchmarks/snapshots.
+
+Usage:
+    python -m benchmarks.serialization_tokens
+    python -m benchmarks.serialization_tokens --record   # record news_sources.txt first
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# benchmarks/serialization_tokens.py
+import argparse
+import json
+import os
+from typing import Dict, List
+from urllib.parse import urlparse
+import feedparser
+from src.feed_reader import FeedReader, structure_entry
+from src.serializers import SERIALIZERS, replace_links
+from src.token_counter import TokenCounter
+from src.url_parser import URLFileParser
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.path.join(BENCHMARK_DIR, 'snapshots')
+SOURCES_FILE = os.path.join(os.path.dirname(BENCHMARK_DIR), 'news_sources.txt')
+
+def record_snapshots(sources_file: str, directory: str) -> int:
+    """
+    Download the feeds of a sources file into snapshot files.
+
+    Args:
+        sources_file (str): File with one feed URL per line
+        directory (str): Directory the snapshots are written to
+
+    Returns:
+        int: Number of recorded feeds
+    """
+    os.makedirs(directory, exist_ok=True)
+    urls = URLFileParser(sources_file).parse()
+    reader = FeedReader(urls)
+    recorded = 0
+
+    for index, url in enumerate(urls):
+        try:
+            response = reader.client.get(url)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Skipping {url}: {str(e)}")
+            continue
+
+        file_name = f"{index:02d}_{urlparse(url).netloc}.xml"
+        with open(os.path.join(directory, file_name), 'wb') as f:
+            f.write(response.content)
+        recorded += 1
+
+    reader.close()
+    return recorded
+
+def load_snapshots(directory: str) -> List[Dict]:
+    """Parse all snapshot files into entries structured like FeedReader returns them."""
+    entries = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith('.xml'):
+            continue
+        feed = feedparser.parse(os.path.join(directory, file_name))
+        feed_title = feed.feed.get('title', 'Unknown Feed')
+        entries.extend(structure_entry(entry, feed_title) for entry in feed.entries)
+    return entries
+
+def measure(entries: List[Dict], counter: TokenCounter) -> List[Dict]:
+    """
+    Count the tokens of every format, with links and with short link ids.
+
+    Args:
+        entries (List[Dict]): Feed entries
+        counter (TokenCounter): Token counter of the model
+
+    Returns:
+        List[Dict]: Format, characters and tokens per variant
+    """
+    compact_entries, _ = replace_links(entries)
+    results = []
+    for name, (serialize, _) in SERIALIZERS.items():
+        for variant, payload in ((name, entries), (f"{name}+ids", compact_entries)):
+            text = serialize(payload)
+            results.append({'format': variant, 'chars': len(text), 'tokens': counter.count(text)})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Count prompt tokens per entry format")
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR, help="Directory with feed snapshots")
+    parser.add_argument('--record', action='store_true', help="Record the feeds of news_sources.txt first")
+    parser.add_argument('--model', default='gpt-4', help="Model whose tokenizer is used")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"Recorded {record_snapshots(SOURCES_FILE, args.snapshots)} feeds")
+
+    entries = load_snapshots(args.snapshots)
+    results = measure(entries, TokenCounter(args.model))
+    baseline = results[0]['tokens']
+
+    print(f"{len(entries)} entries from {args.snapshots}")
+    print(f"{'format':<14}{'chars':>10}{'tokens':>10}{'saving':>10}")
+    for result in results:
+        saving = 1 - result['tokens'] / baseline if baseline else 0
+        print(f"{result['format']:<14}{result['chars']:>10}{result['tokens']:>10}{saving:>10.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'model': args.model, 'entries': len(entries), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup benchmark
+
+Measures how long a fresh interpreter needs to import main.py, and to
+get from there to the first feed fetch, which loads httpx and
+feedparser. Every sample runs in a new process with -X importtime, so
+the slowest modules can be listed as well.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --max-ms 300   # exit with 1 if startup got slower
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# benchmarks/startup.py
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run by every sample, from a cold interpreter
+SCENARIOS = {
+    'import': "import main",
+    'first-fetch': "import main\n"
+                   "from src.feed_reader import FeedReader\n"
+                   "FeedReader([]).close()"
+}
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Read the cumulative import time per top-level module from -X importtime output.
+
+    Args:
+        stderr (str): Standard error of the interpreter
+
+    Returns:
+        Dict[str, int]: Microseconds per module imported at the top level after interpreter startup
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the module importing them
+        if name.startswith('  ', 1):
+            continue
+        if name.strip() == 'site':
+            # Everything up to site is loaded by the interpreter itself
+            modules = {}
+        else:
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+def sample(code: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Run code in a fresh interpreter.
+
+    Args:
+        code (str): Python code to run
+
+    Returns:
+        Tuple[float, Dict[str, int]]: Total import time in milliseconds and import time per module
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    modules = parse_importtime(process.stderr)
+    return sum(modules.values()) / 1000, modules
+
+def measure(code: str, repeat: int) -> Dict:
+    """
+    Take several samples of a scenario.
+
+    Args:
+        code (str): Python code of the scenario
+        repeat (int): Number of samples
+
+    Returns:
+        Dict: Median and minimum in milliseconds and the slowest modules of the median sample
+    """
+    samples = sorted((sample(code) for _ in range(repeat)), key=lambda result: result[0])
+    median_ms, modules = samples[len(samples) // 2]
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(samples[0][0], 1),
+        'slowest': [{'module': name, 'ms': round(time / 1000, 1)} for name, time in slowest]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of a cold start")
+    parser.add_argument('--repeat', type=int, default=7, help="Samples per scenario")
+    parser.add_argument('--max-ms', type=float, help="Fail if importing main.py takes longer (median)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {name: measure(code, args.repeat) for name, code in SCENARIOS.items()}
+
+    print(f"{'scenario':<14}{'median':>10}{'min':>10}  slowest imports")
+    for name, result in results.items():
+        slowest = ', '.join(f"{module['module']} {module['ms']:.0f}ms" for module in result['slowest'][:3])
+        print(f"{name:<14}{result['median_ms']:>8.0f}ms{result['min_ms']:>8.0f}ms  {slowest}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+    if args.max_ms is not None and results['import']['median_ms'] > args.max_ms:
+        print(f"Importing main.py took {results['import']['median_ms']:.0f}ms, more than {args.max_ms:.0f}ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
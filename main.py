@@ -8,14 +8,34 @@ Contributor: claude.ai
 License: MIT
 """
 # main.py
+import argparse
+import functools
+import itertools
 import os
-import json
 import logging
+import re
+import sys
 from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from src.url_parser import URLFileParser
 from src.feed_reader import FeedReader
+from src.feed_cache import FeedCache
+from src.seen_index import SeenIndex
 from src.ai_analyzer import AIAnalyzer
+from src.response_cache import ResponseCache
+from src.summary_writer import SummaryWriter
+from src.poll_scheduler import PollScheduler
+from src.daemon import NewsDaemon
+from src.entry_archive import EntryArchive
+from src.digest_config import load_digests
+from src.metrics import DISABLED, RunMetrics
+from src.profiler import PROFILE_MODES, StageProfiler
+from src.run_checkpoint import RunCheckpoint
+from src.sharding import commit_shards, find_shards, read_shards, run_shard
+
+if TYPE_CHECKING:
+    from src.relevance_filter import RelevanceFilter
 
 def setup_logging():
     """Setup logging configuration"""
@@ -33,30 +53,383 @@ def setup_logging():
     
     return logger
 
-def save_to_markdown(content: str, output_dir: str) -> str:
+def save_to_markdown(content: str, output_dir: str, writer: SummaryWriter = None) -> str:
     """Save content to a markdown file with timestamp"""
-    # Create timestamp for filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = os.path.join(output_dir, f'ai_news_summary_{timestamp}.md')
+    # The writer creates the output directory and a timestamped file name
+    writer = writer or SummaryWriter(output_dir)
+    return writer.commit(content)
+
+def prepare_entries(entries: Iterable[Dict], archive: EntryArchive = None,
+                    metrics: RunMetrics = DISABLED, checkpoint: RunCheckpoint = None) -> Iterator[Dict]:
+    """
+    Archive entries and merge the same story published by several feeds.
+    
+    Args:
+        entries (Iterable[Dict]): Feed entries, e.g. a generator still fetching feeds
+        archive (EntryArchive): Archive storing every entry
+        metrics (RunMetrics): Metrics of the run
+        checkpoint (RunCheckpoint): Checkpoint storing the unique entries, or holding them
+            already when a run is resumed
+        
+    Returns:
+        Iterator[Dict]: Unique entries
+    """
+    if checkpoint is not None and checkpoint.done('unique'):
+        return checkpoint.load('unique')
+    
+    # NumPy is only loaded once there are entries to process
+    from src.deduplicator import Deduplicator
+    
+    if archive is not None:
+        entries = metrics.iter_stage(archive.iter_add(entries), 'archive')
+    entries = metrics.iter_stage(Deduplicator(verbose=True).iter_unique(entries), 'deduplicate')
+    if checkpoint is not None:
+        # Sources of later copies are merged into entries already passed on
+        entries = checkpoint.iter_save_at_end('unique', entries)
+    return entries
+
+def summarize(entries: Iterable[Dict], analyzer: AIAnalyzer, output_dir: str, logger: logging.Logger,
+              select_entries: bool = True, archive: EntryArchive = None,
+              relevance_filter: 'RelevanceFilter' = None, prefix: str = 'ai_news_summary') -> Optional[str]:
+    """
+    Filter and analyze unique entries and save the summary.
+    
+    Args:
+        entries (Iterable[Dict]): Unique feed entries from prepare_entries()
+        analyzer (AIAnalyzer): Analyzer writing the summary
+        output_dir (str): Directory of the summaries
+        logger (logging.Logger): Logger of the run
+        select_entries (bool): Keep the most valuable entries that fit into a single request.
+            If False, all relevant entries are analyzed in chunks, the first starting
+            as soon as it is full
+        archive (EntryArchive): Archive storing the summary with the entries it was written from
+        relevance_filter (RelevanceFilter): Filter deciding which entries belong to the summary.
+            If None, entries about AI in general are kept. With top_k, all entries are
+            scored before the best are analyzed
+        prefix (str): Start of the summary file name, e.g. the name of a digest
+        
+    Returns:
+        Optional[str]: Path of the summary, None if no relevant entry was found
+    """
+    from src.relevance_filter import RelevanceFilter
+    from src.entry_selector import EntrySelector
     
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    metrics = analyzer.metrics
     
-    with open(output_file, 'w') as f:
-        f.write(content)
+    # Drop stories unrelated to AI before they cost tokens
+    if relevance_filter is None:
+        relevance_filter = RelevanceFilter(token_counter=analyzer.token_counter, verbose=True)
+    if relevance_filter.top_k is not None:
+        # Keeping the best top_k entries needs the scores of all of them
+        with metrics.stage('filter'):
+            entries = iter(relevance_filter.filter(list(entries)))
+    else:
+        entries = metrics.iter_stage(relevance_filter.iter_filter(entries), 'filter')
     
+    first_entry = next(entries, None)
+    if first_entry is None:
+        logger.warning("No new relevant entries from today found!")
+        return None
+    entries = itertools.chain([first_entry], entries)
+    
+    if select_entries:
+        # The selection needs all candidates, which are small after normalization
+        entries = list(entries)
+        with metrics.stage('select'):
+            selector = EntrySelector(analyzer.entry_budget(), analyzer.entry_cost, analyzer.shrink_entry,
+                                     verbose=True)
+            entries = selector.select(entries, relevance_filter.scores)
+        
+        # Show entry count and size estimate
+        payload_kb = len(analyzer.serialize(entries).encode('utf-8'))/1024
+        prompt_tokens = analyzer.estimate_tokens(entries)
+        
+        logger.info(f"Prepared payload summary:")
+        logger.info(f"Number of entries: {len(entries)}")
+        logger.info(f"Payload size: {payload_kb:.1f}KB")
+        logger.info(f"Prompt tokens: {prompt_tokens}")
+    
+    # Remember what was analyzed for the archive, the chunked analysis consumes a stream
+    if select_entries:
+        analyzed = entries
+    else:
+        analyzed = []
+        entries = (analyzed.append(entry) or entry for entry in entries)
+    
+    # Analyze and process feeds, streaming the summary into a partial file
+    logger.info("Analyzing feeds with AI...")
+    with SummaryWriter(output_dir, prefix, verbose=True) as writer:
+        logger.info(f"Writing summary to: {writer.partial_file}")
+        with metrics.stage('analyze'):
+            if select_entries:
+                markdown_content = analyzer.process_feeds(entries, output=writer)
+            else:
+                markdown_content = analyzer.analyze_stream(entries, output=writer)
+        
+        # Save to markdown
+        logger.info("Saving processed content...")
+        with metrics.stage('save'):
+            output_file = save_to_markdown(markdown_content, output_dir, writer)
+    logger.info(f"Saved to: {output_file}")
+    
+    if archive is not None:
+        with metrics.stage('save'):
+            archive.record_run(analyzed, markdown_content, analyzer.model, output_file)
     return output_file
 
-def main():
+def summarize_once(checkpoint: Optional[RunCheckpoint], stage: str,
+                   write: Callable[[], Optional[str]]) -> Optional[str]:
+    """
+    Write a summary unless the run being resumed already saved it.
+    
+    Args:
+        checkpoint (RunCheckpoint): Checkpoint of the run, None to always write
+        stage (str): Checkpoint stage of the summary, e.g. 'summary' or 'summary-<digest>'
+        write (Callable[[], Optional[str]]): Writes the summary and returns its path
+        
+    Returns:
+        Optional[str]: Path of the summary, None if no relevant entry was found
+    """
+    if checkpoint is not None and checkpoint.done(stage):
+        return next(checkpoint.load(stage))['output_file']
+    output_file = write()
+    if checkpoint is not None:
+        checkpoint.save(stage, [{'output_file': output_file}])
+    return output_file
+
+def summarize_digests(entries: Iterable[Dict], digests: List[Dict], logger: logging.Logger,
+                      select_entries: bool = True, archive: EntryArchive = None,
+                      metrics: RunMetrics = DISABLED, checkpoint: RunCheckpoint = None) -> List[str]:
+    """
+    Write several digests from one fetch, their OpenAI requests running concurrently.
+    
+    Args:
+        entries (Iterable[Dict]): Feed entries, fetched and normalized once for all digests
+        digests (List[Dict]): Digest definitions from load_digests() with an 'analyzer' each
+        logger (logging.Logger): Logger of the run
+        select_entries (bool): Keep the most valuable entries of each digest that fit into a single request
+        archive (EntryArchive): Archive storing every entry and summary
+        metrics (RunMetrics): Metrics of the run, shared by the analyzers of all digests
+        checkpoint (RunCheckpoint): Checkpoint of the run, digests saved before are not written again
+        
+    Returns:
+        List[str]: Paths of the summaries written
+        
+    Raises:
+        Exception: The first error of a failed digest, after all other digests were written
+    """
+    from src.relevance_filter import RelevanceFilter
+    
+    entries = list(prepare_entries(entries, archive, metrics, checkpoint))
+    
+    with ThreadPoolExecutor(max_workers=len(digests)) as executor:
+        futures = []
+        for digest in digests:
+            analyzer = digest['analyzer']
+            relevance_filter = RelevanceFilter(digest['vocabulary'], digest['threshold'], digest['top_k'],
+                                               token_counter=analyzer.token_counter, verbose=True)
+            # Digests run at the same time and may share an output directory
+            write = functools.partial(summarize, entries, analyzer, digest['output_dir'], logger,
+                                      select_entries, archive, relevance_filter, digest['name'])
+            futures.append(executor.submit(summarize_once, checkpoint, f"summary-{digest['name']}", write))
+    
+    output_files = []
+    errors = []
+    for digest, future in zip(digests, futures):
+        try:
+            output_file = future.result()
+        except Exception as e:
+            logger.error(f"Digest '{digest['name']}' failed: {str(e)}")
+            errors.append(e)
+            continue
+        if output_file:
+            output_files.append(output_file)
+    
+    if errors:
+        raise errors[0]
+    return output_files
+
+def digest_writer(args: argparse.Namespace, analyzer: AIAnalyzer, response_cache: ResponseCache,
+                  output_dir: str, logger: logging.Logger, archive: EntryArchive,
+                  checkpoint: RunCheckpoint = None) -> Callable[[Iterable[Dict]], object]:
+    """
+    Create the function turning fetched entries into the summary, or into several digests.
+    
+    Args:
+        args (argparse.Namespace): Command line options
+        analyzer (AIAnalyzer): Analyzer of the single summary, its scheduler is shared by all digests
+        response_cache (ResponseCache): Cache shared by all analyzers
+        output_dir (str): Directory of the summaries
+        logger (logging.Logger): Logger of the run
+        archive (EntryArchive): Archive storing every entry and summary
+        checkpoint (RunCheckpoint): Checkpoint of the unique entries and the saved summaries
+        
+    Returns:
+        Callable[[Iterable[Dict]], object]: Function taking the entries and returning the saved path(s)
+    """
+    if not args.digests:
+        return lambda entries: summarize_once(checkpoint, 'summary', lambda: summarize(
+            prepare_entries(entries, archive, analyzer.metrics, checkpoint), analyzer, output_dir, logger,
+            not args.all_entries, archive))
+    
+    # One analyzer per digest, all sharing the cache and the rate limits of the account
+    digests = load_digests(args.digests, output_dir)
+    for digest in digests:
+        digest['analyzer'] = AIAnalyzer(verbose=True, cache=response_cache, focus=digest['focus'],
+                                        scheduler=analyzer.scheduler, metrics=analyzer.metrics)
+    return lambda entries: summarize_digests(entries, digests, logger, not args.all_entries, archive,
+                                             analyzer.metrics, checkpoint)
+
+def merge_shards(shard_dir: str, write_digest: Callable[[Iterable[Dict]], object], seen_index: SeenIndex,
+                 logger: logging.Logger):
+    """
+    Analyze the entries of all shard files once and finish the sharded run.
+    
+    Args:
+        shard_dir (str): Directory of the shard files
+        write_digest (Callable[[Iterable[Dict]], object]): Deduplicates, analyzes and saves the entries
+        seen_index (SeenIndex): Index of entries processed by earlier runs
+        logger (logging.Logger): Logger of the run
+    """
+    shards, paths = find_shards(shard_dir)
+    keyed_entries = list(read_shards(paths))
+    
+    # Shard workers may run on nodes without the seen index, so it is applied here
+    already_seen = seen_index.seen_keys(key for key, _ in keyed_entries)
+    keys = set()
+    entries = []
+    for key, entry in keyed_entries:
+        if key and (key in already_seen or key in keys):
+            continue
+        keys.add(key)
+        entries.append(entry)
+    logger.info(f"Merging {len(entries)} new of {len(keyed_entries)} entries from {shards} shards")
+    
+    write_digest(entries)
+    
+    # Only remember the entries once their summary is safely on disk
+    seen_index.mark_seen(keys)
+    commit_shards(shard_dir, shards)
+
+def write_run_report(metrics: RunMetrics, report_dir: str, prometheus_file: Optional[str],
+                     logger: logging.Logger):
+    """Save the metrics of a run as JSON report and, if requested, as Prometheus textfile"""
+    report_file = os.path.join(report_dir, f"run_{metrics.run_id}.json")
+    metrics.write_json(report_file)
+    if prometheus_file:
+        metrics.write_prometheus(prometheus_file)
+    logger.info(f"Slowest stages: {metrics.summary()}")
+    logger.info(f"Run report: {report_file}")
+
+def search_archive(archive: EntryArchive, args: argparse.Namespace):
+    """Print the archived entries matching the search options"""
+    try:
+        results = archive.search(args.search, feed=args.feed, since=args.since, until=args.until, limit=args.limit)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return
+    for entry in results:
+        published = datetime.fromtimestamp(entry['published_at']).strftime('%Y-%m-%d') if entry['published_at'] else '?'
+        print(f"{published}  {entry['feed_title']}: {entry['title']}")
+        print(f"            {entry['link']}")
+    print(f"{len(results)} entries found")
+
+def shard_spec(value: str) -> Tuple[int, int]:
+    """Parse a shard given as I/N"""
+    match = re.fullmatch(r'(\d+)/(\d+)', value)
+    if not match or not int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a shard I/N with 0 <= I < N")
+    return int(match.group(1)), int(match.group(2))
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description="Summarize today's AI news from RSS feeds")
+    parser.add_argument('--all-entries', action='store_true',
+                        help="Analyze all relevant entries in chunks instead of selecting what fits one request")
+    parser.add_argument('--serve', action='store_true',
+                        help="Keep running, poll feeds adaptively and write digests on a schedule")
+    parser.add_argument('--digest-at', action='append', metavar='HH:MM',
+                        help="Local time of a daily digest in serve mode, can be repeated (default: 07:00)")
+    parser.add_argument('--digests', metavar='FILE',
+                        help="JSON file defining several digests written from the same fetch")
+    parser.add_argument('--min-poll', type=float, default=5,
+                        help="Shortest polling interval of a feed in minutes (default: 5)")
+    parser.add_argument('--max-poll', type=float, default=360,
+                        help="Longest polling interval of a feed in minutes (default: 360)")
+    parser.add_argument('--sources', metavar='FILE',
+                        help="File with one feed URL per line (default: news_sources.txt)")
+    parser.add_argument('--output-dir', metavar='DIR', help="Directory of the summaries (default: summaries)")
+    parser.add_argument('--state-dir', metavar='DIR',
+                        help="Directory of caches, indexes, the archive and run reports (default: .newspipe)")
+    parser.add_argument('--prometheus', metavar='FILE',
+                        help="Also write the metrics of the run to this Prometheus textfile")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=os.getenv('NEWSPIPE_PROFILE'),
+                        help="Profile every stage with cProfile (cpu), tracemalloc (memory) or both (all), "
+                             "writing the reports next to the summary (default: $NEWSPIPE_PROFILE)")
+    parser.add_argument('--max-feed-mb', type=float, metavar='MB',
+                        help="Read at most this many megabytes per feed, keeping the entries in them")
+    parser.add_argument('--stream-parse', action='store_true',
+                        help="Parse feeds while downloading them and stop at entries older than today, "
+                             "keeping memory flat for huge feeds")
+    
+    sharding = parser.add_argument_group('sharding', "Split large source lists across processes or nodes")
+    sharding.add_argument('--shards', type=int, metavar='N',
+                          help="Fetch the feeds in N local processes, then merge and analyze once")
+    sharding.add_argument('--shard', type=shard_spec, metavar='I/N',
+                          help="Only fetch shard I of N and write its entries to the shard directory")
+    sharding.add_argument('--merge', action='store_true',
+                          help="Analyze the entries of all shards in the shard directory")
+    sharding.add_argument('--shard-dir', metavar='DIR',
+                          help="Directory shared by shard workers and the merge (default: .newspipe/shards)")
+    
+    parser.add_argument('--resume', metavar='RUN_ID',
+                        help="Resume a failed run from its last completed stage, e.g. 20240601_071500")
+    
+    search = parser.add_argument_group('archive search', "Search past entries instead of fetching feeds")
+    search.add_argument('--search', metavar='QUERY', nargs='?', const='',
+                        help="Full-text query, e.g. 'llama AND open*'; without a query all entries match")
+    search.add_argument('--feed', help="Only entries of feeds whose title contains this text")
+    search.add_argument('--since', metavar='YYYY-MM-DD', help="Only entries published on or after this date")
+    search.add_argument('--until', metavar='YYYY-MM-DD', help="Only entries published before this date")
+    search.add_argument('--limit', type=int, default=20, help="Maximum number of results (default: 20)")
+    args = parser.parse_args(argv)
+    if args.resume and (args.serve or args.shards or args.shard or args.merge):
+        parser.error("--resume only works for single runs, not with --serve or sharding")
+    return args
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    
     # Load environment variables from .env file
+    from dotenv import load_dotenv
     load_dotenv()
     
     logger = setup_logging()
     
     # Configuration
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    sources_file = os.path.join(current_dir, 'news_sources.txt')
-    output_dir = os.path.join(current_dir, 'summaries')
+    sources_file = args.sources or os.path.join(current_dir, 'news_sources.txt')
+    output_dir = args.output_dir or os.path.join(current_dir, 'summaries')
+    state_dir = args.state_dir or os.path.join(current_dir, '.newspipe')
+    archive_file = os.path.join(state_dir, 'archive.db')
+    
+    shard_dir = args.shard_dir or os.path.join(state_dir, 'shards')
+    report_dir = os.path.join(state_dir, 'reports')
+    max_bytes = int(args.max_feed_mb * 1024 * 1024) if args.max_feed_mb else None
+    
+    if args.search is not None:
+        search_archive(EntryArchive(archive_file), args)
+        return
+    
+    if args.shard:
+        # A shard worker only fetches, the merge analyzes
+        run_shard(sources_file, args.shard[0], args.shard[1], shard_dir, verbose=True,
+                  max_bytes=max_bytes, stream_parse=args.stream_parse)
+        return
+    
+    # A daemon never finishes a run, so only single runs are measured
+    profiler = StageProfiler(args.profile, verbose=True) if args.profile and not args.serve else None
+    metrics = RunMetrics(enabled=not args.serve, profiler=profiler)
     
     try:
         logger.info("Starting AI Newspipe")
@@ -66,53 +439,129 @@ def main():
             logger.error("OpenAI API key not found in .env file")
             raise ValueError("Please add OPENAI_API_KEY to your .env file")
         
-        # Parse URLs
-        logger.info(f"Reading URLs from {sources_file}")
-        url_parser = URLFileParser(sources_file, verbose=True)
-        urls = url_parser.parse()
-        
-        if not urls:
-            logger.warning("No valid URLs found!")
+        if args.shards or args.merge:
+            response_cache = ResponseCache(os.path.join(state_dir, 'responses.db'), verbose=True)
+            analyzer = AIAnalyzer(verbose=True, cache=response_cache, metrics=metrics)
+            seen_index = SeenIndex(os.path.join(state_dir, 'seen.db'), verbose=True)
+            archive = EntryArchive(archive_file, verbose=True)
+            write_digest = digest_writer(args, analyzer, response_cache, output_dir, logger, archive)
+            
+            if args.shards:
+                # Parsing is CPU-bound, so every shard gets its own process and GIL
+                logger.info(f"Fetching feeds in {args.shards} shards...")
+                with ProcessPoolExecutor(max_workers=args.shards) as executor, metrics.stage('fetch'):
+                    fetch_shard = functools.partial(run_shard, max_bytes=max_bytes, stream_parse=args.stream_parse)
+                    list(executor.map(fetch_shard, itertools.repeat(sources_file), range(args.shards),
+                                      itertools.repeat(args.shards), itertools.repeat(shard_dir)))
+            merge_shards(shard_dir, write_digest, seen_index, logger)
+            logger.info("Process completed successfully!")
             return
         
-        # Fetch feeds
-        logger.info("Fetching feeds...")
-        feed_reader = FeedReader(urls, verbose=True)
-        entries = feed_reader.fetch_feeds()
+        checkpoint = None
+        if args.resume:
+            checkpoint = RunCheckpoint.resume(os.path.join(state_dir, 'runs'), args.resume, verbose=True)
+            logger.info(f"Resuming run {checkpoint.run_id}, completed stages: {', '.join(checkpoint.stages()) or 'none'}")
+        elif not args.serve:
+            checkpoint = RunCheckpoint(os.path.join(state_dir, 'runs'), metrics.run_id, verbose=True)
+        streams = []  # Stages to complete if a later one fails
+        fetched = checkpoint is not None and checkpoint.done('entries')
         
-        if not entries:
-            logger.warning("No entries from today found!")
-            return
+        # Parse URLs
+        urls = iter([])
+        if checkpoint is not None and checkpoint.done('urls'):
+            urls = (record['url'] for record in checkpoint.load('urls'))
+        elif not fetched:
+            logger.info(f"Reading URLs from {sources_file}")
+            urls = URLFileParser(sources_file, verbose=True, metrics=metrics).iter_urls()
+            if checkpoint is not None:
+                streams.append(checkpoint.iter_save('urls', ({'url': url} for url in urls)))
+                urls = (record['url'] for record in streams[-1])
+        first_url = next(urls, None)
         
-        # Show entry count and size estimate
-        entries_json = json.dumps(entries)
-        json_size_kb = len(entries_json)/1024
-        json_size_tokens = len(entries_json)/4  # Rough estimate of tokens (4 chars per token)
+        if first_url is None and not fetched:
+            logger.warning("No valid URLs found!")
+            if checkpoint is not None:
+                checkpoint.remove()
+            return
+        urls = itertools.chain([first_url], urls)
         
-        logger.info(f"Prepared payload summary:")
-        logger.info(f"Number of entries: {len(entries)}")
-        logger.info(f"Payload size: {json_size_kb:.1f}KB")
-        logger.info(f"Estimated tokens: {json_size_tokens:.0f}")
+        response_cache = ResponseCache(os.path.join(state_dir, 'responses.db'), verbose=True)
+        analyzer = AIAnalyzer(verbose=True, cache=response_cache, metrics=metrics)
+        feed_cache = FeedCache(os.path.join(state_dir, 'feed_cache.json'), verbose=True)
+        seen_index = SeenIndex(os.path.join(state_dir, 'seen.db'), verbose=True)
+        archive = EntryArchive(archive_file, verbose=True)
         
-        if json_size_tokens > 6000:  # Conservative limit for GPT-4
-            logger.warning("Payload might still be too large for API!")
-            logger.warning("Consider further reducing entry count or description length")
+        write_digest = digest_writer(args, analyzer, response_cache, output_dir, logger, archive, checkpoint)
         
-        # Analyze and process feeds
-        logger.info("Analyzing feeds with AI...")
-        analyzer = AIAnalyzer(verbose=True)
-        markdown_content = analyzer.process_feeds(entries)
+        if args.serve:
+            urls = list(urls)
+            feed_reader = FeedReader(urls, verbose=True, cache=feed_cache, seen_index=seen_index,
+                                     max_bytes=max_bytes, stream_parse=args.stream_parse)
+            poll_scheduler = PollScheduler(os.path.join(state_dir, 'poll_state.json'),
+                                           min_interval=args.min_poll * 60, max_interval=args.max_poll * 60,
+                                           verbose=True)
+            daemon = NewsDaemon(urls, feed_reader, poll_scheduler, write_digest, digest_times=args.digest_at,
+                                feed_cache=feed_cache, seen_index=seen_index, verbose=True)
+            try:
+                daemon.run()
+            except KeyboardInterrupt:
+                logger.info("Stopped serving")
+            finally:
+                feed_reader.close()
+            return
         
-        # Save to markdown
-        logger.info("Saving processed content...")
-        output_file = save_to_markdown(markdown_content, output_dir)
-        logger.info(f"Saved to: {output_file}")
+        if fetched:
+            logger.info(f"Using the entries fetched by run {checkpoint.run_id}")
+            write_digest(record['entry'] for record in checkpoint.load('entries'))
+            
+            # Only remember the entries once their summary is safely on disk
+            seen_index.mark_seen(record['key'] for record in checkpoint.load('entries'))
+            if os.path.exists(checkpoint.file('feed_cache.json')):
+                os.replace(checkpoint.file('feed_cache.json'), feed_cache.file_path)
+        else:
+            # Fetch feeds
+            logger.info("Fetching feeds...")
+            feed_reader = FeedReader(urls, verbose=True, cache=feed_cache, seen_index=seen_index, metrics=metrics,
+                                     max_bytes=max_bytes, stream_parse=args.stream_parse)
+            
+            def keyed_entries():
+                for entry in feed_reader.iter_entries():
+                    # new_keys grows in step with the yielded entries
+                    yield {'key': feed_reader.new_keys[-1], 'entry': entry}
+            
+            streams.insert(0, checkpoint.iter_save('entries', metrics.iter_stage(keyed_entries(), 'fetch')))
+            try:
+                write_digest(record['entry'] for record in streams[0])
+            except Exception:
+                # Finish the fetch, so that resuming the run only repeats what failed
+                try:
+                    if streams[0].finish():
+                        feed_cache.save(checkpoint.file('feed_cache.json'))
+                        logger.error(f"Fetched entries are kept, resume with: python main.py --resume {checkpoint.run_id}")
+                except Exception as e:
+                    logger.error(f"Could not finish fetching for a resume: {str(e)}")
+                raise
+            finally:
+                feed_reader.close()
+            
+            # Only remember the entries once their summary is safely on disk
+            feed_reader.mark_seen()
+            feed_reader.save_cache()
         
+        checkpoint.remove()
         logger.info("Process completed successfully!")
         
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         raise
+    
+    finally:
+        if metrics.enabled:
+            write_run_report(metrics, report_dir, args.prometheus, logger)
+        if profiler is not None:
+            profile_dir = os.path.join(output_dir, f"profile_{metrics.run_id}")
+            profiler.dump(profile_dir)
+            logger.info(f"Profiles: {profile_dir}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,29 +9,87 @@ Contributor: claude.ai
 License: MIT
 """
 # src/ai_analyzer.py
+import itertools
 import json
 import logging
-from typing import List, Dict
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, Dict, Callable, Iterable, Iterator
 import os
 from datetime import datetime
-from dotenv import load_dotenv
+from src.token_counter import TokenCounter, context_window
+from src.request_scheduler import RequestScheduler
+from src.response_cache import ResponseCache, request_key
+from src.markdown_renderer import render_markdown
+from src.metrics import RunMetrics, DISABLED
+from src.serializers import SERIALIZERS, LINK_REFERENCE, LinkRestorer, iter_replace_links, restore_links
+
+SYSTEM_PROMPT = "You are an AI news curator specializing in artificial intelligence and machine learning news analysis."
+
+# Tokens kept free in every request to absorb estimation errors
+SAFETY_MARGIN = 200
+
+# Completion tokens reserved per entry in structured mode
+RESULT_TOKENS_PER_ENTRY = 80
 
 class AIAnalyzer:
     """Component for analyzing news feeds using OpenAI API."""
     
-    def __init__(self, api_key: str = None, verbose: bool = False):
+    def __init__(self, api_key: str = None, verbose: bool = False, model: str = 'gpt-4',
+                 max_tokens: int = 4000, map_max_tokens: int = 1000, context_tokens: int = None,
+                 max_concurrency: int = 4, requests_per_minute: int = 500, tokens_per_minute: int = 10000,
+                 cache: ResponseCache = None, structured: bool = False, structured_max_tokens: int = 2000,
+                 serializer: str = 'json-min', link_ids: bool = False, focus: str = None,
+                 scheduler: RequestScheduler = None, metrics: RunMetrics = None):
         """
         Initialize AIAnalyzer.
         
         Args:
             api_key (str): OpenAI API key. If None, will look for OPENAI_API_KEY in .env file
             verbose (bool): Enable verbose logging
+            model (str): OpenAI model used for the analysis
+            max_tokens (int): Maximum completion tokens of the final summary
+            map_max_tokens (int): Maximum completion tokens of each partial digest
+            context_tokens (int): Context window of the model. If None, the known window of the model is used
+            max_concurrency (int): Maximum number of OpenAI requests in flight
+            requests_per_minute (int): Request rate limit of the OpenAI account
+            tokens_per_minute (int): Token rate limit of the OpenAI account
+            cache (ResponseCache): Optional cache answering repeated requests without calling OpenAI
+            structured (bool): Ask for compact JSON per entry and render the Markdown locally
+            structured_max_tokens (int): Maximum completion tokens of each structured request
+            serializer (str): Format of the entries in the prompt: 'json', 'json-min' or 'tsv'
+            link_ids (bool): Send short ids instead of links and restore the links in the response
+            focus (str): Topic the digest is limited to, e.g. 'AI policy and regulation'. If None,
+                all AI, ML and LLM news is covered
+            scheduler (RequestScheduler): Scheduler shared with other analyzers of the same account.
+                If None, a scheduler with the given limits is created
+            metrics (RunMetrics): Records prompt building and request times and the token usage
         """
         self.verbose = verbose
+        self.model = model
+        self.max_tokens = max_tokens
+        self.map_max_tokens = map_max_tokens
+        self.context_tokens = context_tokens or context_window(model)
+        self.token_counter = TokenCounter(model)
+        self.cache = cache
+        self.structured = structured
+        self.structured_max_tokens = structured_max_tokens
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer '{serializer}', use one of {', '.join(SERIALIZERS)}")
+        self.serialize, self.format_name = SERIALIZERS[serializer]
+        self.link_ids = link_ids
+        self.focus = focus
+        self.metrics = metrics or DISABLED
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max_concurrency,
+                                                       requests_per_minute=requests_per_minute,
+                                                       tokens_per_minute=tokens_per_minute,
+                                                       verbose=verbose)
         self.logger = logging.getLogger(__name__)
         
-        if verbose:
+        # Several analyzers share the module logger, which needs only one handler
+        if verbose and not self.logger.handlers:
             console_handler = logging.StreamHandler()
             formatter = logging.Formatter(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -42,6 +100,7 @@ class AIAnalyzer:
             self.logger.setLevel(logging.INFO)
         
         # Load .env file and setup OpenAI client
+        from dotenv import load_dotenv
         load_dotenv()  # This will load the .env file
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if not self.api_key:
@@ -50,13 +109,36 @@ class AIAnalyzer:
         if self.verbose:
             self.logger.info("Successfully loaded API key from .env file")
             
-        self.client = OpenAI(api_key=self.api_key)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """OpenAI client, created on the first request so that runs without entries never import openai."""
+        with self._client_lock:
+            if self._client is None:
+                from openai import OpenAI
+                # Retries are handled by the scheduler, which knows about the rate limits
+                self._client = OpenAI(api_key=self.api_key, max_retries=0)
+            return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def _link_requirement(self, number: int) -> str:
+        """Prompt requirement asking for entry:<id> links, empty if the real links are sent."""
+        if not self.link_ids:
+            return ''
+        reference = LINK_REFERENCE.format(id='<id>')
+        return f"\n{number}. Link articles as [title]({reference}) with the id of the entry, keep existing {reference} links unchanged"
 
     def _create_analysis_prompt(self, entries: List[Dict]) -> str:
-        """Create the prompt for OpenAI with the entries in JSON format."""
+        """Create the prompt for OpenAI with the entries in the configured format."""
         
-        # Convert entries to JSON string
-        entries_json = json.dumps(entries, indent=2)
+        # Convert entries to the prompt format
+        with self.metrics.stage('build_prompt'):
+            entries_json = self.serialize(entries)
         
         prompt = f"""You are an AI news curator specializing in artificial intelligence, machine learning, and LLM news.
         
@@ -70,7 +152,7 @@ Requirements:
    - Identify potential societal impacts
 3. Group related stories together
 4. Use clear markdown formatting
-5. Include a summary section at the top
+5. Include a summary section at the top{self._link_requirement(6)}
 
 Format the output as a proper markdown document with:
 - A main title with date
@@ -79,7 +161,7 @@ Format the output as a proper markdown document with:
 - Individual entries with titles, links, and your analysis
 - Clear separation between sections
 
-Here are the feed entries in JSON format:
+Here are the feed entries in {self.format_name} format:
 
 {entries_json}
 
@@ -87,12 +169,481 @@ Please analyze these entries and provide your response in complete markdown form
 
         return prompt
 
-    def analyze_feeds(self, entries: List[Dict]) -> str:
+    def _create_map_prompt(self, entries: List[Dict]) -> str:
+        """Create the prompt asking for a partial digest of one chunk of entries."""
+        
+        with self.metrics.stage('build_prompt'):
+            entries_json = self.serialize(entries)
+        
+        prompt = f"""You are an AI news curator specializing in artificial intelligence, machine learning, and LLM news.
+
+Task: These RSS feed entries are one part of today's news. Write a concise partial digest in markdown format that will later be merged with the digests of the other parts.
+
+Requirements:
+1. Focus on AI, ML, and LLM-related news only, skip everything else
+2. For each relevant article give its title, link, feed title and a short analysis of its technological, business and societal implications
+3. Group related stories under short category headings
+4. Do not write a document title or an executive summary{self._link_requirement(5)}
+
+Here are the feed entries in {self.format_name} format:
+
+{entries_json}"""
+
+        return prompt
+
+    def _create_reduce_prompt(self, digests: List[str]) -> str:
+        """Create the prompt merging partial digests into the final markdown document."""
+        
+        digests_text = "\n\n---\n\n".join(digests)
+        
+        prompt = f"""You are an AI news curator specializing in artificial intelligence, machine learning, and LLM news.
+
+Task: The following partial digests each cover a part of today's RSS feed entries. Merge them into one comprehensive summary in markdown format.
+
+Requirements:
+1. Keep every relevant article with its title, link and analysis
+2. Merge duplicate stories and group related stories together
+3. Use clear markdown formatting
+4. Include a summary section at the top{self._link_requirement(5)}
+
+Format the output as a proper markdown document with:
+- A main title with date
+- A brief executive summary
+- Grouped categories of news
+- Individual entries with titles, links, and your analysis
+- Clear separation between sections
+
+Here are the partial digests:
+
+{digests_text}
+
+Please provide your response in complete markdown format, ready for direct saving to a file."""
+
+        return prompt
+
+    def _create_merge_prompt(self, digests: List[str]) -> str:
+        """Create the prompt condensing several partial digests into one partial digest."""
+        
+        digests_text = "\n\n---\n\n".join(digests)
+        
+        prompt = f"""You are an AI news curator specializing in artificial intelligence, machine learning, and LLM news.
+
+Task: Merge the following partial digests of today's news into one concise partial digest in markdown format.
+
+Requirements:
+1. Keep every relevant article with its title, link and a short analysis
+2. Merge duplicate stories and group related stories under short category headings
+3. Do not write a document title or an executive summary{self._link_requirement(4)}
+
+Here are the partial digests:
+
+{digests_text}"""
+
+        return prompt
+
+    def _create_structured_prompt(self, entries: List[Dict]) -> str:
+        """Create the prompt asking for a compact JSON analysis per entry ID."""
+        
+        with self.metrics.stage('build_prompt'):
+            entries_json = self.serialize(entries)
+        
+        prompt = f"""You are an AI news curator specializing in artificial intelligence, machine learning, and LLM news.
+
+Task: Rate each of these RSS feed entries for its relevance to AI, ML, and LLM news and analyze the relevant ones.
+
+Respond with a JSON object only, without markdown, in this format:
+{{"summary": "<2-3 sentence executive summary of the relevant news>",
+ "entries": [{{"id": <id of the entry>, "relevance": <0-10>, "category": "<short category>", "analysis": "<1-2 sentences on technological, business and societal implications>", "cluster": "<short slug, identical for entries covering the same story>"}}]}}
+
+Requirements:
+1. Include every entry id exactly once
+2. Leave the analysis empty for entries with a relevance below 5
+3. Reuse category names for related stories
+
+Here are the feed entries in {self.format_name} format:
+
+{entries_json}"""
+
+        return prompt
+
+    def _system_prompt(self) -> str:
+        """System prompt, limited to the focus of the digest if one is set."""
+        if not self.focus:
+            return SYSTEM_PROMPT
+        return f"{SYSTEM_PROMPT} This digest only covers {self.focus}: leave out all other stories."
+
+    def _messages(self, prompt: str) -> List[Dict]:
+        """Wrap a prompt into the chat messages sent to OpenAI."""
+        return [
+            {"role": "system", "content": self._system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _item_cost(self, item) -> int:
+        """Tokens an entry (serialized inside the list) or a digest (with separator) adds to a prompt."""
+        text = self.serialize([item]) if isinstance(item, dict) else f"{item}\n\n---\n\n"
+        return self.token_counter.count(text)
+
+    def shrink_entry(self, entry: Dict, budget: int) -> Dict:
+        """
+        Shorten the description of an entry that alone does not fit into a request.
+        
+        Args:
+            entry (Dict): Feed entry
+            budget (int): Tokens available for the entry
+            
+        Returns:
+            Dict: Copy of the entry with a shortened description
+            
+        Raises:
+            ValueError: If the entry does not fit even without a description
+        """
+        description = entry.get('description', '')
+        if self._item_cost(dict(entry, description='')) > budget:
+            raise ValueError(f"Entry '{entry.get('title', '')}' does not fit into the context window")
+        
+        # Binary search for the longest description prefix that still fits
+        low, high = 0, len(description)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._item_cost(dict(entry, description=description[:middle])) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        
+        if self.verbose:
+            self.logger.warning(f"Shortened description of '{entry.get('title', '')}' to fit the context window")
+        return dict(entry, description=description[:low])
+
+    def _pack(self, items: List, prompt_builder: Callable[[List], str], max_tokens: int,
+              max_items: int = None) -> List[List]:
+        """
+        Split items into chunks whose prompts fit the context window.
+        
+        Args:
+            items (List): Entries or digests to split
+            prompt_builder (Callable[[List], str]): Builds the prompt for a chunk of items
+            max_tokens (int): Completion tokens reserved for the response
+            max_items (int): Maximum number of items per chunk
+            
+        Returns:
+            List[List]: Chunks of items in their original order
+        """
+        return list(self._iter_pack(items, prompt_builder, max_tokens, max_items))
+
+    def _iter_pack(self, items: Iterable, prompt_builder: Callable[[List], str], max_tokens: int,
+                   max_items: int = None) -> Iterator[List]:
+        """Yield every chunk of _pack() as soon as the next item does not fit into it."""
+        overhead = self.token_counter.count_messages(self._messages(prompt_builder([])))
+        budget = self.context_tokens - max_tokens - SAFETY_MARGIN - overhead
+        if budget <= 0:
+            raise ValueError(f"Context window of {self.context_tokens} tokens is too small for the prompt")
+        
+        current = []
+        used = 0
+        for item in items:
+            cost = self._item_cost(item)
+            if cost > budget:
+                if not isinstance(item, dict):
+                    raise ValueError(f"Partial digest of {cost} tokens does not fit into a request, "
+                                     f"reduce map_max_tokens")
+                item = self.shrink_entry(item, budget)
+                cost = self._item_cost(item)
+            if current and (used + cost > budget or len(current) == max_items):
+                yield current
+                current = []
+                used = 0
+            current.append(item)
+            used += cost
+        
+        if current:
+            yield current
+
+    def entry_cost(self, entry: Dict) -> int:
+        """Tokens an entry adds to the analysis prompt."""
+        return self._item_cost(entry)
+
+    def entry_budget(self) -> int:
+        """
+        Tokens available for entries if they are analyzed in a single request.
+        
+        Returns:
+            int: Context window minus the prompt template, the response and the safety margin
+        """
+        overhead = self.token_counter.count_messages(self._messages(self._create_analysis_prompt([])))
+        return self.context_tokens - self.max_tokens - SAFETY_MARGIN - overhead
+
+    def _available_tokens(self, prompt: str) -> int:
+        """Completion tokens left in the context window after the prompt."""
+        used = self.token_counter.count_messages(self._messages(prompt))
+        return self.context_tokens - SAFETY_MARGIN - used
+
+    def estimate_tokens(self, entries: List[Dict]) -> int:
+        """
+        Count the prompt tokens of analyzing the entries in a single request.
+        
+        Args:
+            entries (List[Dict]): List of feed entries
+            
+        Returns:
+            int: Number of prompt tokens
+        """
+        return self.token_counter.count_messages(self._messages(self._create_analysis_prompt(entries)))
+
+    def _complete_all(self, prompts: List[str], max_tokens: int) -> List[str]:
+        """
+        Send prompts to OpenAI in parallel, within the rate limits.
+        
+        Args:
+            prompts (List[str]): Prompts to send
+            max_tokens (int): Maximum completion tokens of each response
+            
+        Returns:
+            List[str]: Text of the responses in the order of the prompts
+        """
+        contents = [None] * len(prompts)
+        keys = [None] * len(prompts)
+        requests = []
+        missing = []
+        for index, prompt in enumerate(prompts):
+            params = {
+                'model': self.model,
+                'messages': self._messages(prompt),
+                'temperature': 0.7,  # Balance between creativity and consistency
+                'max_tokens': max_tokens
+            }
+            
+            if self.cache is not None:
+                keys[index] = request_key(params)
+                contents[index] = self.cache.get(keys[index])
+                if contents[index] is not None:
+                    self.metrics.count('cached_responses')
+                    continue
+            
+            call = lambda params=params: self._create(params)
+            # Rate limits count the requested completion tokens as well
+            requests.append((call, self.token_counter.count_messages(params['messages']) + max_tokens))
+            missing.append(index)
+        
+        if requests:
+            responses = self.scheduler.run(requests)
+            for index, response in zip(missing, responses):
+                contents[index] = response.choices[0].message.content
+                if self.cache is not None:
+                    self.cache.put(keys[index], contents[index])
+        
+        return contents
+
+    def _record_request(self, params: Dict, seconds: float, usage, first_token: float = None):
+        """Record the duration and token usage of a request in the metrics."""
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        self.metrics.count('requests')
+        if prompt_tokens is not None:
+            self.metrics.count('prompt_tokens', prompt_tokens)
+        if completion_tokens is not None:
+            self.metrics.count('completion_tokens', completion_tokens)
+        self.metrics.request(model=params['model'], seconds=round(seconds, 3),
+                             first_token_seconds=None if first_token is None else round(first_token, 3),
+                             max_tokens=params['max_tokens'], prompt_tokens=prompt_tokens,
+                             completion_tokens=completion_tokens)
+
+    def _create(self, params: Dict):
+        """Send a request without streaming and record it in the metrics."""
+        started = time.monotonic()
+        with self.metrics.stage('api'):
+            response = self.client.chat.completions.create(**params)
+        self._record_request(params, time.monotonic() - started, getattr(response, 'usage', None))
+        return response
+
+    def _stream(self, params: Dict, output) -> SimpleNamespace:
+        """
+        Send a streaming request and write the text to the output as it arrives.
+        
+        Args:
+            params (Dict): Keyword arguments of chat.completions.create
+            output: Writer with write(), reset() and flush()
+            
+        Returns:
+            SimpleNamespace: Complete text as content, and the token usage if the API reported it
+        """
+        # A retried request starts over
+        output.reset()
+        started = time.monotonic()
+        first_token = None
+        with self.metrics.stage('api'):
+            stream = self.client.chat.completions.create(stream=True, stream_options={'include_usage': True},
+                                                         **params)
+            parts = []
+            usage = None
+            for chunk in stream:
+                if getattr(chunk, 'usage', None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                if not parts:
+                    first_token = time.monotonic() - started
+                    if self.verbose:
+                        self.logger.info(f"Time to first token: {first_token:.2f}s")
+                parts.append(text)
+                output.write(text)
+            output.flush()
+        
+        elapsed = time.monotonic() - started
+        self._record_request(params, elapsed, usage, first_token)
+        if self.verbose:
+            self.logger.info(f"Streamed {len(parts)} chunks in {elapsed:.2f}s")
+        return SimpleNamespace(content=''.join(parts), usage=usage)
+
+    def _complete(self, prompt: str, max_tokens: int, output=None) -> str:
+        """
+        Send one prompt to OpenAI and return the text of the response.
+        
+        Args:
+            prompt (str): Prompt to send
+            max_tokens (int): Maximum completion tokens of the response
+            output: Optional writer receiving the response while it is generated
+            
+        Returns:
+            str: Text of the response
+        """
+        if output is None:
+            return self._complete_all([prompt], max_tokens)[0]
+        
+        params = {
+            'model': self.model,
+            'messages': self._messages(prompt),
+            'temperature': 0.7,  # Balance between creativity and consistency
+            'max_tokens': max_tokens
+        }
+        key = request_key(params) if self.cache is not None else None
+        content = self.cache.get(key) if key is not None else None
+        
+        if content is None:
+            call = lambda: self._stream(params, output)
+            estimate = self.token_counter.count_messages(params['messages']) + max_tokens
+            content = self.scheduler.run([(call, estimate)])[0].content
+            if key is not None:
+                self.cache.put(key, content)
+        else:
+            self.metrics.count('cached_responses')
+            output.write(content)
+            output.flush()
+        return content
+
+    def _reduce(self, digests: List[str], output=None) -> str:
+        """Merge partial digests until they fit into the final request."""
+        while True:
+            groups = self._pack(digests, self._create_reduce_prompt, self.max_tokens)
+            if len(groups) == 1:
+                if self.verbose:
+                    self.logger.info(f"Merging {len(digests)} partial digests")
+                return self._complete(self._create_reduce_prompt(digests), self.max_tokens, output)
+            
+            if len(groups) == len(digests):
+                raise ValueError("Partial digests are too large to be merged, reduce map_max_tokens")
+            
+            if self.verbose:
+                self.logger.info(f"Condensing {len(digests)} partial digests into {len(groups)}")
+            digests = self._complete_all([self._create_merge_prompt(group) for group in groups],
+                                         self.map_max_tokens)
+
+    def _parse_structured(self, content: str) -> Dict:
+        """Parse the JSON answer of a structured request, tolerating markdown code fences."""
+        text = content.strip()
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else ''
+            text = text.rsplit('```', 1)[0]
+        
+        try:
+            parsed = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Could not parse structured response: {str(e)}")
+        
+        if not isinstance(parsed, dict) or not isinstance(parsed.get('entries'), list):
+            raise ValueError("Structured response does not contain an entries list")
+        return parsed
+
+    def _entry_key(self, entry: Dict) -> str:
+        """Cache key of the structured analysis of a single entry."""
+        return request_key({
+            'model': self.model,
+            'template': self._create_structured_prompt([]),
+            'entry': {field: entry.get(field, '') for field in ('title', 'description', 'feed_title')}
+        })
+
+    def _analyze_structured(self, entries: List[Dict]) -> str:
+        """
+        Analyze entries as compact JSON per entry and render the Markdown locally.
+        
+        Entries analyzed by an earlier run are taken from the cache, only the
+        others are sent to OpenAI.
+        
+        Args:
+            entries (List[Dict]): List of feed entries to analyze
+            
+        Returns:
+            str: Markdown-formatted analysis
+        """
+        results = [None] * len(entries)
+        keys = [self._entry_key(entry) for entry in entries]
+        
+        if self.cache is not None:
+            for index, key in enumerate(keys):
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.metrics.count('cached_responses')
+                    results[index] = json.loads(cached)
+        
+        # Links and publishing dates are not needed by the model, the renderer adds them
+        payload = [
+            {'id': index, 'title': entry.get('title', ''), 'description': entry.get('description', ''),
+             'feed_title': entry.get('feed_title', '')}
+            for index, entry in enumerate(entries) if results[index] is None
+        ]
+        
+        summaries = []
+        if payload:
+            max_items = max(1, self.structured_max_tokens // RESULT_TOKENS_PER_ENTRY)
+            chunks = self._pack(payload, self._create_structured_prompt, self.structured_max_tokens, max_items)
+            if self.verbose:
+                self.logger.info(f"Requesting structured analysis of {len(payload)} entries in {len(chunks)} requests")
+            
+            contents = self._complete_all([self._create_structured_prompt(chunk) for chunk in chunks],
+                                          self.structured_max_tokens)
+            for content in contents:
+                parsed = self._parse_structured(content)
+                if isinstance(parsed.get('summary'), str) and parsed['summary'].strip():
+                    summaries.append(parsed['summary'])
+                for item in parsed['entries']:
+                    index = item.get('id') if isinstance(item, dict) else None
+                    if not isinstance(index, int) or not 0 <= index < len(entries):
+                        continue
+                    results[index] = item
+                    if self.cache is not None:
+                        self.cache.put(keys[index], json.dumps(item))
+        
+        missing = sum(result is None for result in results)
+        if missing and self.verbose:
+            self.logger.warning(f"No analysis returned for {missing} entries")
+        
+        return render_markdown(entries, results, summary=' '.join(summaries) or None)
+
+    def analyze_feeds(self, entries: List[Dict], output=None) -> str:
         """
         Analyze feed entries using OpenAI API.
         
+        Entries that do not fit into one request are split into chunks that
+        are summarized separately and merged in a final request. In structured
+        mode the model only returns JSON per entry and the Markdown is rendered
+        locally.
+        
         Args:
             entries (List[Dict]): List of feed entries to analyze
+            output: Optional writer (e.g. SummaryWriter) the final response is streamed to
             
         Returns:
             str: Markdown-formatted analysis
@@ -100,26 +651,76 @@ Please analyze these entries and provide your response in complete markdown form
         if self.verbose:
             self.logger.info(f"Analyzing {len(entries)} feed entries")
         
+        if not self.structured:
+            return self.analyze_stream(entries, output)
+        
         try:
-            prompt = self._create_analysis_prompt(entries)
+            markdown_content = self._analyze_structured(entries)
+            if self.verbose:
+                self.logger.info("Rendered structured analysis to markdown")
+            return markdown_content
             
+        except Exception as e:
             if self.verbose:
-                self.logger.info("Sending request to OpenAI")
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",  # Using GPT-4 for better analysis
-                messages=[
-                    {"role": "system", "content": "You are an AI news curator specializing in artificial intelligence and machine learning news analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,  # Balance between creativity and consistency
-                max_tokens=4000  # Adjust based on your needs
-            )
+                self.logger.error(f"Error during AI analysis: {str(e)}")
+            raise
+
+    def _analyze_single(self, entries: List[Dict], output=None) -> str:
+        """Analyze entries fitting into one request, if need be with a shorter answer than max_tokens."""
+        prompt = self._create_analysis_prompt(entries)
+        max_tokens = min(self.max_tokens, self._available_tokens(prompt))
+        if self.verbose:
+            if max_tokens < self.max_tokens:
+                self.logger.info(f"Limiting the response to {max_tokens} tokens to fit the context window")
+            self.logger.info("Sending request to OpenAI")
+        return self._complete(prompt, max_tokens, output)
+
+    def analyze_stream(self, entries: Iterable[Dict], output=None) -> str:
+        """
+        Analyze entries while they are still arriving, e.g. from FeedReader.iter_entries().
+        
+        Entries are collected as long as they fit into a single request. Once they
+        do not, every chunk of the map step is sent to OpenAI as soon as it is full,
+        while later entries are still being fetched and filtered.
+        
+        Args:
+            entries (Iterable[Dict]): Feed entries
+            output: Optional writer (e.g. SummaryWriter) the final response is streamed to
+            
+        Returns:
+            str: Markdown-formatted analysis
+        """
+        try:
+            links = None
+            if self.link_ids:
+                links = {}
+                entries = iter_replace_links(entries, links)
+                if output is not None:
+                    output = LinkRestorer(output, links)
             
-            markdown_content = response.choices[0].message.content
+            # Collect entries as long as a single request can take them
+            iterator = iter(entries)
+            budget = self.entry_budget()
+            first = []
+            used = 0
+            for entry in iterator:
+                first.append(entry)
+                used += self._item_cost(entry)
+                if used > budget:
+                    break
+            
+            if used <= budget:
+                markdown_content = self._analyze_single(first, output)
+            else:
+                markdown_content = self._map_reduce(itertools.chain(first, iterator), output)
+            
+            if links is not None:
+                markdown_content = restore_links(markdown_content, links)
             
             if self.verbose:
                 self.logger.info("Successfully received and processed OpenAI response")
+                if self.cache is not None:
+                    self.logger.info(f"Response cache: {self.cache.hits} hits, {self.cache.misses} misses")
             
             return markdown_content
             
@@ -128,12 +729,49 @@ Please analyze these entries and provide your response in complete markdown form
                 self.logger.error(f"Error during AI analysis: {str(e)}")
             raise
 
-    def process_feeds(self, entries: List[Dict]) -> str:
+    def _map_reduce(self, entries: Iterator[Dict], output=None) -> str:
+        """
+        Summarize chunks of entries as they fill up and merge the partial digests.
+        
+        Args:
+            entries (Iterator[Dict]): Feed entries too many for a single request
+            output: Optional writer the final response is streamed to
+            
+        Returns:
+            str: Markdown-formatted analysis
+        """
+        state = {'exhausted': False}
+        def tracked():
+            yield from entries
+            state['exhausted'] = True
+        
+        futures = []
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.scheduler.max_concurrency) as executor:
+            for chunk in self._iter_pack(tracked(), self._create_map_prompt, self.map_max_tokens):
+                count += len(chunk)
+                if state['exhausted'] and not futures:
+                    # All entries fit into one map chunk after all, no need to merge anything
+                    return self._analyze_single(chunk, output)
+                
+                if self.verbose:
+                    self.logger.info(f"Analyzing chunk {len(futures) + 1} of {len(chunk)} entries")
+                futures.append(executor.submit(self._complete, self._create_map_prompt(chunk), self.map_max_tokens))
+            
+            if self.verbose:
+                self.logger.info(f"Payload too large for one request, analyzed {count} entries in {len(futures)} chunks")
+            digests = [future.result() for future in futures]
+        
+        # Map: summarize each chunk on its own, reduce: merge the partial digests
+        return self._reduce(digests, output)
+
+    def process_feeds(self, entries: List[Dict], output=None) -> str:
         """
         Main method to process feed entries into a markdown summary.
         
         Args:
             entries (List[Dict]): List of feed entries to process
+            output: Optional writer the summary is streamed to while it is generated
             
         Returns:
             str: Final markdown content
@@ -143,7 +781,7 @@ Please analyze these entries and provide your response in complete markdown form
         
         try:
             # Analyze feeds and get markdown content
-            markdown_content = self.analyze_feeds(entries)
+            markdown_content = self.analyze_feeds(entries, output)
             
             if self.verbose:
                 self.logger.info("Feed processing completed successfully")
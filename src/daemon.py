@@ -0,0 +1,188 @@
+"""
+News daemon
+
+Keeps running between digests: polls every feed when the poll scheduler
+says it is due, collects the new entries and writes a digest at the
+configured times. HTTP client, caches and imports stay warm in between.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/daemon.py
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Union
+from src.feed_cache import FeedCache
+from src.feed_reader import FeedReader
+from src.poll_scheduler import PollScheduler
+from src.seen_index import SeenIndex
+
+def next_digest_time(digest_times: List[str], now: datetime) -> datetime:
+    """
+    Return the next of the daily digest times after now.
+
+    Args:
+        digest_times (List[str]): Local times of day as HH:MM
+        now (datetime): Current local time
+
+    Returns:
+        datetime: Next digest time, today or tomorrow
+    """
+    candidates = []
+    for digest_time in digest_times:
+        hour, minute = (int(part) for part in digest_time.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        candidates.append(candidate)
+    return min(candidates)
+
+class NewsDaemon:
+    """Long-running loop polling feeds adaptively and writing digests on a schedule."""
+
+    def __init__(self, feed_urls: List[str], reader: FeedReader, poll_scheduler: PollScheduler,
+                 digest: Callable[[List[Dict]], Union[str, List[str], None]], digest_times: List[str] = None,
+                 feed_cache: FeedCache = None, seen_index: SeenIndex = None, max_pending: int = 5000,
+                 max_pending_age: float = 48 * 3600, verbose: bool = False):
+        """
+        Initialize NewsDaemon.
+
+        Args:
+            feed_urls (List[str]): URLs of all feeds
+            reader (FeedReader): Reader used for every poll, keeping its HTTP client open
+            poll_scheduler (PollScheduler): Decides which feeds are due
+            digest (Callable[[List[Dict]], Union[str, List[str], None]]): Analyzes the collected entries
+                and saves the summary, returning its path or the paths of several digests
+            digest_times (List[str]): Local times of day (HH:MM) a digest is written
+            feed_cache (FeedCache): Cache of the reader, saved after every digest
+            seen_index (SeenIndex): Index of the reader, updated and pruned after every digest
+            max_pending (int): Entries kept for the digest at most, the oldest are dropped first
+            max_pending_age (float): Seconds after which an entry not digested yet is dropped,
+                e.g. while digests keep failing
+            verbose (bool): Enable verbose logging
+        """
+        self.feed_urls = feed_urls
+        self.reader = reader
+        self.poll_scheduler = poll_scheduler
+        self.digest = digest
+        self.digest_times = digest_times or ['07:00']
+        self.feed_cache = feed_cache
+        self.seen_index = seen_index
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self.max_pending = max_pending
+        self.max_pending_age = max_pending_age
+        self.pending = {}    # Entries collected since the last digest, by key, oldest first
+        self.collected = {}  # Time every pending entry was collected, by key
+        self.stop_event = threading.Event()
+
+    def poll(self, now: float = None) -> int:
+        """
+        Poll the feeds that are due and collect their new entries.
+
+        Args:
+            now (float): Current time as a Unix timestamp
+
+        Returns:
+            int: Number of new entries collected
+        """
+        now = time.time() if now is None else now
+        due = self.poll_scheduler.due(self.feed_urls, now)
+        if not due:
+            return 0
+
+        fresh = set()
+        for entry in self.reader.iter_entries(due):
+            # new_keys grows in step with the yielded entries
+            key = self.reader.new_keys[-1]
+            if key not in self.pending:
+                self.pending[key] = entry
+                self.collected[key] = now
+                fresh.add(key)
+        self._drop_stale(now)
+
+        for url in due:
+            # Entries collected by an earlier poll and not digested yet are no news
+            keys = self.reader.feed_stats.get(url, {}).get('keys', [])
+            self.poll_scheduler.record(url, any(key in fresh for key in keys), now)
+        self.poll_scheduler.save()
+
+        if self.verbose:
+            self.logger.info(f"Polled {len(due)} feeds, {len(fresh)} new entries, "
+                             f"{len(self.pending)} waiting for the digest")
+        return len(fresh)
+
+    def _drop_stale(self, now: float):
+        """Drop pending entries older than max_pending_age and the oldest beyond max_pending."""
+        stale = [key for key in self.pending if now - self.collected[key] > self.max_pending_age]
+        kept = [key for key in self.pending if now - self.collected[key] <= self.max_pending_age]
+        stale += kept[:max(0, len(kept) - self.max_pending)]
+        for key in stale:
+            del self.pending[key]
+            del self.collected[key]
+        if stale:
+            self.logger.warning(f"Dropped {len(stale)} entries waiting too long for a digest")
+
+    def write_digest(self) -> Union[str, List[str], None]:
+        """
+        Write a digest of the collected entries and forget them afterwards.
+
+        Returns:
+            Union[str, List[str], None]: What the digest returned, None if there was nothing to write
+
+        Raises:
+            Exception: Errors of the digest; the entries are kept for the next attempt
+        """
+        if not self.pending:
+            if self.verbose:
+                self.logger.info("No new entries since the last digest")
+            return None
+
+        output_file = self.digest(list(self.pending.values()))
+
+        # Only remember the entries once their summary is safely on disk
+        if self.seen_index is not None:
+            self.seen_index.mark_seen(list(self.pending))
+            # The index is opened once, so keys past the retention period are forgotten here
+            self.seen_index.prune()
+        if self.feed_cache is not None:
+            self.feed_cache.save()
+        self.pending.clear()
+        self.collected.clear()
+        return output_file
+
+    def run(self, now: Callable[[], datetime] = datetime.now):
+        """
+        Poll and write digests until stop() is called.
+
+        Args:
+            now (Callable[[], datetime]): Clock returning the current local time
+        """
+        next_digest = next_digest_time(self.digest_times, now())
+        if self.verbose:
+            self.logger.info(f"Serving {len(self.feed_urls)} feeds, next digest at {next_digest:%Y-%m-%d %H:%M}")
+
+        while not self.stop_event.is_set():
+            self.poll()
+
+            if now() >= next_digest:
+                try:
+                    output_file = self.write_digest()
+                    if output_file and self.verbose:
+                        self.logger.info(f"Saved digest to: {output_file}")
+                except Exception as e:
+                    self.logger.error(f"Digest failed, keeping {len(self.pending)} entries for the next one: {str(e)}")
+                next_digest = next_digest_time(self.digest_times, now())
+
+            # Sleep until the next feed is due or the next digest, whichever comes first
+            next_poll = self.poll_scheduler.next_poll(self.feed_urls) or time.time() + 60
+            wait = min(next_poll - time.time(), (next_digest - now()).total_seconds())
+            self.stop_event.wait(max(1.0, wait))
+
+    def stop(self):
+        """Stop the loop after the current step."""
+        self.stop_event.set()
@@ -0,0 +1,143 @@
+"""
+Deduplicator
+
+Finds the same story published by several feeds and merges the copies
+into one entry that lists all sources, using MinHash signatures and
+locality-sensitive hashing so each entry is only compared with likely
+duplicates.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/deduplicator.py
+import logging
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, List
+import numpy as np
+
+# Mersenne prime for the universal hash functions; a * x + b stays below 2^64
+PRIME = (1 << 31) - 1
+
+# Frequent words that say nothing about the story
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were will with'.split()
+)
+
+def shingles(entry: Dict) -> List[str]:
+    """Distinct words of title and description without stop words."""
+    text = f"{entry.get('title', '')} {entry.get('description', '')}".lower()
+    return sorted({word for word in re.findall(r'[a-z0-9]+', text) if word not in STOP_WORDS})
+
+class Deduplicator:
+    """Merges near-duplicate entries across feeds with MinHash and LSH banding."""
+
+    def __init__(self, threshold: float = 0.5, bands: int = 16, rows: int = 4, seed: int = 1,
+                 verbose: bool = False):
+        """
+        Initialize Deduplicator.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of two entries to be merged
+            bands (int): Number of LSH bands; more bands find more candidates
+            rows (int): Signature values per band; more rows find fewer candidates
+            seed (int): Seed of the hash functions, fixed so runs are reproducible
+            verbose (bool): Enable verbose logging
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+
+        generator = np.random.default_rng(seed)
+        size = bands * rows
+        self._a = generator.integers(1, PRIME, size=size, dtype=np.uint64)
+        self._b = generator.integers(0, PRIME, size=size, dtype=np.uint64)
+
+    def signature(self, words: List[str]) -> np.ndarray:
+        """
+        Compute the MinHash signature of a set of words.
+
+        Args:
+            words (List[str]): Distinct words of an entry
+
+        Returns:
+            np.ndarray: Minimum of every hash function over the words
+        """
+        hashes = np.array([zlib.crc32(word.encode('utf-8')) % PRIME for word in words], dtype=np.uint64)
+        # (a * x + b) mod p of every word for all hash functions at once
+        return ((self._a[:, None] * hashes + self._b[:, None]) % PRIME).min(axis=1)
+
+    def deduplicate(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Merge near-duplicate entries, keeping the first copy of every story.
+
+        The merged entry gets a sources list with the feed title and link of
+        every copy. The input entries are not modified.
+
+        Args:
+            entries (List[Dict]): Feed entries
+
+        Returns:
+            List[Dict]: Entries without near-duplicates, in their original order
+        """
+        return list(self.iter_unique(entries))
+
+    def iter_unique(self, entries: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield the first copy of every story while the entries arrive.
+
+        Later copies are not yielded but added to the sources list of the copy
+        yielded before, so a consumer holding on to it sees all sources once
+        the input is exhausted.
+
+        Args:
+            entries (Iterable[Dict]): Feed entries
+
+        Returns:
+            Iterator[Dict]: Copies of the entries without near-duplicates
+        """
+        buckets = {}
+        kept = []  # Yielded entry and signature of every story
+        count = 0
+        merged = 0
+
+        for entry in entries:
+            count += 1
+            words = shingles(entry)
+            if not words:
+                # Nothing to compare, e.g. an entry without title and description
+                yield dict(entry)
+                continue
+
+            signature = self.signature(words)
+            bands = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                     for band in range(self.bands)]
+
+            # Only entries sharing a band are compared
+            candidates = {story for band in bands for story in buckets.get(band, ())}
+            match = None
+            for story in sorted(candidates):
+                similarity = np.count_nonzero(kept[story][1] == signature) / len(signature)
+                if similarity >= self.threshold:
+                    match = kept[story][0]
+                    break
+
+            if match is not None:
+                if 'sources' not in match:
+                    match['sources'] = [{'feed_title': match.get('feed_title', ''), 'link': match.get('link', '')}]
+                match['sources'].append({'feed_title': entry.get('feed_title', ''), 'link': entry.get('link', '')})
+                merged += 1
+                continue
+
+            for band in bands:
+                buckets.setdefault(band, []).append(len(kept))
+            copy = dict(entry)
+            kept.append((copy, signature))
+            yield copy
+
+        if self.verbose:
+            self.logger.info(f"Merged {merged} near-duplicate entries, {count - merged} stories left")
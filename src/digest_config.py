@@ -0,0 +1,75 @@
+"""
+Digest configuration
+
+Reads the definitions of several digests written from the same feeds,
+each with its own topic, relevance vocabulary and output directory.
+
+Example digests.json:
+    [
+        {"name": "llm-research", "focus": "LLM research papers and model releases",
+         "vocabulary": ["llm", "transformer", "benchmark", "paper", "fine-tuning"]},
+        {"name": "ai-policy", "focus": "AI policy, regulation and safety",
+         "vocabulary": ["regulation", "ai act", "policy", "safety", "copyright"], "threshold": 0.05}
+    ]
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/digest_config.py
+import json
+import os
+import re
+from typing import Dict, List
+
+# Keys a digest definition may contain
+DIGEST_KEYS = {'name', 'focus', 'vocabulary', 'threshold', 'top_k', 'output_dir'}
+
+def load_digests(file_path: str, output_dir: str) -> List[Dict]:
+    """
+    Load and validate digest definitions from a JSON file.
+
+    Args:
+        file_path (str): JSON file with a list of digest definitions
+        output_dir (str): Directory of all summaries; every digest writes to a subdirectory
+            named after it unless it sets its own output_dir
+
+    Returns:
+        List[Dict]: Definitions with name, focus, vocabulary, threshold, top_k and output_dir
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If a definition is invalid
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Digest file not found: {file_path}")
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+    if not isinstance(definitions, list) or not definitions:
+        raise ValueError(f"{file_path} must contain a non-empty list of digests")
+
+    digests = []
+    names = set()
+    for definition in definitions:
+        unknown = set(definition) - DIGEST_KEYS
+        if unknown:
+            raise ValueError(f"Unknown digest settings: {', '.join(sorted(unknown))}")
+
+        name = definition.get('name', '')
+        if not re.fullmatch(r'[\w-]+', name):
+            raise ValueError(f"Digest name '{name}' must consist of letters, digits, '_' and '-'")
+        if name in names:
+            raise ValueError(f"Digest '{name}' is defined twice")
+        names.add(name)
+
+        digests.append({
+            'name': name,
+            'focus': definition.get('focus'),
+            'vocabulary': definition.get('vocabulary'),
+            'threshold': definition.get('threshold', 0.1),
+            'top_k': definition.get('top_k'),
+            'output_dir': definition.get('output_dir') or os.path.join(output_dir, name)
+        })
+    return digests
@@ -0,0 +1,276 @@
+"""
+Entry archive
+
+Keeps every fetched entry and the summaries written from them in a
+SQLite database with an FTS5 full-text index, so past news can be
+searched by keyword, feed and date without reading old summaries.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/entry_archive.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+from src.seen_index import entry_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    link TEXT NOT NULL,
+    feed_title TEXT NOT NULL,
+    published TEXT NOT NULL,
+    published_at REAL,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_published_at ON entries (published_at);
+CREATE INDEX IF NOT EXISTS entries_feed_title ON entries (feed_title);
+
+-- External content table: the text is stored once, in entries
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, description, feed_title, content='entries', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, title, description, feed_title)
+    VALUES (new.id, new.title, new.description, new.feed_title);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, title, description, feed_title)
+    VALUES ('delete', old.id, old.title, old.description, old.feed_title);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, title, description, feed_title)
+    VALUES ('delete', old.id, old.title, old.description, old.feed_title);
+    INSERT INTO entries_fts (rowid, title, description, feed_title)
+    VALUES (new.id, new.title, new.description, new.feed_title);
+END;
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    model TEXT NOT NULL,
+    output_file TEXT,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_entries (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    PRIMARY KEY (run_id, entry_id)
+) WITHOUT ROWID;
+"""
+
+def to_timestamp(date: str) -> float:
+    """
+    Convert a YYYY-MM-DD date or ISO 8601 time in local time to a Unix timestamp.
+
+    Raises:
+        ValueError: If the date is not in ISO 8601 format
+    """
+    try:
+        return datetime.fromisoformat(date).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid date '{date}', use YYYY-MM-DD")
+
+class EntryArchive:
+    """SQLite archive of all fetched entries and the runs that analyzed them."""
+
+    def __init__(self, db_path: str, verbose: bool = False):
+        """
+        Initialize EntryArchive.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            verbose (bool): Enable verbose logging
+        """
+        self.db_path = db_path
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+
+        # Digests written concurrently record their runs from worker threads
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def add(self, entries: Iterable[Dict], update: bool = True) -> int:
+        """
+        Store entries, updating the text of entries archived before.
+
+        Args:
+            entries (Iterable[Dict]): Structured feed entries
+            update (bool): Update entries archived before. If False, only new entries are stored
+
+        Returns:
+            int: Number of entries written
+        """
+        # Loads NumPy through the deduplicator, so searches do not import it
+        from src.entry_selector import published_at
+
+        now = time.time()
+        rows = []
+        for entry in entries:
+            date = published_at(entry)
+            rows.append((entry_key(entry), entry.get('title', ''), entry.get('description', ''),
+                         entry.get('link', ''), entry.get('feed_title', ''), entry.get('published', ''),
+                         date.timestamp() if date else None, now))
+
+        # Updating only changed rows keeps the full-text index from being rewritten needlessly
+        conflict = "DO NOTHING"
+        if update:
+            conflict = ("DO UPDATE SET title = excluded.title, description = excluded.description, "
+                        "link = excluded.link, feed_title = excluded.feed_title, published = excluded.published, "
+                        "published_at = excluded.published_at "
+                        "WHERE title != excluded.title OR description != excluded.description")
+        with self._lock:
+            self.connection.executemany(
+                "INSERT INTO entries (key, title, description, link, feed_title, published, published_at, first_seen) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) {conflict}",
+                rows
+            )
+            self.connection.commit()
+        return len(rows)
+
+    def iter_add(self, entries: Iterable[Dict], batch_size: int = 100) -> Iterator[Dict]:
+        """
+        Store entries while passing them on, one transaction per batch.
+
+        Args:
+            entries (Iterable[Dict]): Structured feed entries
+            batch_size (int): Entries written per transaction
+
+        Yields:
+            Dict: The entries, unchanged
+        """
+        batch = []
+        archived = 0
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                archived += self.add(batch)
+                batch = []
+            yield entry
+        archived += self.add(batch)
+
+        if self.verbose:
+            self.logger.info(f"Archived {archived} entries in {self.db_path}")
+
+    def record_run(self, entries: Iterable[Dict], summary: str, model: str, output_file: str = None) -> int:
+        """
+        Store a summary together with the entries it was written from.
+
+        Entries are linked by key. Entries not archived yet are added, archived ones
+        are left unchanged.
+
+        Args:
+            entries (Iterable[Dict]): Entries sent to the analysis
+            summary (str): Markdown of the summary
+            model (str): Model that wrote the summary
+            output_file (str): Path the summary was saved to
+
+        Returns:
+            int: Id of the run
+        """
+        entries = list(entries)
+        # The analyzed entries may be shortened, the archived full text is kept
+        self.add(entries, update=False)
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (finished, model, output_file, summary) VALUES (?, ?, ?, ?)",
+                (time.time(), model, output_file, summary)
+            )
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO run_entries (run_id, entry_id) SELECT ?, id FROM entries WHERE key = ?",
+                [(run_id, entry_key(entry)) for entry in entries]
+            )
+            self.connection.commit()
+        return run_id
+
+    def search(self, query: str = None, feed: str = None, since: str = None, until: str = None,
+               limit: int = 20) -> List[Dict]:
+        """
+        Find archived entries.
+
+        Args:
+            query (str): FTS5 query over title, description and feed title, e.g. 'llama AND open'
+            feed (str): Only entries of feeds whose title contains this text
+            since (str): Only entries published on or after this date (YYYY-MM-DD)
+            until (str): Only entries published before this date (YYYY-MM-DD)
+            limit (int): Maximum number of results
+
+        Returns:
+            List[Dict]: Matching entries, best matches first for a query, otherwise newest first
+
+        Raises:
+            ValueError: If the query is not valid FTS5 syntax or a date is invalid
+        """
+        conditions = []
+        params = []
+        if query:
+            conditions.append("entries_fts MATCH ?")
+            params.append(query)
+        if feed:
+            conditions.append("entries.feed_title LIKE ?")
+            params.append(f"%{feed}%")
+        if since:
+            conditions.append("entries.published_at >= ?")
+            params.append(to_timestamp(since))
+        if until:
+            conditions.append("entries.published_at < ?")
+            params.append(to_timestamp(until))
+
+        if query:
+            sql = ("SELECT entries.* FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid "
+                   "WHERE {} ORDER BY bm25(entries_fts, 3.0, 1.0, 1.0) LIMIT ?")
+        else:
+            sql = "SELECT entries.* FROM entries WHERE {} ORDER BY published_at DESC LIMIT ?"
+        sql = sql.format(' AND '.join(conditions) or '1')
+        try:
+            with self._lock:
+                rows = self.connection.execute(sql, params + [limit]).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query '{query}': {str(e)}")
+        return [dict(row) for row in rows]
+
+    def runs(self, entry_id: int = None, limit: int = 20) -> List[Dict]:
+        """
+        List recorded runs, newest first.
+
+        Args:
+            entry_id (int): Only runs that analyzed this entry
+            limit (int): Maximum number of runs
+
+        Returns:
+            List[Dict]: Runs with id, finished, model, output_file and summary
+        """
+        with self._lock:
+            if entry_id is None:
+                rows = self.connection.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+            else:
+                rows = self.connection.execute(
+                    "SELECT runs.* FROM runs JOIN run_entries ON run_entries.run_id = runs.id "
+                    "WHERE run_entries.entry_id = ? ORDER BY runs.id DESC LIMIT ?", (entry_id, limit))
+            return [dict(row) for row in rows.fetchall()]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
@@ -0,0 +1,157 @@
+"""
+Entry selector
+
+Chooses the entries sent to OpenAI when they do not all fit into one
+request. Entries are valued by relevance, source weight, freshness and
+novelty, and picked greedily by value per token until the budget is
+used up, shortening descriptions where that lets another entry fit.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/entry_selector.py
+import heapq
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Sequence
+from src.deduplicator import shingles
+
+def published_at(entry: Dict) -> Optional[datetime]:
+    """Parse the published date of an entry (RFC 822 or ISO 8601), None if unknown."""
+    published = entry.get('published', '')
+    if not published:
+        return None
+
+    try:
+        date = parsedate_to_datetime(published)
+    except (TypeError, ValueError):
+        try:
+            date = datetime.fromisoformat(published.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+class EntrySelector:
+    """Greedy knapsack selection of entries within a token budget."""
+
+    def __init__(self, budget: int, cost: Callable[[Dict], int],
+                 shrink: Callable[[Dict, int], Dict] = None, source_weights: Dict[str, float] = None,
+                 half_life: float = 12.0, verbose: bool = False):
+        """
+        Initialize EntrySelector.
+
+        Args:
+            budget (int): Tokens available for all entries together
+            cost (Callable[[Dict], int]): Tokens an entry adds to the prompt, e.g. AIAnalyzer.entry_cost
+            shrink (Callable[[Dict, int], Dict]): Shortens an entry to a number of tokens, e.g.
+                AIAnalyzer.shrink_entry. If None, entries are never shortened
+            source_weights (Dict[str, float]): Weight per feed title, 1 for feeds not listed
+            half_life (float): Hours after which the freshness of an entry is halved
+            verbose (bool): Enable verbose logging
+        """
+        self.budget = budget
+        self.cost = cost
+        self.shrink = shrink
+        self.source_weights = source_weights or {}
+        self.half_life = half_life
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self.dropped = []
+        self.shortened = 0
+
+    def source_weight(self, entry: Dict) -> float:
+        """Weight of the feeds of an entry; stories covered by several feeds count more."""
+        sources = entry.get('sources') or [entry]
+        weight = max(self.source_weights.get(source.get('feed_title', ''), 1.0) for source in sources)
+        return weight * (1 + 0.25 * (len(sources) - 1))
+
+    def freshness(self, entry: Dict, now: datetime) -> float:
+        """Halves with every half_life hours since publication, 1 for unknown dates."""
+        date = published_at(entry)
+        if date is None:
+            return 1.0
+        age = max(0.0, (now - date).total_seconds() / 3600)
+        return 0.5 ** (age / self.half_life)
+
+    def value(self, entry: Dict, relevance: float, now: datetime) -> float:
+        """Value of an entry before novelty is taken into account."""
+        return relevance * self.source_weight(entry) * self.freshness(entry, now)
+
+    def select(self, entries: List[Dict], relevance: Sequence[float] = None,
+               now: datetime = None) -> List[Dict]:
+        """
+        Pick the entries giving the most value within the budget.
+
+        The entry with the best value per token is taken next. Its novelty,
+        one minus the word overlap with the entries already taken, only
+        decreases while the selection grows, so values are updated lazily
+        when an entry reaches the top of the queue.
+
+        Args:
+            entries (List[Dict]): Feed entries
+            relevance (Sequence[float]): Relevance per entry, e.g. from RelevanceFilter. 1 for all if None
+            now (datetime): Reference time of the freshness, defaults to the current time
+
+        Returns:
+            List[Dict]: Selected entries in their original order, some with shortened descriptions
+        """
+        now = now or datetime.now(timezone.utc)
+        relevance = [1.0] * len(entries) if relevance is None else list(relevance)
+        costs = [self.cost(entry) for entry in entries]
+
+        self.dropped = []
+        self.shortened = 0
+        if sum(costs) <= self.budget:
+            return list(entries)
+
+        values = [self.value(entry, max(score, 1e-6), now) for entry, score in zip(entries, relevance)]
+        words = [set(shingles(entry)) for entry in entries]
+        overlap = [0.0] * len(entries)
+        checked = [0] * len(entries)  # Number of selected entries the overlap was computed against
+
+        queue = [(-values[index] / max(costs[index], 1), index) for index in range(len(entries))]
+        heapq.heapify(queue)
+
+        selected = {}
+        order = []
+        remaining = self.budget
+        while queue and remaining > 0:
+            _, index = heapq.heappop(queue)
+
+            if checked[index] < len(order):
+                # Novelty may have dropped since the entry was queued
+                for other in order[checked[index]:]:
+                    union = len(words[index] | words[other])
+                    if union:
+                        overlap[index] = max(overlap[index], len(words[index] & words[other]) / union)
+                checked[index] = len(order)
+                priority = values[index] * (1 - overlap[index]) / max(costs[index], 1)
+                if queue and priority < -queue[0][0]:
+                    heapq.heappush(queue, (-priority, index))
+                    continue
+
+            entry = entries[index]
+            if costs[index] > remaining:
+                if self.shrink is None:
+                    continue
+                try:
+                    entry = self.shrink(entry, remaining)
+                except ValueError:
+                    # Does not fit even without a description
+                    continue
+                self.shortened += 1
+
+            selected[index] = entry
+            order.append(index)
+            remaining -= self.cost(entry)
+
+        result = [selected[index] for index in sorted(selected)]
+        self.dropped = [entry for index, entry in enumerate(entries) if index not in selected]
+
+        if self.verbose:
+            self.logger.info(f"Selected {len(result)} of {len(entries)} entries within {self.budget} tokens "
+                             f"({self.shortened} shortened, {len(self.dropped)} dropped)")
+        return result
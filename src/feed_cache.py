@@ -0,0 +1,152 @@
+"""
+Feed cache
+
+Remembers ETag and Last-Modified headers of every feed between runs,
+so unchanged feeds can be answered with a 304 by the server.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/feed_cache.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+class FeedCache:
+    """Small on-disk store for the conditional GET validators of each feed."""
+
+    def __init__(self, file_path: str, max_age: float = 7 * 24 * 3600, verbose: bool = False):
+        """
+        Initialize FeedCache.
+
+        Args:
+            file_path (str): Path to the JSON file holding the cache
+            max_age (float): Seconds after which a cache entry is ignored and the feed fetched in full
+            verbose (bool): Enable verbose logging
+        """
+        self.file_path = file_path
+        self.max_age = max_age
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """Load the cache file, starting empty if it is missing or broken."""
+        if not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if self.verbose:
+                self.logger.warning(f"Ignoring unreadable feed cache {self.file_path}: {str(e)}")
+            return {}
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Return the cache entry of a feed.
+
+        Args:
+            url (str): URL of the feed
+
+        Returns:
+            Optional[Dict]: Entry with etag, last_modified, size and elapsed, or None if unknown or expired
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+
+        if not entry:
+            return None
+        if time.time() - entry.get('stored_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Build the If-None-Match / If-Modified-Since headers for a feed."""
+        entry = self.get(url)
+        headers = {}
+
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str],
+               size: int, elapsed: float):
+        """
+        Store the validators of a freshly downloaded feed.
+
+        Args:
+            url (str): URL of the feed
+            etag (Optional[str]): ETag response header
+            last_modified (Optional[str]): Last-Modified response header
+            size (int): Size of the downloaded document in bytes
+            elapsed (float): Seconds the full download took
+        """
+        with self._lock:
+            if not etag and not last_modified:
+                # Nothing to validate against next time
+                self._entries.pop(url, None)
+                return
+
+            self._entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': size,
+                'elapsed': elapsed,
+                'stored_at': time.time()
+            }
+
+    def touch(self, url: str):
+        """
+        Mark the entry of a feed as confirmed, e.g. after the server answered 304.
+
+        Args:
+            url (str): URL of the feed
+        """
+        with self._lock:
+            if url in self._entries:
+                self._entries[url]['stored_at'] = time.time()
+
+    def invalidate(self, url: str = None):
+        """
+        Drop cache entries so the next run downloads the feeds in full.
+
+        Args:
+            url (str): URL of the feed to drop. If None, the whole cache is cleared
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
+
+    def save(self, file_path: str = None):
+        """
+        Write the cache to disk atomically.
+
+        Args:
+            file_path (str): File to write instead of the file the cache was loaded from
+        """
+        file_path = file_path or self.file_path
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = f"{file_path}.tmp"
+        with self._lock:
+            with open(temp_file, 'w') as f:
+                json.dump(self._entries, f)
+        os.replace(temp_file, file_path)
+
+        if self.verbose:
+            self.logger.info(f"Saved feed cache with {len(self._entries)} entries to {file_path}")
@@ -10,23 +10,97 @@ Contributor: claude.ai
 License: MIT
 """
 # src/feed_reader.py
-import feedparser
 import logging
-from typing import List, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List
 from datetime import datetime
+from urllib.parse import urlparse
+from src.feed_cache import FeedCache
+from src.metrics import RunMetrics, DISABLED
+from src.seen_index import SeenIndex, entry_key
+from src.stream_parser import FeedStreamParser
+from src.text_normalizer import TextNormalizer, clean_text
+
+if TYPE_CHECKING:
+    # httpx and feedparser are imported once the reader creates its client
+    import httpx
+
+# Shared by all readers, so texts normalized once are remembered
+_default_normalizer = None
+
+def default_normalizer() -> TextNormalizer:
+    """Return the shared TextNormalizer, creating it on first use."""
+    global _default_normalizer
+    if _default_normalizer is None:
+        _default_normalizer = TextNormalizer()
+    return _default_normalizer
+
+def structure_entry(entry, feed_title: str, normalizer: TextNormalizer = None) -> Dict:
+    """
+    Reduce a feedparser entry to the fields sent to the AI.
+    
+    Args:
+        entry: Entry parsed by feedparser
+        feed_title (str): Title of the feed the entry belongs to
+        normalizer (TextNormalizer): Cleans and truncates the description, the shared one if None
+        
+    Returns:
+        Dict: Entry with title, description, published, link and feed_title
+    """
+    normalizer = normalizer or default_normalizer()
+    return {
+        'title': clean_text(entry.get('title', '')),
+        'description': normalizer.normalize(entry.get('description', '')),  # Plain text within the token budget
+        'published': entry.get('published', ''),
+        'link': entry.get('link', ''),
+        'feed_title': feed_title
+    }
 
 class FeedReader:
     """Component for reading RSS feeds."""
     
-    def __init__(self, feed_urls: List[str], verbose: bool = False):
+    def __init__(self, feed_urls: List[str], verbose: bool = False,
+                 max_workers: int = 8, per_host_limit: int = 2, timeout: float = 20.0,
+                 cache: FeedCache = None, seen_index: SeenIndex = None,
+                 client: 'httpx.Client' = None, normalizer: TextNormalizer = None, metrics: RunMetrics = None,
+                 max_bytes: int = None, stream_parse: bool = False):
         """
         Initialize FeedReader.
         
         Args:
-            feed_urls (List[str]): List of URLs to RSS feeds
+            feed_urls (Iterable[str]): List of URLs to RSS feeds, or an iterator read while fetching
             verbose (bool): Enable verbose logging
+            max_workers (int): Number of feeds fetched concurrently (1 fetches sequentially)
+            per_host_limit (int): Maximum concurrent requests against the same host
+            timeout (float): Network timeout per feed in seconds
+            cache (FeedCache): Optional ETag/Last-Modified cache for conditional requests
+            seen_index (SeenIndex): Optional index of entries processed by earlier runs
+            client (httpx.Client): Shared HTTP client. If None, a pooled client is created
+            normalizer (TextNormalizer): Cleans and truncates descriptions. If None, the shared one is used
+            metrics (RunMetrics): Records download, parse and normalize times, bytes and entries per feed
+            max_bytes (int): Bytes read per feed at most, the entries in the first max_bytes are kept
+            stream_parse (bool): Parse feeds while downloading them, keeping only today's entries
+                and stopping once a feed sorted newest first reaches older ones
         """
         self.verbose = verbose
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.cache = cache
+        self.seen_index = seen_index
+        self.normalizer = normalizer
+        self.metrics = metrics or DISABLED
+        self.max_bytes = max_bytes
+        self.stream_parse = stream_parse
+        self.new_keys = []
+        self.feed_stats = {}
+        self._owns_client = client is None
+        self.client = client or self._create_client()
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
         
         if verbose:
@@ -42,9 +116,9 @@ class FeedReader:
         self.feed_urls = []
         self._validate_urls(feed_urls)
 
-    def _validate_urls(self, urls: List[str]):
+    def _validate_urls(self, urls: Iterable[str]):
         """Validate and store URLs."""
-        if self.verbose:
+        if self.verbose and isinstance(urls, list):
             self.logger.info(f"Validating {len(urls)} URLs")
         
         self.feed_urls = urls
@@ -63,70 +137,354 @@ class FeedReader:
                 self.logger.debug(f"Date parsing error: {str(e)}")
             return False
 
-    def fetch_feeds(self) -> List[Dict]:
+    def _create_client(self) -> 'httpx.Client':
+        """Create one pooled client reused for all feeds, keeping connections alive between them."""
+        import feedparser
+        import httpx
+        return httpx.Client(
+            http2=True,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_workers,
+                                max_keepalive_connections=self.max_workers),
+            # httpx decodes gzip, deflate and brotli responses transparently
+            headers={'User-Agent': feedparser.USER_AGENT,
+                     'Accept-Encoding': 'gzip, deflate, br'}
+        )
+
+    def close(self):
+        """Close the HTTP client if it was created by this reader."""
+        if self._owns_client:
+            self.client.close()
+
+    def _host_semaphore(self, url: str) -> threading.Semaphore:
+        """Return the semaphore limiting concurrent requests to the host of url."""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    @staticmethod
+    def _tracer(phases: Dict[str, float]):
+        """
+        Create an httpx trace callback measuring the phases of a request.
+        
+        Connecting includes the DNS lookup. Phases of a reused connection are missing.
+        
+        Args:
+            phases (Dict[str, float]): Filled with the seconds of connect, tls and wait (time to the response headers)
         """
-        Fetch and parse RSS feeds, filtering for today's entries only.
+        names = {'connection.connect_tcp': 'connect', 'connection.start_tls': 'tls',
+                 'http11.receive_response_headers': 'wait', 'http2.receive_response_headers': 'wait'}
+        started = {}
         
+        def trace(event: str, info: Dict):
+            operation, _, state = event.rpartition('.')
+            if operation not in names:
+                return
+            if state == 'started':
+                started[operation] = time.perf_counter()
+            elif state == 'complete' and operation in started:
+                phases[names[operation]] = round(time.perf_counter() - started.pop(operation), 4)
+        return trace
+
+    def _download(self, url: str, headers: Dict[str, str] = None, parser: FeedStreamParser = None) -> Dict:
+        """
+        Download the raw feed document within the per-feed timeout and byte cap.
+        
+        The timeout applies to the whole download, so a server trickling
+        bytes cannot hold a worker for longer than that. Reading stops after
+        max_bytes, leaving a truncated document. With a parser, the chunks are
+        parsed as they arrive instead of being kept, and reading stops as soon
+        as the parser needs no more of them.
+        
+        Args:
+            url (str): URL of the feed
+            headers (Dict[str, str]): Additional request headers, e.g. conditional GET validators
+            parser (FeedStreamParser): Parser fed with the chunks of the document
+            
         Returns:
-            List[Dict]: List of feed entries with standardized structure
+            Dict: status, content (empty when parsed while downloading), size, truncated,
+                etag and last_modified of the response, the seconds spent parsing, and
+                the measured phases of the request if metrics are enabled
+            
+        Raises:
+            TimeoutError: If the download takes longer than the timeout
         """
-        all_entries = []
-        total_entries = 0
-        today_entries = 0
+        deadline = time.monotonic() + self.timeout
+        phases = {}
+        extensions = {'trace': self._tracer(phases)} if self.metrics.enabled else None
         
-        if self.verbose:
-            self.logger.info(f"Starting to fetch {len(self.feed_urls)} feeds")
+        with self.client.stream('GET', url, headers=headers, timeout=self.timeout,
+                                extensions=extensions) as response:
+            if response.status_code == 304:
+                return {'status': 304, 'content': b'', 'size': 0, 'truncated': False,
+                        'etag': None, 'last_modified': None, 'phases': phases}
+            
+            response.raise_for_status()
+            
+            chunks = []
+            size = 0
+            truncated = False
+            parse_seconds = 0.0
+            for chunk in response.iter_bytes():
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Feed took longer than {self.timeout}s: {url}")
+                if self.max_bytes and size + len(chunk) > self.max_bytes:
+                    chunk = chunk[:self.max_bytes - size]
+                    truncated = True
+                size += len(chunk)
+                
+                if parser is None:
+                    chunks.append(chunk)
+                else:
+                    start = time.monotonic()
+                    with self.metrics.stage('parse'):
+                        parser.feed(chunk)
+                    parse_seconds += time.monotonic() - start
+                    if parser.done:
+                        break
+                if truncated:
+                    break
+            else:
+                if parser is not None:
+                    parser.close()
+            
+            return {
+                'status': response.status_code,
+                'content': b''.join(chunks),
+                'size': size,
+                'truncated': truncated,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_type': response.headers.get('Content-Type'),
+                'parse_seconds': parse_seconds,
+                'phases': phases
+            }
+
+    def _fetch_feed(self, url: str) -> Dict:
+        """
+        Fetch and parse a single feed, keeping today's entries only.
+        
+        Args:
+            url (str): URL of the RSS feed
+            
+        Returns:
+            Dict: Structured entries of the feed and the number of entries seen
+        """
+        result = {'url': url, 'entries': [], 'keys': [], 'total': 0, 'not_modified': False,
+                  'saved_bytes': 0, 'saved_seconds': 0.0}
         
-        for url in self.feed_urls:
-            try:
+        try:
+            if self.verbose:
+                self.logger.info(f"Fetching feed: {url}")
+            
+            headers = self.cache.request_headers(url) if self.cache else {}
+            parser = FeedStreamParser(self._is_from_today) if self.stream_parse else None
+            with self._host_semaphore(url):
+                start = time.monotonic()
+                with self.metrics.stage('download'):
+                    response = self._download(url, headers, parser) if parser else self._download(url, headers)
+                elapsed = time.monotonic() - start
+            size = response.get('size', len(response['content']))
+            self.metrics.feed(url, status=response['status'], download_seconds=round(elapsed, 4),
+                              bytes=size, **response.get('phases', {}))
+            self.metrics.count('bytes_downloaded', size)
+            
+            if response['status'] == 304 and self.cache:
+                # Unchanged since the last run, nothing to parse
+                cached = self.cache.get(url) or {}
+                self.cache.touch(url)
+                result['not_modified'] = True
+                result['saved_bytes'] = cached.get('size', 0)
+                result['saved_seconds'] = max(0.0, cached.get('elapsed', 0.0) - elapsed)
                 if self.verbose:
-                    self.logger.info(f"Fetching feed: {url}")
-                
-                feed = feedparser.parse(url)
-                feed_title = feed.feed.get('title', 'Unknown Feed')
-                
-                feed_total = len(feed.entries)
-                total_entries += feed_total
-                feed_today = 0
-                
+                    self.logger.info(f"Feed not modified since last run: {url}")
+                return result
+            
+            if self.cache:
+                self.cache.update(url, response['etag'], response['last_modified'], size, elapsed)
+            if response.get('truncated'):
+                self.metrics.count('feeds_truncated')
+                self.logger.warning(f"Feed larger than {self.max_bytes} bytes, only its beginning is read: {url}")
+            
+            if parser is not None and parser.error is not None:
+                # Not well-formed XML, feedparser's lenient parsing still gets the entries of most such feeds
                 if self.verbose:
-                    self.logger.info(f"Found {feed_total} total entries in {feed_title}")
-                
-                for entry in feed.entries:
+                    self.logger.info(f"Falling back to feedparser for {url}: {parser.error}")
+                self.metrics.count('feeds_stream_fallback')
+                with self._host_semaphore(url):
+                    response = self._download(url)
+                parser = None
+            
+            if parser is not None:
+                self.metrics.feed(url, parse_seconds=round(response['parse_seconds'], 4))
+                feed_title = parser.feed_title or 'Unknown Feed'
+                entries = parser.entries
+                feed_total = parser.total
+                if parser.finished:
+                    self.metrics.count('feeds_stopped_early')
+                    if self.verbose:
+                        self.logger.info(f"Stopped reading {feed_title} at entries older than today")
+            else:
+                # Hand the bytes to feedparser, passing the content type for charset detection
+                response_headers = {}
+                if response.get('content_type'):
+                    response_headers['content-type'] = response['content_type']
+                import feedparser
+                start = time.monotonic()
+                with self.metrics.stage('parse'):
+                    feed = feedparser.parse(response['content'], response_headers=response_headers)
+                self.metrics.feed(url, parse_seconds=round(time.monotonic() - start, 4))
+                feed_title = feed.feed.get('title', 'Unknown Feed')
+                entries = feed.entries
+                feed_total = len(entries)
+            result['total'] = feed_total
+            
+            if self.verbose:
+                self.logger.info(f"Found {feed_total} total entries in {feed_title}")
+            
+            with self.metrics.stage('normalize'):
+                for entry in entries:
                     # Filter for today's entries
                     if not self._is_from_today(entry):
                         continue
                     
-                    feed_today += 1
-                    today_entries += 1
-                    
-                    structured_entry = {
-                        'title': entry.get('title', ''),
-                        'description': entry.get('description', '')[:200],  # Truncate to 200 chars
-                        'published': entry.get('published', ''),
-                        'link': entry.get('link', ''),
-                        'feed_title': feed_title
-                    }
-                    all_entries.append(structured_entry)
+                    structured_entry = structure_entry(entry, feed_title, self.normalizer)
+                    result['entries'].append(structured_entry)
+                    result['keys'].append(entry_key(entry))
                     
                     if self.verbose:
                         self.logger.debug(f"Added entry: {structured_entry['title']}")
+            self.metrics.feed(url, total=feed_total, entries=len(result['entries']))
+            self.metrics.count('entries_parsed', feed_total)
+            
+            if self.verbose:
+                if not result['entries']:
+                    self.logger.warning(f"No entries from today found in {feed_title}")
+                else:
+                    self.logger.info(f"Found {len(result['entries'])} entries from today in {feed_title}")
                 
-                if self.verbose:
-                    if feed_today == 0:
-                        self.logger.warning(f"No entries from today found in {feed_title}")
-                    else:
-                        self.logger.info(f"Found {feed_today} entries from today in {feed_title}")
-                    
-            except Exception as e:
-                if self.verbose:
-                    self.logger.error(f"Error fetching feed {url}: {str(e)}")
-                continue
+        except Exception as e:
+            self.metrics.feed(url, error=type(e).__name__)
+            self.metrics.count('feed_errors')
+            if self.verbose:
+                self.logger.error(f"Error fetching feed {url}: {str(e)}")
+        
+        return result
+
+    def fetch_feeds(self) -> List[Dict]:
+        """
+        Fetch and parse RSS feeds concurrently, filtering for today's entries only.
+        
+        Feeds are downloaded by a thread pool of max_workers threads with at most
+        per_host_limit requests per host. Entries are returned in the order of the
+        feed URLs, regardless of which feed finished first. With a seen index,
+        entries processed by earlier runs are left out. Call mark_seen() and
+        save_cache() once the returned entries have been processed, so a failed
+        run fetches them again.
+        
+        Returns:
+            List[Dict]: List of feed entries with standardized structure
+        """
+        return list(self.iter_entries())
+
+    def _fetch_ahead(self, executor: ThreadPoolExecutor, urls: Iterable[str]) -> Iterator[Dict]:
+        """Submit feeds while earlier results are consumed, yielding the results in URL order."""
+        pending = deque()
+        for url in urls:
+            pending.append(executor.submit(self._fetch_feed, url))
+            # Bounded, so finished feeds do not pile up while the consumer is busy
+            if len(pending) >= 2 * self.max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def iter_entries(self, urls: Iterable[str] = None) -> Iterator[Dict]:
+        """
+        Yield today's new entries feed by feed, while the other feeds are still downloading.
+        
+        Works like fetch_feeds(), but the entries of a feed are handed on as soon as
+        it and all feeds before it are parsed. The summary is logged once the last
+        feed was consumed. The keys of the new entries of every feed are kept in
+        feed_stats.
+        
+        Args:
+            urls (Iterable[str]): Feed URLs, e.g. URLFileParser.iter_urls(). Defaults to the URLs of the reader
+            
+        Returns:
+            Iterator[Dict]: Feed entries with standardized structure, in the order of the feed URLs
+        """
+        urls = self.feed_urls if urls is None else urls
+        total_entries = 0
+        today_entries = 0
+        seen_entries = 0
+        self.new_keys = []
+        self.feed_stats = {}
+        run_keys = set()
+        not_modified = 0
+        saved_bytes = 0
+        saved_seconds = 0.0
+        
+        if self.verbose:
+            if isinstance(urls, list):
+                self.logger.info(f"Starting to fetch {len(urls)} feeds")
+            else:
+                self.logger.info("Starting to fetch feeds")
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in self._fetch_ahead(executor, urls):
+                total_entries += result['total']
+                today_entries += len(result['entries'])
+                
+                already_seen = set()
+                if self.seen_index is not None:
+                    already_seen = self.seen_index.seen_keys(result['keys'])
+                
+                feed_keys = []
+                for entry, key in zip(result['entries'], result['keys']):
+                    if key and (key in already_seen or key in run_keys):
+                        seen_entries += 1
+                        continue
+                    run_keys.add(key)
+                    feed_keys.append(key)
+                    self.new_keys.append(key)
+                    yield entry
+                self.feed_stats[result['url']] = {'keys': feed_keys, 'not_modified': result['not_modified']}
+                if result['not_modified']:
+                    not_modified += 1
+                    saved_bytes += result['saved_bytes']
+                    saved_seconds += result['saved_seconds']
+        
+        self.metrics.count('feeds', len(self.feed_stats))
+        self.metrics.count('feeds_not_modified', not_modified)
+        self.metrics.count('entries_today', today_entries)
+        self.metrics.count('entries_new', len(self.new_keys))
         
         if self.verbose:
             self.logger.info(f"Feed processing summary:")
             self.logger.info(f"Total entries across all feeds: {total_entries}")
             self.logger.info(f"Entries from today: {today_entries}")
             self.logger.info(f"Filtered out {total_entries - today_entries} older entries")
-                
-        return all_entries
\ No newline at end of file
+            if self.seen_index is not None:
+                self.logger.info(f"Skipped {seen_entries} entries already seen")
+            if self.cache:
+                self.logger.info(f"Feeds not modified: {not_modified} "
+                                 f"(saved {saved_bytes/1024:.1f}KB and {saved_seconds:.1f}s)")
+
+    def mark_seen(self):
+        """Record the entries returned by the last fetch_feeds() call in the seen index."""
+        if self.seen_index is not None:
+            self.seen_index.mark_seen(self.new_keys)
+
+    def save_cache(self):
+        """Persist the validators of the last fetch_feeds() call, so unchanged feeds get a 304 next time."""
+        if not self.cache:
+            return
+        
+        try:
+            self.cache.save()
+        except OSError as e:
+            if self.verbose:
+                self.logger.error(f"Could not save feed cache: {str(e)}")
@@ -0,0 +1,102 @@
+"""
+Markdown renderer
+
+Builds the Markdown summary locally from the structured per-entry
+analysis, so the model does not have to re-type titles and links.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/markdown_renderer.py
+from datetime import datetime
+from typing import Dict, List, Optional
+
+def _text(value) -> str:
+    """A text field of a result, '' if the model returned null, a list or an object."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return ''
+    return str(value).strip()
+
+def normalize_result(result) -> Optional[Dict]:
+    """
+    Coerce the analysis of an entry to the expected types, as the model may return
+    e.g. the relevance "7" or a null analysis.
+
+    Args:
+        result: Analysis of an entry as returned by the model or the cache
+
+    Returns:
+        Optional[Dict]: Result with a numeric relevance and text category, cluster and
+            analysis, None if the result is not an object
+    """
+    if not isinstance(result, dict):
+        return None
+    try:
+        relevance = float(result.get('relevance') or 0)
+    except (TypeError, ValueError):
+        relevance = 0.0
+    return {**result, 'relevance': relevance, 'category': _text(result.get('category')),
+            'cluster': _text(result.get('cluster')), 'analysis': _text(result.get('analysis'))}
+
+def render_markdown(entries: List[Dict], results: List[Optional[Dict]], summary: str = None,
+                    min_relevance: int = 5, date: datetime = None) -> str:
+    """
+    Render the news summary from the entries and their analysis.
+
+    Args:
+        entries (List[Dict]): Feed entries as returned by FeedReader
+        results (List[Optional[Dict]]): Analysis per entry (relevance, category, analysis, cluster),
+            in the order of the entries. None for entries without a result
+        summary (str): Executive summary written by the model, if any
+        min_relevance (int): Entries rated below this relevance (0-10) are left out
+        date (datetime): Date shown in the title, defaults to today
+
+    Returns:
+        str: Markdown document
+    """
+    date = date or datetime.now()
+
+    # category -> cluster -> [(entry, result)], keeping the first-seen order
+    categories = {}
+    for entry, result in zip(entries, results):
+        result = normalize_result(result)
+        if not result or result['relevance'] < min_relevance:
+            continue
+        category = result.get('category') or 'Other'
+        cluster = result.get('cluster') or entry.get('link') or entry.get('title')
+        categories.setdefault(category, {}).setdefault(cluster, []).append((entry, result))
+
+    story_count = sum(len(items) for clusters in categories.values() for items in clusters.values())
+
+    lines = [f"# AI News Summary - {date.strftime('%Y-%m-%d')}", "", "## Executive Summary", ""]
+    if summary:
+        lines.append(summary.strip())
+    else:
+        lines.append(f"{story_count} relevant stories in {len(categories)} categories.")
+
+    if not categories:
+        lines += ["", "No relevant AI, ML or LLM news today."]
+
+    # Largest categories first
+    for category, clusters in sorted(categories.items(), key=lambda item: -sum(map(len, item[1].values()))):
+        lines += ["", "---", "", f"## {category}"]
+
+        for items in clusters.values():
+            items.sort(key=lambda item: -item[1]['relevance'])
+            entry, result = items[0]
+            lines += ["", f"### [{entry.get('title', '')}]({entry.get('link', '')})",
+                      f"*{entry.get('feed_title', '')}*", "", result['analysis']]
+
+            # Further coverage of the same story, including merged duplicates of each entry
+            related = []
+            for item, _ in items:
+                if item is not entry:
+                    related.append(f"- [{item.get('title', '')}]({item.get('link', '')}) ({item.get('feed_title', '')})")
+                related += [f"- [{source.get('feed_title', '')}]({source.get('link', '')})"
+                            for source in item.get('sources', []) if source.get('link') != item.get('link')]
+            if related:
+                lines += ["", "Related coverage:"] + related
+
+    return "\n".join(lines) + "\n"
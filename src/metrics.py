@@ -0,0 +1,209 @@
+"""
+Run metrics
+
+Collects how long each stage of a run took, per-feed download and parse
+measurements, counters like bytes and entries, and the token usage of
+every OpenAI request. The results are written as a JSON run report and
+as a Prometheus textfile for the node exporter.
+
+Stage times are exclusive: time spent in a stage nested inside another,
+e.g. fetching feeds while the analysis consumes the entries, only counts
+for the inner stage. Stages running in worker threads are summed over
+the threads, so they can add up to more than the wall time of the run.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/metrics.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List
+
+if TYPE_CHECKING:
+    from src.profiler import StageProfiler
+
+PREFIX = 'newspipe'
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _write_atomic(path: str, text: str):
+    """Write a file in one step, so readers like the node exporter never see half of it."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_file, path)
+
+class RunMetrics:
+    """Thread-safe collector of the timings, counters and token usage of one run."""
+
+    def __init__(self, run_id: str = None, enabled: bool = True, profiler: 'StageProfiler' = None):
+        """
+        Initialize RunMetrics.
+
+        Args:
+            run_id (str): Name of the run in the report, defaults to the start time
+            enabled (bool): If False, nothing is recorded
+            profiler (StageProfiler): Optional profiler scoped to the same stages
+        """
+        self.started = time.time()
+        self.run_id = run_id or datetime.fromtimestamp(self.started).strftime('%Y%m%d_%H%M%S')
+        self.enabled = enabled
+        self.profiler = profiler
+        self.stages = {}     # Stage name -> seconds and calls
+        self.counters = {}   # Counter name -> value
+        self.feeds = {}      # Feed URL -> measurements
+        self.requests = []   # One record per OpenAI request
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a stage, excluding the time of stages nested inside it on the same thread.
+
+        Args:
+            name (str): Name of the stage
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [time.perf_counter(), 0.0]  # Start, time of nested stages
+        stack.append(frame)
+        try:
+            with self.profiler.stage(name) if self.profiler is not None else nullcontext():
+                yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            if stack:
+                stack[-1][1] += elapsed
+            with self._lock:
+                stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                stage['seconds'] += elapsed - frame[1]
+                stage['calls'] += 1
+
+    def iter_stage(self, iterable: Iterable, name: str) -> Iterator:
+        """
+        Charge the time spent producing the items of a lazy pipeline stage to that stage.
+
+        Args:
+            iterable (Iterable): Items of the stage, e.g. a generator
+            name (str): Name of the stage
+
+        Yields:
+            The items, unchanged
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, value: float = 1):
+        """Add to a counter, e.g. count('bytes_downloaded', 1024)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def feed(self, url: str, **values):
+        """Record measurements of a feed, e.g. feed(url, download_seconds=0.4, entries=12)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.feeds.setdefault(url, {}).update(values)
+
+    def request(self, **values):
+        """Record an OpenAI request with its duration and token usage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.requests.append(values)
+
+    def report(self) -> Dict:
+        """
+        Summarize the run.
+
+        Returns:
+            Dict: Run id, start, duration, stages, counters, feeds and requests
+        """
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'duration_seconds': round(time.time() - self.started, 3),
+                'stages': {name: {'seconds': round(stage['seconds'], 4), 'calls': stage['calls']}
+                           for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds'])},
+                'counters': dict(self.counters),
+                'feeds': {url: dict(values) for url, values in self.feeds.items()},
+                'requests': list(self.requests)
+            }
+
+    def write_json(self, path: str):
+        """Write the run report as JSON."""
+        _write_atomic(path, json.dumps(self.report(), indent=2))
+
+    def prometheus(self) -> str:
+        """
+        Format the run in the Prometheus text exposition format.
+
+        Returns:
+            str: Gauges of the last run, for the textfile collector of the node exporter
+        """
+        report = self.report()
+        lines = []
+
+        def gauge(name: str, help_text: str, samples: List):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+        gauge('last_run_timestamp_seconds', "Start of the last run", [({}, round(self.started, 3))])
+        gauge('run_duration_seconds', "Wall time of the last run", [({}, report['duration_seconds'])])
+        gauge('stage_seconds', "Exclusive time per stage of the last run, summed over threads",
+              [({'stage': name}, stage['seconds']) for name, stage in report['stages'].items()])
+        for name, value in sorted(report['counters'].items()):
+            gauge(name, f"{name.replace('_', ' ').capitalize()} in the last run", [({}, value)])
+
+        for key in ('download_seconds', 'parse_seconds', 'bytes', 'entries'):
+            samples = [({'feed': url}, values[key]) for url, values in report['feeds'].items() if key in values]
+            if samples:
+                gauge(f"feed_{key}", f"{key.replace('_', ' ').capitalize()} per feed in the last run", samples)
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write the Prometheus textfile, e.g. /var/lib/node_exporter/textfile/newspipe.prom."""
+        _write_atomic(path, self.prometheus())
+
+    def summary(self, limit: int = 6) -> str:
+        """One line with the slowest stages, for the log."""
+        stages = self.report()['stages']
+        return ', '.join(f"{name} {stage['seconds']:.2f}s" for name, stage in list(stages.items())[:limit])
+
+# Used by components without metrics, records nothing
+DISABLED = RunMetrics(run_id='disabled', enabled=False)
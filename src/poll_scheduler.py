@@ -0,0 +1,126 @@
+"""
+Poll scheduler
+
+Learns how often every feed publishes new entries and decides when it
+is polled next: busy feeds are polled often, quiet feeds back off.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/poll_scheduler.py
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+class PollScheduler:
+    """Adaptive per-feed polling intervals, stored between restarts."""
+
+    def __init__(self, file_path: str = None, min_interval: float = 5 * 60, max_interval: float = 6 * 3600,
+                 backoff: float = 1.5, smoothing: float = 0.3, verbose: bool = False):
+        """
+        Initialize PollScheduler.
+
+        Args:
+            file_path (str): JSON file keeping the learned intervals. If None, nothing is stored
+            min_interval (float): Shortest time between two polls of a feed in seconds
+            max_interval (float): Longest time between two polls of a feed in seconds
+            backoff (float): Factor the interval grows by after a poll without new entries
+            smoothing (float): Weight of the latest gap in the moving average of the update gaps
+            verbose (bool): Enable verbose logging
+        """
+        self.file_path = file_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self._feeds = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """Load the stored intervals, starting empty if the file is missing or broken."""
+        if not self.file_path or not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if self.verbose:
+                self.logger.warning(f"Ignoring unreadable poll state {self.file_path}: {str(e)}")
+            return {}
+
+    def _clamp(self, interval: float) -> float:
+        """Keep an interval between min_interval and max_interval."""
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def due(self, urls: Iterable[str], now: float = None) -> List[str]:
+        """
+        Return the feeds that should be polled now.
+
+        Args:
+            urls (Iterable[str]): All feed URLs
+            now (float): Current time as a Unix timestamp
+
+        Returns:
+            List[str]: URLs whose next poll time has passed, including feeds never polled
+        """
+        now = time.time() if now is None else now
+        return [url for url in urls if self._feeds.get(url, {}).get('next_poll', 0) <= now]
+
+    def next_poll(self, urls: Iterable[str]) -> Optional[float]:
+        """Time of the earliest next poll of the feeds, None without feeds."""
+        times = [self._feeds.get(url, {}).get('next_poll', 0) for url in urls]
+        return min(times) if times else None
+
+    def interval(self, url: str) -> float:
+        """Current polling interval of a feed in seconds."""
+        return self._feeds.get(url, {}).get('interval', self.min_interval)
+
+    def record(self, url: str, changed: bool, now: float = None):
+        """
+        Update the interval of a feed after it was polled.
+
+        A feed with new entries is polled at half its average gap between updates,
+        so a new entry waits at most about half a gap. A feed without new entries
+        backs off by the backoff factor.
+
+        Args:
+            url (str): URL of the feed
+            changed (bool): Whether the poll found new entries
+            now (float): Time of the poll as a Unix timestamp
+        """
+        now = time.time() if now is None else now
+        feed = self._feeds.setdefault(url, {'interval': self.min_interval, 'mean_gap': None, 'last_change': None})
+
+        if changed:
+            if feed['last_change'] is not None:
+                gap = now - feed['last_change']
+                mean_gap = feed['mean_gap']
+                feed['mean_gap'] = gap if mean_gap is None else (1 - self.smoothing) * mean_gap + self.smoothing * gap
+            feed['last_change'] = now
+            feed['interval'] = self._clamp(feed['mean_gap'] / 2 if feed['mean_gap'] else self.min_interval)
+        else:
+            feed['interval'] = self._clamp(feed['interval'] * self.backoff)
+
+        feed['next_poll'] = now + feed['interval']
+        if self.verbose:
+            self.logger.debug(f"Next poll of {url} in {feed['interval'] / 60:.0f} minutes")
+
+    def save(self):
+        """Write the learned intervals to disk atomically."""
+        if not self.file_path:
+            return
+
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file = f"{self.file_path}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self._feeds, f)
+        os.replace(temp_file, self.file_path)
@@ -0,0 +1,269 @@
+"""
+Stage profiler
+
+Profiles a run per pipeline stage with cProfile, tracemalloc or both,
+using the stages of RunMetrics: reading URLs, downloading, parsing and
+normalizing feeds, prompt building, API calls, saving and so on.
+
+Like the stage timings, CPU profiles are exclusive: while a nested stage
+runs, only its profile is active. Every thread has its own profiles,
+which are merged per stage when they are written. From Python 3.12 on,
+cProfile is built on sys.monitoring, which allows only one active
+profiler per process: then only one thread is profiled at a time, and
+stages entered on other threads meanwhile are counted but not profiled.
+As sys.monitoring is process-wide, their calls may still show up in the
+profile of the stage that is running.
+
+Tracing memory is expensive, so tracemalloc only runs while one of the
+first calls of a stage is in progress, and reports the memory allocated
+during such a call and still held at its end. tracemalloc traces all
+threads, so allocations of stages running concurrently show up in each
+other's reports, and the report of a stage includes the stages nested
+in it.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/profiler.py
+import cProfile
+import io
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# pstats and tracemalloc load pickle and are only imported once a run is profiled
+if TYPE_CHECKING:
+    import pstats
+    import tracemalloc
+
+PROFILE_MODES = ('cpu', 'memory', 'all')
+
+# cProfile allows only one active profiler per process from Python 3.12 on
+SINGLE_PROFILER = sys.version_info >= (3, 12)
+
+class StageProfiler:
+    """Collects CPU profiles and allocation reports per pipeline stage."""
+
+    def __init__(self, mode: str = 'cpu', top: int = 25, memory_calls: int = 3, frames: int = 1,
+                 verbose: bool = False):
+        """
+        Initialize StageProfiler.
+
+        Args:
+            mode (str): 'cpu' for cProfile, 'memory' for tracemalloc or 'all' for both
+            top (int): Functions and source lines listed per stage in the text reports
+            memory_calls (int): Calls per stage traced by tracemalloc
+            frames (int): Frames stored per allocation by tracemalloc
+            verbose (bool): Enable verbose logging
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', use one of {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.cpu = mode in ('cpu', 'all')
+        self.memory = mode in ('memory', 'all')
+        self.top = top
+        self.memory_calls = memory_calls
+        self.frames = frames
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+
+        self._profiles = {}     # (stage, thread id) -> cProfile.Profile
+        self._skipped = {}      # Stage -> calls not profiled because another profiler was active
+        self._owner = None      # Thread profiling while only one profiler can be active
+        self._allocations = {}  # Stage -> calls, sampled calls and growth per source line
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._traced_calls = 0      # Traced stage calls in progress
+        self._owns_tracing = False  # Whether tracemalloc was started here rather than by PYTHONTRACEMALLOC
+
+    def _profile(self, name: str) -> cProfile.Profile:
+        """The profile of a stage on the current thread."""
+        key = (name, threading.get_ident())
+        with self._lock:
+            if key not in self._profiles:
+                self._profiles[key] = cProfile.Profile()
+            return self._profiles[key]
+
+    def _claim(self, name: str) -> Optional[cProfile.Profile]:
+        """The profile of a stage on the current thread, None if another thread holds the only profiler."""
+        thread = threading.get_ident()
+        with self._lock:
+            if SINGLE_PROFILER and self._owner not in (None, thread):
+                self._skipped[name] = self._skipped.get(name, 0) + 1
+                return None
+            self._owner = thread
+        return self._profile(name)
+
+    def _release(self):
+        """Let other threads profile once the current thread left its outermost stage."""
+        with self._lock:
+            if self._owner == threading.get_ident():
+                self._owner = None
+
+    def _begin_trace(self, name: str) -> Tuple[bool, Optional['tracemalloc.Snapshot']]:
+        """
+        Start tracing a stage call if the stage has calls left to trace.
+
+        Returns:
+            Tuple[bool, Optional[tracemalloc.Snapshot]]: Whether the call is traced, and the
+                memory traced before it, None if tracing starts with this call
+        """
+        import tracemalloc
+        with self._lock:
+            allocations = self._allocations.setdefault(name, {'calls': 0, 'traced': 0, 'lines': {}})
+            allocations['calls'] += 1
+            if allocations['traced'] >= self.memory_calls:
+                return False, None
+            allocations['traced'] += 1
+            self._traced_calls += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._owns_tracing = True
+                return True, None
+        # Other calls are traced as well, so only what changed since now belongs to this one
+        return True, tracemalloc.take_snapshot()
+
+    def _end_trace(self, name: str, before: Optional['tracemalloc.Snapshot']):
+        """Add the memory a traced stage call allocated and kept to the report of the stage."""
+        import tracemalloc
+        after = tracemalloc.take_snapshot()
+        if before is None:
+            growth = [(statistic.traceback, statistic.size, statistic.count)
+                      for statistic in after.statistics('lineno')]
+        else:
+            growth = [(diff.traceback, diff.size_diff, diff.count_diff)
+                      for diff in after.compare_to(before, 'lineno') if diff.size_diff > 0]
+
+        with self._lock:
+            lines = self._allocations[name]['lines']
+            for traceback, size, count in growth:
+                # Snapshots held by other traced calls are not part of the run
+                if traceback[0].filename in (tracemalloc.__file__, __file__):
+                    continue
+                line = lines.setdefault(str(traceback[0]), [0, 0])
+                line[0] += size
+                line[1] += count
+            self._traced_calls -= 1
+            if not self._traced_calls and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile a stage, pausing the profile of the enclosing stage on the same thread.
+
+        Args:
+            name (str): Name of the stage
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        # A thread can only run one profile at a time
+        if stack and stack[-1] is not None:
+            stack[-1].disable()
+        traced, before = self._begin_trace(name) if self.memory else (False, None)
+        profile = self._claim(name) if self.cpu else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiling tool like a debugger or coverage is active
+                with self._lock:
+                    self._skipped[name] = self._skipped.get(name, 0) + 1
+                profile = None
+        stack.append(profile)
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            stack.pop()
+            if traced:
+                self._end_trace(name, before)
+            if stack and stack[-1] is not None:
+                stack[-1].enable()
+            elif not stack:
+                self._release()
+
+    def _stage_stats(self) -> Dict[str, 'pstats.Stats']:
+        """CPU statistics per stage, merged over threads."""
+        import pstats
+        stats = {}
+        with self._lock:
+            profiles = list(self._profiles.items())
+        for (name, _), profile in profiles:
+            if name in stats:
+                stats[name].add(profile)
+            else:
+                stats[name] = pstats.Stats(profile)
+        return stats
+
+    def _memory_report(self) -> str:
+        """Text report of the source lines allocating the most memory per stage."""
+        parts = []
+        with self._lock:
+            allocations = sorted(self._allocations.items())
+        for name, stage in allocations:
+            lines: List[Tuple[str, List[int]]] = sorted(stage['lines'].items(), key=lambda item: -item[1][0])
+            kept = sum(size for size, _ in stage['lines'].values())
+            parts.append(f"== {name}: {stage['traced']} of {stage['calls']} calls traced, "
+                         f"{kept / 1024:.1f} KiB allocated and still held at their end ==")
+            for location, (size, count) in lines[:self.top]:
+                parts.append(f"{size / 1024:>12.1f} KiB {count:>+9} blocks  {location}")
+            parts.append('')
+        return '\n'.join(parts)
+
+    def dump(self, directory: str) -> List[str]:
+        """
+        Write the profiles.
+
+        Writes <stage>.prof per stage, readable with pstats or snakeviz, cpu.txt with the
+        functions taking the most time per stage, and memory.txt with the source lines
+        allocating the most memory per stage.
+
+        Args:
+            directory (str): Directory of the profile files, created if missing
+
+        Returns:
+            List[str]: Paths of the written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        files = []
+
+        if self.cpu:
+            report = io.StringIO()
+            with self._lock:
+                skipped = dict(self._skipped)
+            for name, stats in sorted(self._stage_stats().items()):
+                path = os.path.join(directory, f"{name}.prof")
+                stats.dump_stats(path)
+                files.append(path)
+                report.write(f"\n== {name} ==\n")
+                if skipped.get(name):
+                    report.write(f"{skipped[name]} calls not profiled while another thread was profiled\n")
+                stats.stream = report
+                stats.sort_stats('tottime').print_stats(self.top)
+            path = os.path.join(directory, 'cpu.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
+            files.append(path)
+
+        if self.memory:
+            path = os.path.join(directory, 'memory.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._memory_report())
+            files.append(path)
+
+        if self.verbose:
+            self.logger.info(f"Wrote {len(files)} profile files to {directory}")
+        return files
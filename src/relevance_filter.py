@@ -0,0 +1,184 @@
+"""
+Relevance filter
+
+Scores the entries against a topic vocabulary before they are sent to
+OpenAI, so stories of general-purpose feeds that have nothing to do with
+AI do not cost any tokens.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/relevance_filter.py
+import itertools
+import logging
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, List
+import numpy as np
+from src.serializers import to_minified_json
+from src.token_counter import TokenCounter
+
+DEFAULT_VOCABULARY = [
+    'ai', 'artificial intelligence', 'machine learning', 'deep learning', 'neural network',
+    'llm', 'large language model', 'language model', 'generative', 'genai', 'chatbot',
+    'gpt', 'chatgpt', 'openai', 'anthropic', 'claude', 'gemini', 'deepmind', 'llama', 'mistral',
+    'hugging face', 'transformer', 'diffusion', 'agent', 'agents', 'copilot', 'inference',
+    'training', 'fine tuning', 'embedding', 'embeddings', 'rag', 'prompt', 'model weights',
+    'nvidia', 'gpu', 'computer vision', 'reinforcement learning', 'robotics', 'alignment'
+]
+
+# Number of hashed features, large enough to make collisions rare
+N_FEATURES = 2 ** 18
+
+# Title words count this many times as much as description words
+TITLE_WEIGHT = 2
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words and word pairs."""
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def _feature(token: str) -> int:
+    """Stable hash of a token into the feature space."""
+    return zlib.crc32(token.encode('utf-8')) % N_FEATURES
+
+class RelevanceFilter:
+    """TF-IDF scoring of entries against a topic vocabulary, using hashed features."""
+
+    def __init__(self, vocabulary: List[str] = None, threshold: float = 0.1, top_k: int = None,
+                 token_counter: TokenCounter = None, verbose: bool = False):
+        """
+        Initialize RelevanceFilter.
+
+        Args:
+            vocabulary (List[str]): Words and two-word phrases describing the topic
+            threshold (float): Minimum score (0-1) an entry needs to be kept
+            top_k (int): Keep at most this many entries, the best scoring first. None keeps all above the threshold
+            token_counter (TokenCounter): Counter used to report the saved tokens
+            verbose (bool): Enable verbose logging
+        """
+        self.vocabulary = vocabulary or DEFAULT_VOCABULARY
+        self.threshold = threshold
+        self.top_k = top_k
+        self.token_counter = token_counter or TokenCounter()
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self.dropped = []
+        self.dropped_tokens = 0
+        self.scores = []
+
+        # Phrases are matched as word pairs, so 'language model' does not match every 'model'
+        self._topic = np.zeros(N_FEATURES)
+        for term in self.vocabulary:
+            self._topic[_feature(' '.join(re.findall(r'[a-z0-9]+', term.lower())))] = 1.0
+
+    def score(self, entries: List[Dict]) -> np.ndarray:
+        """
+        Compute the relevance of every entry.
+
+        Args:
+            entries (List[Dict]): Feed entries with title and description
+
+        Returns:
+            np.ndarray: Share (0-1) of each entry's TF-IDF vector that lies on the vocabulary
+        """
+        if not entries:
+            return np.zeros(0)
+
+        rows, columns, weights = [], [], []
+        for row, entry in enumerate(entries):
+            for text, weight in ((entry.get('title', ''), TITLE_WEIGHT), (entry.get('description', ''), 1)):
+                features = [_feature(token) for token in tokenize(text)]
+                rows.extend([row] * len(features))
+                columns.extend(features)
+                weights.extend([weight] * len(features))
+
+        # Sparse term frequencies: one value per distinct (entry, feature) pair
+        pairs, inverse = np.unique(np.array(rows, dtype=np.int64) * N_FEATURES + np.array(columns, dtype=np.int64),
+                                   return_inverse=True)
+        frequencies = np.bincount(inverse, weights=np.array(weights, dtype=np.float64))
+        pair_rows, pair_columns = np.divmod(pairs, N_FEATURES)
+
+        # Smoothed inverse document frequency, as in scikit-learn, only of the features that occur
+        _, feature_index, document_frequency = np.unique(pair_columns, return_inverse=True, return_counts=True)
+        idf = np.log((1 + len(entries)) / (1 + document_frequency)) + 1
+        values = frequencies * idf[feature_index]
+
+        # Share of the entry's TF-IDF weight that falls on topic terms
+        squares = values ** 2
+        topic = np.bincount(pair_rows, weights=squares * self._topic[pair_columns], minlength=len(entries))
+        total = np.bincount(pair_rows, weights=squares, minlength=len(entries))
+        total[total == 0] = 1
+        return np.sqrt(topic / total)
+
+    def filter(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Keep the entries relevant to the topic, in their original order.
+
+        Args:
+            entries (List[Dict]): Feed entries
+
+        Returns:
+            List[Dict]: Entries scoring at least the threshold, at most top_k of them.
+                Their scores are kept in self.scores
+        """
+        scores = self.score(entries)
+        keep = scores >= self.threshold
+
+        if self.top_k is not None and np.count_nonzero(keep) > self.top_k:
+            # Stable sort, so ties keep the feed order
+            ranked = np.argsort(-scores, kind='stable')
+            keep = np.zeros(len(entries), dtype=bool)
+            keep[ranked[:self.top_k]] = scores[ranked[:self.top_k]] >= self.threshold
+
+        kept = [entry for entry, selected in zip(entries, keep) if selected]
+        self.scores = [float(score) for score, selected in zip(scores, keep) if selected]
+        self.dropped = [entry for entry, selected in zip(entries, keep) if not selected]
+        self.dropped_tokens = sum(self.token_counter.count(to_minified_json([entry])) for entry in self.dropped)
+
+        if self.verbose:
+            self.logger.info(f"Relevance filter kept {len(kept)} of {len(entries)} entries, "
+                             f"dropped {len(self.dropped)} entries (~{self.dropped_tokens} tokens)")
+        return kept
+
+    def iter_filter(self, entries: Iterable[Dict], batch_size: int = 32) -> Iterator[Dict]:
+        """
+        Keep the relevant entries of a stream, scoring them in small batches.
+
+        Document frequencies are taken from each batch, so scores differ slightly
+        from filter(), and top_k is not applied since it needs all entries.
+
+        Args:
+            entries (Iterable[Dict]): Feed entries
+            batch_size (int): Number of entries scored together
+
+        Returns:
+            Iterator[Dict]: Entries scoring at least the threshold, in their original order
+        """
+        self.scores = []
+        self.dropped = []
+        self.dropped_tokens = 0
+        total = 0
+
+        batch = []
+        for entry in itertools.chain(entries, [None]):
+            if entry is not None:
+                batch.append(entry)
+                if len(batch) < batch_size:
+                    continue
+
+            for item, score in zip(batch, self.score(batch)):
+                if score >= self.threshold:
+                    self.scores.append(float(score))
+                    yield item
+                else:
+                    self.dropped.append(item)
+                    self.dropped_tokens += self.token_counter.count(to_minified_json([item]))
+            total += len(batch)
+            batch = []
+
+        if self.verbose:
+            self.logger.info(f"Relevance filter kept {total - len(self.dropped)} of {total} entries, "
+                             f"dropped {len(self.dropped)} entries (~{self.dropped_tokens} tokens)")
@@ -0,0 +1,219 @@
+"""
+Request scheduler
+
+Runs several OpenAI requests in parallel while staying within the
+requests-per-minute and tokens-per-minute limits of the account.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/request_scheduler.py
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+# Errors worth another attempt, everything else is raised immediately
+RETRYABLE_ERRORS = (
+    'RateLimitError',
+    'APIConnectionError',  # Includes APITimeoutError
+    'InternalServerError'
+)
+
+def openai_errors(*names: str) -> Tuple[type, ...]:
+    """Look up openai exception classes by name, importing openai only once a request failed."""
+    import openai
+    return tuple(getattr(openai, name) for name in names)
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether another attempt of a failed request can succeed."""
+    if not isinstance(error, openai_errors(*RETRYABLE_ERRORS)):
+        return False
+    # An exhausted quota is reported as 429 too, but waiting does not help
+    return getattr(error, 'code', None) != 'insufficient_quota'
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Read the delay the server asked for from a rate limit error, in seconds."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+
+    try:
+        if response.headers.get('retry-after-ms'):
+            return float(response.headers['retry-after-ms']) / 1000
+        if response.headers.get('retry-after'):
+            return float(response.headers['retry-after'])
+    except ValueError:
+        # Retry-After can also be an HTTP date, fall back to backoff then
+        pass
+    return None
+
+class RequestScheduler:
+    """Schedules requests against per-minute request and token budgets."""
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: int = 500,
+                 tokens_per_minute: int = 10000, max_retries: int = 5,
+                 backoff: float = 1.0, window: float = 60.0, verbose: bool = False):
+        """
+        Initialize RequestScheduler.
+
+        Args:
+            max_concurrency (int): Maximum number of requests in flight
+            requests_per_minute (int): Request budget per window
+            tokens_per_minute (int): Token budget (prompt plus max completion tokens) per window
+            max_retries (int): Retries of a request after rate limits or transient errors
+            backoff (float): Base delay in seconds of the exponential backoff
+            window (float): Length of the budget window in seconds
+            verbose (bool): Enable verbose logging
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.window = window
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+
+        # [start time, tokens] of every request started within the window
+        self._started = deque()
+        self._running = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def _prune(self, now: float):
+        """Forget requests that left the budget window."""
+        while self._started and now - self._started[0][0] >= self.window:
+            self._started.popleft()
+
+    def _fits(self, tokens: int, now: float, retry: bool = False) -> bool:
+        """
+        Check whether a request of the given size may start now.
+
+        A retry already holds its concurrency slot, so only the budgets are checked for it.
+        """
+        others = self._running - 1 if retry else self._running
+        if now < self._paused_until or others >= self.max_concurrency:
+            return False
+        if not self._started and others == 0:
+            # Always let a lone request through, even if it is larger than the budget
+            return True
+
+        used_tokens = sum(started[1] for started in self._started)
+        return (len(self._started) < self.requests_per_minute
+                and used_tokens + tokens <= self.tokens_per_minute)
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        """Seconds until the budget changes without a request finishing."""
+        waits = []
+        if now < self._paused_until:
+            waits.append(self._paused_until - now)
+        if self._started:
+            waits.append(self._started[0][0] + self.window - now)
+        return max(0.0, min(waits)) if waits else None
+
+    def _reserve_retry(self, tokens: int) -> List:
+        """Wait until the budgets allow another attempt and charge it to the window."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if self._fits(tokens, now, retry=True):
+                    reservation = [now, tokens]
+                    self._started.append(reservation)
+                    return reservation
+                self._condition.wait(timeout=self._wait_time(now))
+
+    def _execute(self, call: Callable[[], Any], reservation: List, index: int,
+                 results: List, errors: dict):
+        """Run one request, retrying rate limits and transient errors with backoff."""
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    # Every attempt counts against the rate limits
+                    reservation = self._reserve_retry(reservation[1])
+                try:
+                    result = call()
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    delay = retry_after(e)
+                    if delay is None:
+                        delay = self.backoff * 2 ** attempt * (1 + random.random())
+                    if self.verbose:
+                        self.logger.warning(f"Request {index} failed ({type(e).__name__}), "
+                                            f"retrying in {delay:.1f}s")
+                    if isinstance(e, openai_errors('RateLimitError')):
+                        # Hold back every request, not just this one
+                        with self._condition:
+                            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    time.sleep(delay)
+
+            # Replace the estimate with the real usage so the budget is not over-reserved
+            usage = getattr(result, 'usage', None)
+            total_tokens = getattr(usage, 'total_tokens', None)
+            if isinstance(total_tokens, int):
+                with self._condition:
+                    reservation[1] = total_tokens
+
+            results[index] = result
+        except Exception as e:
+            errors[index] = e
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def run(self, requests: List[Tuple[Callable[[], Any], int]]) -> List[Any]:
+        """
+        Run requests concurrently within the budgets.
+
+        Whenever a slot is free, the first waiting request that fits into the
+        remaining token budget is started, so smaller requests fill the gaps
+        left by larger ones.
+
+        Args:
+            requests (List[Tuple[Callable[[], Any], int]]): Callables with their estimated token cost
+
+        Returns:
+            List[Any]: Results in the order of the requests
+
+        Raises:
+            Exception: The first error of a request that could not be completed
+        """
+        results = [None] * len(requests)
+        errors = {}
+        pending = list(range(len(requests)))
+
+        if self.verbose and len(requests) > 1:
+            self.logger.info(f"Scheduling {len(requests)} requests with up to {self.max_concurrency} in parallel")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            with self._condition:
+                while pending and not errors:
+                    now = time.monotonic()
+                    self._prune(now)
+                    index = next((i for i in pending if self._fits(requests[i][1], now)), None)
+
+                    if index is None:
+                        self._condition.wait(timeout=self._wait_time(now))
+                        continue
+
+                    pending.remove(index)
+                    reservation = [now, requests[index][1]]
+                    self._started.append(reservation)
+                    self._running += 1
+                    executor.submit(self._execute, requests[index][0], reservation, index, results, errors)
+
+                while self._running:
+                    self._condition.wait()
+
+        if errors:
+            raise errors[min(errors)]
+        return results
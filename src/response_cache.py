@@ -0,0 +1,150 @@
+"""
+Response cache
+
+Stores OpenAI completions on disk, keyed by a hash of the request,
+so re-runs with the same entries do not pay for the same answer twice.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/response_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+def request_key(params: Dict) -> str:
+    """
+    Hash the parameters of a completion request.
+
+    The parameters contain model, temperature, max_tokens and the messages,
+    so the key changes whenever the model, the prompt template or the
+    entries change.
+
+    Args:
+        params (Dict): Keyword arguments of chat.completions.create
+
+    Returns:
+        str: SHA-256 hex digest of the request
+    """
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed cache of completions with TTL and LRU size eviction."""
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 50 * 1024 * 1024,
+                 verbose: bool = False):
+        """
+        Initialize ResponseCache.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            ttl (float): Seconds a cached response stays valid
+            max_bytes (int): Total size of cached responses before the least recently used are evicted
+            verbose (bool): Enable verbose logging
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Requests are answered from the scheduler's worker threads
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Request key from request_key()
+
+        Returns:
+            Optional[str]: Cached content, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT content FROM responses WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key: str, content: str):
+        """
+        Store a response and evict old entries if the cache grew too large.
+
+        Args:
+            key (str): Request key from request_key()
+            content (str): Content of the response
+        """
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, content, len(content.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+            self.connection.commit()
+
+    def _evict(self, now: float):
+        """Drop expired responses, then the least recently used until the cache fits max_bytes."""
+        self.connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+
+        if self.verbose:
+            self.logger.info(f"Evicted {evicted} cached responses to stay below {self.max_bytes} bytes")
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
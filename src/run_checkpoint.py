@@ -0,0 +1,214 @@
+"""
+Run checkpoints
+
+Stores the output of every stage of a run under a run id, so a run whose
+analysis failed can be resumed without fetching the feeds again, which by
+then may no longer list the same entries from today.
+
+A run directory holds:
+    manifest.json           Completed stages
+    <stage>.jsonl.gz        Records of a completed stage, one JSON object per line
+    feed_cache.json         Feed validators of the fetch, activated once the run succeeds
+
+Stages are written while the pipeline streams through them and only count
+as completed once all records are on disk.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/run_checkpoint.py
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+class CheckpointStream:
+    """Passes the records of a stage on while writing them, completing the stage at their end."""
+
+    def __init__(self, checkpoint: 'RunCheckpoint', stage: str, records: Iterable[Dict]):
+        self.checkpoint = checkpoint
+        self.stage = stage
+        self.count = 0
+        self.failed = False
+        self._records = iter(records)
+        self._temp_file = f"{checkpoint.stage_path(stage)}.tmp"
+        self._file = gzip.open(self._temp_file, 'wt', encoding='utf-8')
+
+    def __iter__(self) -> 'CheckpointStream':
+        return self
+
+    def __next__(self) -> Dict:
+        if self._file is None:
+            raise StopIteration
+        try:
+            record = next(self._records)
+        except StopIteration:
+            self._complete()
+            raise
+        except Exception:
+            # A stage that broke off must not look complete when resuming
+            self.failed = True
+            self._file.close()
+            self._file = None
+            raise
+
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+        self.count += 1
+        return record
+
+    def _complete(self):
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_file, self.checkpoint.stage_path(self.stage))
+        self.checkpoint.mark_done(self.stage, self.count)
+
+    def finish(self) -> bool:
+        """
+        Write the records a failed later stage did not consume, completing the stage.
+
+        Returns:
+            bool: True if the stage is complete, False if its own input broke off
+        """
+        for _ in self:
+            pass
+        return not self.failed
+
+class RunCheckpoint:
+    """Stage outputs of one run, stored on disk."""
+
+    def __init__(self, directory: str, run_id: str = None, verbose: bool = False):
+        """
+        Initialize RunCheckpoint, starting a new run or continuing an existing one.
+
+        Args:
+            directory (str): Directory of all run checkpoints
+            run_id (str): Id of the run, defaults to the current time
+            verbose (bool): Enable verbose logging
+        """
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.path = os.path.join(directory, self.run_id)
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self.manifest_file = os.path.join(self.path, 'manifest.json')
+        # Digests written concurrently complete their stages from worker threads
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self.manifest = {'run_id': self.run_id, 'created': datetime.now().isoformat(timespec='seconds'),
+                             'stages': {}}
+            self._write_manifest()
+
+    @classmethod
+    def resume(cls, directory: str, run_id: str, verbose: bool = False) -> 'RunCheckpoint':
+        """
+        Open the checkpoint of an earlier run.
+
+        Raises:
+            FileNotFoundError: If no checkpoint of the run exists
+        """
+        if not os.path.exists(os.path.join(directory, run_id, 'manifest.json')):
+            raise FileNotFoundError(f"No checkpoint of run {run_id} in {directory}")
+        return cls(directory, run_id, verbose)
+
+    def _write_manifest(self):
+        temp_file = f"{self.manifest_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_file, self.manifest_file)
+
+    def file(self, name: str) -> str:
+        """Path of a file in the run directory."""
+        return os.path.join(self.path, name)
+
+    def stage_path(self, stage: str) -> str:
+        """Path of the records of a stage."""
+        return self.file(f"{stage}.jsonl.gz")
+
+    def done(self, stage: str) -> bool:
+        """Whether a stage was completed."""
+        return stage in self.manifest['stages']
+
+    def mark_done(self, stage: str, count: int):
+        """Record a stage as completed."""
+        with self._lock:
+            self.manifest['stages'][stage] = {'records': count,
+                                              'finished': datetime.now().isoformat(timespec='seconds')}
+            self._write_manifest()
+        if self.verbose:
+            self.logger.info(f"Checkpoint {self.run_id}: {stage} completed with {count} records")
+
+    def iter_save(self, stage: str, records: Iterable[Dict]) -> CheckpointStream:
+        """
+        Write the records of a stage while passing them on.
+
+        Args:
+            stage (str): Name of the stage
+            records (Iterable[Dict]): JSON-serializable records, e.g. a generator still fetching feeds
+
+        Returns:
+            CheckpointStream: The records, unchanged
+        """
+        return CheckpointStream(self, stage, records)
+
+    def iter_save_at_end(self, stage: str, records: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Pass the records of a stage on and write them once the last one was passed on.
+        
+        Unlike iter_save, records changed after they were passed on are written with
+        the changes, e.g. entries deduplication adds the sources of later copies to.
+        The records are held until then.
+        
+        Args:
+            stage (str): Name of the stage
+            records (Iterable[Dict]): JSON-serializable records
+            
+        Returns:
+            Iterator[Dict]: The records, unchanged
+        """
+        passed = []
+        for record in records:
+            passed.append(record)
+            yield record
+        self.save(stage, passed)
+
+    def save(self, stage: str, records: Iterable[Dict]) -> int:
+        """Write all records of a stage and complete it."""
+        stream = self.iter_save(stage, records)
+        stream.finish()
+        return stream.count
+
+    def load(self, stage: str) -> Iterator[Dict]:
+        """
+        Read the records of a completed stage.
+
+        Raises:
+            KeyError: If the stage was not completed
+        """
+        if not self.done(stage):
+            raise KeyError(f"Stage {stage} of run {self.run_id} was not completed")
+        return self._read(self.stage_path(stage))
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Dict]:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def stages(self) -> List[str]:
+        """Completed stages in the order they were completed."""
+        return list(self.manifest['stages'])
+
+    def remove(self):
+        """Delete the checkpoint once the run succeeded."""
+        shutil.rmtree(self.path, ignore_errors=True)
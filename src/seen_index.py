@@ -0,0 +1,142 @@
+"""
+Seen index
+
+Keeps track of the entries that earlier runs already sent to the AI,
+so the same story is never analyzed (and paid for) twice.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/seen_index.py
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterable, Set
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# Query parameters that only track the reader and never change the article
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def canonical_link(link: str) -> str:
+    """
+    Normalize a link so the same article always maps to the same key.
+
+    Lowercases scheme and host, drops fragments, tracking parameters
+    and a trailing slash.
+
+    Args:
+        link (str): Link of the entry
+
+    Returns:
+        str: Canonical form of the link
+    """
+    if not link:
+        return ''
+
+    parts = urlparse(link.strip())
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), path, '', urlencode(query), ''))
+
+def entry_key(entry) -> str:
+    """
+    Return the identity of a feedparser entry: its GUID, or else its canonical link.
+
+    Entries with neither get a hash of their title and publishing date, so they do
+    not all share one empty key. The description is left out, as it is shortened
+    for the analysis.
+    """
+    key = entry.get('id') or canonical_link(entry.get('link', ''))
+    if key:
+        return key
+    content = '\n'.join(' '.join(str(entry.get(field) or '').split()) for field in ('title', 'published'))
+    return 'sha1:' + hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+class SeenIndex:
+    """SQLite-backed index of entry keys seen by earlier runs."""
+
+    def __init__(self, db_path: str, retention_days: int = 30, verbose: bool = False):
+        """
+        Initialize SeenIndex.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            retention_days (int): Days after which a key is forgotten again
+            verbose (bool): Enable verbose logging
+        """
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path)
+        # The key is the primary key of a WITHOUT ROWID table, so lookups hit the index directly
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "key TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.commit()
+        self.prune()
+
+    def is_seen(self, key: str) -> bool:
+        """Check whether a key was recorded by an earlier run."""
+        row = self.connection.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def seen_keys(self, keys: Iterable[str]) -> Set[str]:
+        """
+        Return the subset of keys that were recorded by an earlier run.
+
+        Args:
+            keys (Iterable[str]): Keys to look up
+
+        Returns:
+            Set[str]: Keys already present in the index
+        """
+        return {key for key in keys if key and self.is_seen(key)}
+
+    def mark_seen(self, keys: Iterable[str]):
+        """
+        Record keys as seen.
+
+        Args:
+            keys (Iterable[str]): Keys of the entries that were processed
+        """
+        now = time.time()
+        rows = [(key, now) for key in keys if key]
+        self.connection.executemany("INSERT OR IGNORE INTO seen (key, first_seen) VALUES (?, ?)", rows)
+        self.connection.commit()
+
+        if self.verbose:
+            self.logger.info(f"Marked {len(rows)} entries as seen")
+
+    def prune(self) -> int:
+        """
+        Forget keys older than the retention period.
+
+        Returns:
+            int: Number of keys removed
+        """
+        cutoff = time.time() - self.retention_days * 24 * 3600
+        cursor = self.connection.execute("DELETE FROM seen WHERE first_seen < ?", (cutoff,))
+        self.connection.commit()
+
+        if self.verbose and cursor.rowcount:
+            self.logger.info(f"Pruned {cursor.rowcount} entries older than {self.retention_days} days")
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
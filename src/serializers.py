@@ -0,0 +1,159 @@
+"""
+Entry serializers
+
+Different ways to write the feed entries into the prompt. The compact
+formats save the tokens spent on repeated keys, whitespace and links.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/serializers.py
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+def to_json(entries: List[Dict]) -> str:
+    """Pretty-printed JSON, easy to read but the most expensive format."""
+    return json.dumps(entries, indent=2)
+
+def to_minified_json(entries: List[Dict]) -> str:
+    """JSON without indentation and whitespace between the separators."""
+    return json.dumps(entries, separators=(',', ':'), ensure_ascii=False)
+
+def _cell(value) -> str:
+    """Make a value safe for a tab-separated row."""
+    if isinstance(value, (list, dict)):
+        value = to_minified_json(value)
+    return re.sub(r'[\t\r\n]+', ' ', str(value)).strip()
+
+def to_tsv(entries: List[Dict]) -> str:
+    """
+    Tab-separated table with the feed titles moved into a header table.
+
+    Every entry refers to its feed by a short id like F1, so long feed
+    titles are only written once. Keys are written once as column names.
+
+    Args:
+        entries (List[Dict]): Feed entries
+
+    Returns:
+        str: Feed table followed by the entry table
+    """
+    if not entries:
+        return "feed\ttitle"
+
+    feeds = {}
+    for entry in entries:
+        feeds.setdefault(entry.get('feed_title', ''), f"F{len(feeds) + 1}")
+
+    # Merged duplicates have a sources column the other entries lack
+    columns = []
+    for entry in entries:
+        columns += [key for key in entry if key != 'feed_title' and key not in columns]
+    lines = ["feed_id\tfeed_title"]
+    lines += [f"{feed_id}\t{_cell(title)}" for title, feed_id in feeds.items()]
+    lines += ["", "\t".join(['feed_id'] + columns)]
+    for entry in entries:
+        row = [feeds[entry.get('feed_title', '')]] + [_cell(entry.get(column, '')) for column in columns]
+        lines.append("\t".join(row))
+    return "\n".join(lines)
+
+# Serializer and the format name used in the prompt
+SERIALIZERS = {
+    'json': (to_json, 'JSON'),
+    'json-min': (to_minified_json, 'JSON'),
+    'tsv': (to_tsv, 'tab-separated')
+}
+
+# Link target the model uses instead of the real URL
+LINK_REFERENCE = 'entry:{id}'
+
+def replace_links(entries: List[Dict]) -> Tuple[List[Dict], Dict[int, str]]:
+    """
+    Replace the links of the entries by short integer ids.
+
+    Args:
+        entries (List[Dict]): Feed entries
+
+    Returns:
+        Tuple[List[Dict], Dict[int, str]]: Entries with an id instead of a link, and the links by id
+    """
+    links = {}
+    return list(iter_replace_links(entries, links)), links
+
+def iter_replace_links(entries: Iterable[Dict], links: Dict[int, str]) -> Iterator[Dict]:
+    """
+    Replace the links of a stream of entries by short integer ids.
+
+    Args:
+        entries (Iterable[Dict]): Feed entries
+        links (Dict[int, str]): Filled with the links by id while the entries are consumed
+
+    Returns:
+        Iterator[Dict]: Entries with an id instead of a link
+    """
+    ids = {}
+    for entry in entries:
+        index = len(links)
+        links[index] = entry.get('link', '')
+        ids.setdefault(links[index], index)
+
+        compact = {'id': index}
+        compact.update({key: value for key, value in entry.items() if key != 'link'})
+        if 'sources' in entry:
+            # Links of merged duplicates get ids as well
+            compact['sources'] = []
+            for source in entry['sources']:
+                link = source.get('link', '')
+                if link not in ids:
+                    ids[link] = len(links)
+                    links[ids[link]] = link
+                compact['sources'].append({'feed_title': source.get('feed_title', ''), 'id': ids[link]})
+        yield compact
+
+def restore_links(text: str, links: Dict[int, str]) -> str:
+    """Replace the entry:<id> references written by the model with the real links."""
+    def replace(match):
+        return links.get(int(match.group(1)), match.group(0))
+    return re.sub(r'entry:(\d+)', replace, text)
+
+class LinkRestorer:
+    """Restores entry:<id> references in text that is written in chunks."""
+
+    # A reference that may continue in the next chunk
+    _PENDING = re.compile(r'e(n(t(r(y(:\d*)?)?)?)?)?$')
+
+    def __init__(self, output, links: Dict[int, str]):
+        """
+        Initialize LinkRestorer.
+
+        Args:
+            output: Writer with write(), reset() and flush() receiving the restored text
+            links (Dict[int, str]): Links by id, as returned by replace_links()
+        """
+        self.output = output
+        self.links = links
+        self._pending = ''
+
+    def write(self, text: str):
+        """Restore the complete references and hold back a possibly incomplete one."""
+        text = self._pending + text
+        match = self._PENDING.search(text)
+        split = match.start() if match and match.group(0) else len(text)
+        self._pending = text[split:]
+        if split:
+            self.output.write(restore_links(text[:split], self.links))
+
+    def reset(self):
+        """Discard the held back text and reset the output."""
+        self._pending = ''
+        self.output.reset()
+
+    def flush(self):
+        """Write the held back text."""
+        if self._pending:
+            self.output.write(restore_links(self._pending, self.links))
+            self._pending = ''
+        self.output.flush()
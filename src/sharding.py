@@ -0,0 +1,189 @@
+"""
+Sharding
+
+Splits a large source list into shards by a stable hash of the feed URL,
+so that several processes or nodes can each fetch and parse their share.
+Every shard worker writes its entries to a compressed JSON lines file;
+the merge step reads all shard files and runs the analysis once.
+
+A shard directory holds, per shard of N:
+    shard-<i>-of-<N>.jsonl.gz            Entries waiting for the merge
+    feed_cache.shard-<i>-of-<N>.json     Validators of the last merged fetch
+    feed_cache.shard-<i>-of-<N>.pending  Validators of the fetch waiting for the merge
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/sharding.py
+import gzip
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.feed_cache import FeedCache
+from src.feed_reader import FeedReader
+from src.seen_index import canonical_link
+from src.url_parser import URLFileParser
+
+SHARD_FILE = re.compile(r'shard-(\d+)-of-(\d+)\.jsonl\.gz$')
+
+logger = logging.getLogger(__name__)
+
+def shard_of(url: str, shards: int) -> int:
+    """
+    Assign a feed to a shard.
+
+    The hash of the canonical URL is the same in every process and on every
+    node, unlike hash(), so a feed always lands in the same shard and keeps
+    its feed cache.
+
+    Args:
+        url (str): URL of the feed
+        shards (int): Number of shards
+
+    Returns:
+        int: Shard number from 0 to shards - 1
+    """
+    return zlib.crc32(canonical_link(url).encode('utf-8')) % shards
+
+def shard_urls(urls: Iterable[str], shard: int, shards: int) -> Iterator[str]:
+    """Yield the URLs belonging to one shard."""
+    if not 0 <= shard < shards:
+        raise ValueError(f"Shard {shard} does not exist in {shards} shards")
+    return (url for url in urls if shard_of(url, shards) == shard)
+
+def shard_path(directory: str, shard: int, shards: int) -> str:
+    """Path of the entry file of a shard."""
+    return os.path.join(directory, f"shard-{shard}-of-{shards}.jsonl.gz")
+
+def cache_path(directory: str, shard: int, shards: int, pending: bool = False) -> str:
+    """Path of the merged feed cache of a shard, or of the one waiting for the merge."""
+    extension = 'pending' if pending else 'json'
+    return os.path.join(directory, f"feed_cache.shard-{shard}-of-{shards}.{extension}")
+
+def write_shard(keyed_entries: Iterable[Tuple[str, Dict]], directory: str, shard: int, shards: int) -> int:
+    """
+    Write the entries of a shard atomically, so the merge never reads a half-written file.
+
+    Args:
+        keyed_entries (Iterable[Tuple[str, Dict]]): Seen-index key and structured entry
+        directory (str): Shard directory
+        shard (int): Shard number
+        shards (int): Number of shards
+
+    Returns:
+        int: Number of entries written
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = shard_path(directory, shard, shards)
+    temp_file = f"{path}.tmp"
+
+    count = 0
+    with gzip.open(temp_file, 'wt', encoding='utf-8') as f:
+        for key, entry in keyed_entries:
+            f.write(json.dumps({'key': key, 'entry': entry}, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    os.replace(temp_file, path)
+    return count
+
+def find_shards(directory: str) -> Tuple[int, List[str]]:
+    """
+    Find the entry files of a complete set of shards.
+
+    Args:
+        directory (str): Shard directory
+
+    Returns:
+        Tuple[int, List[str]]: Number of shards and their entry files in shard order
+
+    Raises:
+        FileNotFoundError: If no shard file exists
+        ValueError: If shard files of different splits are mixed or shards are missing
+    """
+    found = {}
+    if os.path.isdir(directory):
+        for file_name in os.listdir(directory):
+            match = SHARD_FILE.fullmatch(file_name)
+            if match:
+                found[(int(match.group(1)), int(match.group(2)))] = os.path.join(directory, file_name)
+
+    if not found:
+        raise FileNotFoundError(f"No shard files found in {directory}")
+
+    splits = {shards for _, shards in found}
+    if len(splits) > 1:
+        raise ValueError(f"Shard files of different splits in {directory}: {sorted(splits)} shards")
+
+    shards = splits.pop()
+    missing = [shard for shard in range(shards) if (shard, shards) not in found]
+    if missing:
+        raise ValueError(f"Shards {', '.join(map(str, missing))} of {shards} have not been written yet")
+    return shards, [found[(shard, shards)] for shard in range(shards)]
+
+def read_shards(paths: List[str]) -> Iterator[Tuple[str, Dict]]:
+    """Yield the keyed entries of shard files, one file after the other."""
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                yield record['key'], record['entry']
+
+def commit_shards(directory: str, shards: int):
+    """
+    Finish a merge: the pending feed caches become the merged ones and the entry files are removed.
+
+    Until then, a failed merge can be repeated, and the next fetch still downloads
+    feeds whose entries never made it into a summary.
+
+    Args:
+        directory (str): Shard directory
+        shards (int): Number of shards
+    """
+    for shard in range(shards):
+        pending_cache = cache_path(directory, shard, shards, pending=True)
+        if os.path.exists(pending_cache):
+            os.replace(pending_cache, cache_path(directory, shard, shards))
+        os.remove(shard_path(directory, shard, shards))
+
+def run_shard(sources_file: str, shard: int, shards: int, directory: str, verbose: bool = False,
+              max_bytes: int = None, stream_parse: bool = False) -> str:
+    """
+    Fetch and parse the feeds of one shard and write today's entries to its shard file.
+
+    Runs in its own process, so parsing does not compete for the GIL of other shards.
+
+    Args:
+        sources_file (str): File with one feed URL per line
+        shard (int): Shard number
+        shards (int): Number of shards
+        directory (str): Shard directory, shared by all workers and the merge
+        verbose (bool): Enable verbose logging
+        max_bytes (int): Bytes read per feed at most
+        stream_parse (bool): Parse feeds while downloading them, see FeedReader
+
+    Returns:
+        str: Path of the shard file
+    """
+    urls = shard_urls(URLFileParser(sources_file).iter_urls(), shard, shards)
+    feed_cache = FeedCache(cache_path(directory, shard, shards))
+    reader = FeedReader(urls, verbose=verbose, cache=feed_cache, max_bytes=max_bytes, stream_parse=stream_parse)
+
+    def keyed_entries():
+        for entry in reader.iter_entries():
+            # new_keys grows in step with the yielded entries
+            yield reader.new_keys[-1], entry
+
+    try:
+        count = write_shard(keyed_entries(), directory, shard, shards)
+    finally:
+        reader.close()
+
+    # Becomes the merged cache only once the merge has saved the summary
+    feed_cache.save(cache_path(directory, shard, shards, pending=True))
+    logger.info(f"Shard {shard} of {shards}: {len(reader.feed_stats)} feeds, {count} entries")
+    return shard_path(directory, shard, shards)
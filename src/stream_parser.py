@@ -0,0 +1,194 @@
+"""
+Streaming feed parser
+
+Parses RSS 2.0, RSS 1.0 and Atom feeds incrementally while they are
+downloaded, instead of building the whole document like feedparser.
+Every entry is reduced to the fields the reader uses as soon as it is
+complete, and its element is dropped, so memory stays flat however many
+items a feed has and however long their full-content fields are.
+
+Only entries inside the date window are kept. In feeds sorted newest
+first, parsing stops once several entries in a row fall outside of it.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/stream_parser.py
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+# Texts are cut to this length while parsing, far more than the normalizer keeps of a description
+MAX_TEXT_CHARS = 8192
+
+CONTENT_NS = 'http://purl.org/rss/1.0/modules/content/'
+
+def local_name(tag: str) -> str:
+    """Tag without its namespace."""
+    return tag.rsplit('}', 1)[-1]
+
+def parse_date(text: str) -> Optional[time.struct_time]:
+    """
+    Parse an RFC 822 (RSS) or ISO 8601 (Atom) date like feedparser does.
+
+    Args:
+        text (str): Date of the feed
+
+    Returns:
+        Optional[time.struct_time]: Time in UTC, None if the date cannot be parsed
+    """
+    text = text.strip()
+    try:
+        date = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            date = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.utctimetuple()
+
+class StreamEntry(dict):
+    """Entry with the fields of a feedparser entry the reader uses, readable as keys or attributes."""
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+class FeedStreamParser:
+    """Incremental parser fed with the chunks of a feed download."""
+
+    def __init__(self, in_window: Callable[[StreamEntry], bool], stop_after: int = 10,
+                 max_text_chars: int = MAX_TEXT_CHARS):
+        """
+        Initialize FeedStreamParser.
+
+        Args:
+            in_window (Callable[[StreamEntry], bool]): Whether an entry is recent enough to keep
+            stop_after (int): Entries in a row outside the window after which a feed sorted
+                newest first is not read any further
+            max_text_chars (int): Length titles and descriptions are cut to
+        """
+        self.in_window = in_window
+        self.stop_after = stop_after
+        self.max_text_chars = max_text_chars
+        self.feed_title = None
+        self.entries: List[StreamEntry] = []
+        self.total = 0
+        self.finished = False   # Stopped early, the rest of the feed is older
+        self.error = None       # Not well-formed XML, e.g. an HTML page or undeclared entities
+
+        self._parser = XMLPullParser(events=('start', 'end'))
+        self._path: List[Element] = []
+        self._newest_first = True
+        self._last_date = None
+        self._outside = 0
+
+    @property
+    def done(self) -> bool:
+        """Whether the rest of the document is not needed."""
+        return self.finished or self.error is not None
+
+    def feed(self, chunk: bytes):
+        """
+        Parse the next chunk of the document.
+
+        Args:
+            chunk (bytes): Raw bytes as downloaded
+        """
+        if self.done:
+            return
+        try:
+            self._parser.feed(chunk)
+            self._read_events()
+        except ParseError as e:
+            self.error = e
+
+    def close(self):
+        """Finish a document that was read to its end."""
+        if self.done:
+            return
+        try:
+            self._parser.close()
+            self._read_events()
+        except ParseError as e:
+            self.error = e
+
+    def _read_events(self):
+        for event, element in self._parser.read_events():
+            if self.done:
+                return
+            if event == 'start':
+                self._path.append(element)
+                continue
+
+            self._path.pop()
+            name = local_name(element.tag)
+            parent = local_name(self._path[-1].tag) if self._path else None
+            if name in ('item', 'entry'):
+                self._add(self._entry(element))
+                # The entry is reduced to its fields, its elements are not needed anymore
+                element.clear()
+                if self._path:
+                    self._path[-1].remove(element)
+            elif name == 'title' and parent in ('channel', 'feed') and self.feed_title is None:
+                self.feed_title = self._text(element).strip()
+
+    def _text(self, element: Element) -> str:
+        """Text of an element including nested markup like Atom xhtml, cut to max_text_chars."""
+        text = ''.join(element.itertext())
+        return text[:self.max_text_chars]
+
+    def _entry(self, item: Element) -> StreamEntry:
+        """Reduce an item or entry element to title, link, id, published and description."""
+        entry = StreamEntry()
+        content = None
+        for child in item:
+            name = local_name(child.tag)
+            if name == 'title':
+                entry['title'] = self._text(child)
+            elif name == 'link':
+                href = child.get('href')
+                if href is None:
+                    entry.setdefault('link', (child.text or '').strip())
+                elif child.get('rel', 'alternate') == 'alternate':
+                    entry.setdefault('link', href.strip())
+            elif name in ('guid', 'id'):
+                entry['id'] = (child.text or '').strip()
+            elif name in ('pubDate', 'published'):
+                entry['published'] = (child.text or '').strip()
+                entry['published_parsed'] = parse_date(entry['published'])
+            elif name in ('description', 'summary'):
+                entry['description'] = self._text(child)
+            elif content is None and (name == 'content' or child.tag == f'{{{CONTENT_NS}}}encoded'):
+                content = child
+
+        # Like feedparser, the full content stands in for a missing summary
+        if 'description' not in entry and content is not None:
+            entry['description'] = self._text(content)
+        return entry
+
+    def _add(self, entry: StreamEntry):
+        """Keep an entry inside the window and decide whether the rest of the feed can be skipped."""
+        self.total += 1
+        if self.in_window(entry):
+            self.entries.append(entry)
+            self._outside = 0
+        else:
+            self._outside += 1
+
+        date = entry.get('published_parsed')
+        if date is not None:
+            if self._last_date is not None and date > self._last_date:
+                self._newest_first = False
+            self._last_date = date
+
+        if self._newest_first and self._last_date is not None and self._outside >= self.stop_after:
+            self.finished = True
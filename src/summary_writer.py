@@ -0,0 +1,93 @@
+"""
+Summary writer
+
+Writes the summary into a temporary file while it is generated and
+renames it to the final Markdown file once it is complete. A run that
+fails halfway leaves the partial file behind instead of nothing.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/summary_writer.py
+import logging
+import os
+from datetime import datetime
+
+PARTIAL_SUFFIX = '.partial'
+
+class SummaryWriter:
+    """Incremental writer of one summary file with an atomic rename at the end."""
+
+    def __init__(self, output_dir: str, prefix: str = 'ai_news_summary', verbose: bool = False):
+        """
+        Initialize SummaryWriter.
+
+        Args:
+            output_dir (str): Directory the summary is written to
+            prefix (str): Start of the file name, followed by a timestamp
+            verbose (bool): Enable verbose logging
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.output_file = os.path.join(output_dir, f'{prefix}_{timestamp}.md')
+        self.partial_file = self.output_file + PARTIAL_SUFFIX
+        self.verbose = verbose
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, text: str):
+        """Append text to the partial file and make it visible to readers right away."""
+        if self._file is None:
+            self._file = open(self.partial_file, 'w')
+        self._file.write(text)
+        self._file.flush()
+
+    def reset(self):
+        """Discard what was written so far, e.g. before a failed request is retried."""
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+
+    def flush(self):
+        """Flush written text to disk."""
+        if self._file is not None:
+            self._file.flush()
+
+    def commit(self, content: str) -> str:
+        """
+        Write the final content and move it to the output file.
+
+        Args:
+            content (str): Complete summary
+
+        Returns:
+            str: Path of the output file
+        """
+        self.reset()
+        self.write(content)
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+        os.replace(self.partial_file, self.output_file)
+        return self.output_file
+
+    def abort(self):
+        """Close the partial file and keep it for inspection."""
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+        if self.verbose:
+            self.logger.warning(f"Kept partial summary at {self.partial_file}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.abort()
+        return False
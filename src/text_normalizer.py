@@ -0,0 +1,108 @@
+"""
+Text normalizer
+
+Turns the raw HTML of feed descriptions into short plain text: tags,
+entities, repeated whitespace and feed boilerplate are removed and the
+text is cut at a sentence or word boundary to fit a token budget.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/text_normalizer.py
+import html
+import re
+from functools import lru_cache
+from src.token_counter import TokenCounter, CHARS_PER_TOKEN
+
+# Elements whose content is never shown as text
+HIDDEN_ELEMENTS = re.compile(r'<(script|style|noscript|iframe)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAGS = re.compile(r'<!--.*?-->|<[^>]*>', re.DOTALL)
+WHITESPACE = re.compile(r'\s+')
+
+# Text feeds append to every entry, e.g. by WordPress
+BOILERPLATE = [
+    re.compile(r'The post .{1,300}? appeared first on .{1,200}?(\.|$)', re.IGNORECASE),
+    # Link texts at the very end only, prose like "readers read more news" stays
+    re.compile(r'\b(Continue reading|Read more|Read the full (story|article))(\s+(on|at)\s[^.!?]{1,60})?\W*$'),
+    re.compile(r'\[(…|\.\.\.|&hellip;)\]')
+]
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def clean_text(text: str) -> str:
+    """
+    Strip HTML, decode entities, remove boilerplate and collapse whitespace.
+
+    Args:
+        text (str): Raw text or HTML of a feed entry
+
+    Returns:
+        str: Plain text on a single line
+    """
+    text = HIDDEN_ELEMENTS.sub(' ', text or '')
+    text = TAGS.sub(' ', text)
+    text = html.unescape(text).replace('\xa0', ' ')
+    text = WHITESPACE.sub(' ', text).strip()
+    for pattern in BOILERPLATE:
+        text = pattern.sub('', text).strip()
+    return text
+
+class TextNormalizer:
+    """Cleans entry texts and truncates them to a token budget, remembering earlier results."""
+
+    def __init__(self, max_tokens: int = 50, model: str = 'gpt-4', cache_size: int = 4096):
+        """
+        Initialize TextNormalizer.
+
+        Args:
+            max_tokens (int): Token budget of a description
+            model (str): Model whose tokenizer measures the budget
+            cache_size (int): Number of normalized texts kept in memory
+        """
+        self.max_tokens = max_tokens
+        self.token_counter = TokenCounter(model)
+        # Unchanged entries are seen on every run of a long-running process
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, text: str) -> str:
+        """Clean the text and truncate it to the token budget."""
+        return self.truncate(clean_text(text))
+
+    def truncate(self, text: str) -> str:
+        """
+        Cut text to the token budget, at the end of a sentence if that keeps most of
+        the budget, otherwise after the last complete word.
+
+        Args:
+            text (str): Plain text
+
+        Returns:
+            str: Text within max_tokens
+        """
+        count = self.token_counter.count
+        if count(text) <= self.max_tokens:
+            return text
+
+        # Longest prefix of complete words within the budget
+        words = text.split(' ')
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count(' '.join(words[:middle])) <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        if low == 0:
+            # Not even the first word fits, e.g. a long URL
+            return text[:self.max_tokens * CHARS_PER_TOKEN]
+        truncated = ' '.join(words[:low])
+
+        # Prefer a complete sentence unless that throws away more than half of the text
+        sentences = SENTENCE_END.split(truncated)
+        if len(sentences) > 1:
+            complete = truncated[:len(truncated) - len(sentences[-1])].rstrip()
+            if len(complete) >= len(truncated) / 2:
+                return complete
+        return truncated
@@ -0,0 +1,80 @@
+"""
+Token counter
+
+Counts tokens the way the OpenAI models do, so payloads can be
+sized before they are sent.
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# src/token_counter.py
+import logging
+from functools import lru_cache
+
+# Context window (input + output tokens) per model
+CONTEXT_WINDOWS = {
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-3.5-turbo': 16385
+}
+
+# Characters per token used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Tokens every chat message costs on top of its content
+TOKENS_PER_MESSAGE = 4
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def _load_encoding(model: str):
+    """Load the tiktoken encoding of a model once, or None if it is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        # tiktoken missing, unknown model or the encoding could not be downloaded
+        logger.warning(f"No tokenizer for {model}, estimating {CHARS_PER_TOKEN} characters per token: {str(e)}")
+        return None
+
+def context_window(model: str) -> int:
+    """Return the context window of a model, falling back to the smallest known one."""
+    return CONTEXT_WINDOWS.get(model, min(CONTEXT_WINDOWS.values()))
+
+class TokenCounter:
+    """Counts tokens of prompts for a given model."""
+
+    def __init__(self, model: str = 'gpt-4'):
+        """
+        Initialize TokenCounter.
+
+        Args:
+            model (str): Name of the OpenAI model whose tokenizer is used
+        """
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text.
+
+        Args:
+            text (str): Text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        if not text:
+            return 0
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)  # Round up
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages) -> int:
+        """Count the tokens of a list of chat messages including their overhead."""
+        return sum(TOKENS_PER_MESSAGE + self.count(message['content']) for message in messages)
@@ -10,23 +10,26 @@ License: MIT
 """
 # src/url_parser.py
 import logging
-from typing import List
+from typing import Iterator, List
 import os
 from urllib.parse import urlparse
+from src.metrics import RunMetrics, DISABLED
 
 class URLFileParser:
     """Component for parsing URLs from a text file."""
     
-    def __init__(self, file_path: str, verbose: bool = False):
+    def __init__(self, file_path: str, verbose: bool = False, metrics: RunMetrics = None):
         """
         Initialize URLFileParser.
         
         Args:
             file_path (str): Path to the file containing URLs
             verbose (bool): Enable verbose logging
+            metrics (RunMetrics): Records the time spent reading and the number of URLs
         """
         self.file_path = file_path
         self.verbose = verbose
+        self.metrics = metrics or DISABLED
         self.logger = logging.getLogger(__name__)
         
         if verbose:
@@ -80,6 +83,22 @@ class URLFileParser:
         Raises:
             FileNotFoundError: If the source file doesn't exist
         """
+        return list(self.iter_urls())
+
+    def iter_urls(self) -> Iterator[str]:
+        """
+        Yield the valid URLs of the file while it is read.
+        
+        Returns:
+            Iterator[str]: Valid URLs in the order of the file
+            
+        Raises:
+            FileNotFoundError: If the source file doesn't exist
+        """
+        return self.metrics.iter_stage(self._read_urls(), 'read_urls')
+
+    def _read_urls(self) -> Iterator[str]:
+        """Read the file line by line, yielding the valid URLs."""
         if not os.path.exists(self.file_path):
             if self.verbose:
                 self.logger.error(f"File not found: {self.file_path}")
@@ -88,20 +107,20 @@ class URLFileParser:
         if self.verbose:
             self.logger.info(f"Reading URLs from file: {self.file_path}")
             
-        valid_urls = []
+        valid_count = 0
         with open(self.file_path, 'r') as file:
             for line in file:
                 line = line.strip()
                 if line and not line.startswith('#'):
                     if self._is_valid_url(line):
-                        valid_urls.append(line)
+                        valid_count += 1
                         if self.verbose:
                             self.logger.debug(f"Valid URL found: {line}")
+                        yield line
                     else:
                         if self.verbose:
                             self.logger.warning(f"Invalid URL found: {line}")
         
+        self.metrics.count('urls', valid_count)
         if self.verbose:
-            self.logger.info(f"Found {len(valid_urls)} valid URLs")
-            
-        return valid_urls
\ No newline at end of file
+            self.logger.info(f"Found {valid_count} valid URLs")
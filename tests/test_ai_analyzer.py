@@ -11,9 +11,12 @@ License: MIT
 # tests/test_ai_analyzer.py
 import pytest
 from unittest.mock import patch, MagicMock
-from src.ai_analyzer import AIAnalyzer
+from src.ai_analyzer import AIAnalyzer, SYSTEM_PROMPT
 import json
+import threading
 import os
+import subprocess
+import sys
 
 @pytest.fixture
 def sample_entries():
@@ -118,4 +121,296 @@ def test_missing_api_key():
         with pytest.raises(ValueError) as exc_info:
             AIAnalyzer(verbose=True)
         
-        assert "API key" in str(exc_info.value)
\ No newline at end of file
+        assert "API key" in str(exc_info.value)
+
+def make_entries(count):
+    """Create count distinct feed entries"""
+    return [
+        {
+            'title': f'AI News {i}',
+            'description': 'A new language model was released today. ' * 4,
+            'published': '2024-11-22',
+            'link': f'http://example.com/{i}',
+            'feed_title': 'Test Feed'
+        }
+        for i in range(count)
+    ]
+
+def make_response(content):
+    """Create a mock OpenAI API response with the given content"""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+def test_small_payload_uses_single_request(sample_entries):
+    """Test that entries fitting the context window are sent in one request"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer()
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response("# Summary")
+        
+        assert analyzer.analyze_feeds(sample_entries) == "# Summary"
+        analyzer.client.chat.completions.create.assert_called_once()
+
+def test_large_payload_is_map_reduced():
+    """Test that oversized payloads are summarized in chunks and merged"""
+    entries = make_entries(40)
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(verbose=True, context_tokens=2500, max_tokens=800, map_max_tokens=200,
+                              tokens_per_minute=1000000)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.side_effect = \
+            lambda **kwargs: make_response("## Partial" if kwargs['max_tokens'] == 200 else "# Final")
+        
+        result = analyzer.analyze_feeds(entries)
+        
+        calls = analyzer.client.chat.completions.create.call_args_list
+        map_calls = [c for c in calls if c.kwargs['max_tokens'] == 200]
+        assert result == "# Final"
+        assert len(map_calls) > 1
+        assert calls[-1].kwargs['max_tokens'] == 800
+        
+        # Every entry went into exactly one map request, each within the context window
+        prompts = [c.kwargs['messages'][1]['content'] for c in map_calls]
+        for i in range(40):
+            assert sum(f'"AI News {i}"' in p for p in prompts) == 1
+        for c in calls:
+            used = analyzer.token_counter.count_messages(c.kwargs['messages'])
+            assert used + c.kwargs['max_tokens'] <= 2500
+
+def test_partial_digests_are_condensed_when_too_large():
+    """Test that too many partial digests are merged in several rounds"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=2000, max_tokens=800, map_max_tokens=200,
+                              tokens_per_minute=1000000)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.side_effect = \
+            lambda **kwargs: make_response("x " * 150 if kwargs['max_tokens'] == 200 else "# Final")
+        
+        result = analyzer._reduce(["digest " * 150] * 12)
+        
+        assert result == "# Final"
+        assert analyzer.client.chat.completions.create.call_count > 2
+
+def test_payload_fitting_one_map_chunk_uses_single_request():
+    """Test that entries just over the single-request budget are not map-reduced"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=3000, max_tokens=2000, map_max_tokens=500)
+        entries = make_entries(1)
+        # Grow the payload until it no longer fits with the full max_tokens
+        while len(analyzer._pack(entries, analyzer._create_analysis_prompt, 2000)) == 1:
+            entries = make_entries(len(entries) + 1)
+        assert len(analyzer._pack(entries, analyzer._create_map_prompt, 500)) == 1
+        
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response("# Summary")
+        
+        assert analyzer.analyze_feeds(entries) == "# Summary"
+        call = analyzer.client.chat.completions.create.call_args
+        analyzer.client.chat.completions.create.assert_called_once()
+        assert call.kwargs['max_tokens'] < 2000
+        assert analyzer.token_counter.count_messages(call.kwargs['messages']) + call.kwargs['max_tokens'] <= 3000
+
+def test_oversized_entry_is_shortened():
+    """Test that an entry larger than a whole request gets a shorter description"""
+    entry = make_entries(1)[0]
+    entry['description'] = 'word ' * 5000
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=2000, max_tokens=500)
+        chunks = analyzer._pack([entry], analyzer._create_analysis_prompt, 500)
+        
+        assert len(chunks) == 1
+        assert 0 < len(chunks[0][0]['description']) < len(entry['description'])
+        prompt = analyzer._create_analysis_prompt(chunks[0])
+        assert analyzer.token_counter.count_messages(analyzer._messages(prompt)) + 500 <= 2000
+
+def test_entry_too_large_without_description():
+    """Test that a clear error is raised if not even the title fits"""
+    entry = make_entries(1)[0]
+    entry['title'] = 'title ' * 5000
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=2000, max_tokens=500)
+        with pytest.raises(ValueError, match='does not fit'):
+            analyzer._pack([entry], analyzer._create_analysis_prompt, 500)
+
+def test_repeated_run_is_answered_from_cache(tmp_path, sample_entries):
+    """Test that a second run with the same entries does not call OpenAI"""
+    from src.response_cache import ResponseCache
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        cache = ResponseCache(str(tmp_path / 'responses.db'))
+        analyzer = AIAnalyzer(cache=cache)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response("# Summary")
+        
+        assert analyzer.analyze_feeds(sample_entries) == "# Summary"
+        assert analyzer.analyze_feeds(sample_entries) == "# Summary"
+        
+        analyzer.client.chat.completions.create.assert_called_once()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+def test_structured_mode_renders_locally(tmp_path):
+    """Test that structured mode sends no links and caches results per entry"""
+    from src.response_cache import ResponseCache
+    entries = make_entries(3)
+    answer = json.dumps({
+        'summary': 'Models everywhere.',
+        'entries': [{'id': i, 'relevance': 8, 'category': 'Models', 'analysis': f'Analysis {i}',
+                     'cluster': f'story-{i}'} for i in range(3)]
+    })
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(structured=True, cache=ResponseCache(str(tmp_path / 'responses.db')))
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response(f"```json\n{answer}\n```")
+        
+        result = analyzer.analyze_feeds(entries)
+        
+        prompt = analyzer.client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        assert 'http://example.com' not in prompt
+        assert '[AI News 2](http://example.com/2)' in result
+        assert 'Analysis 1' in result
+        
+        # A later run with one new entry only sends that entry
+        analyzer.client.chat.completions.create.reset_mock()
+        analyzer.client.chat.completions.create.return_value = make_response(json.dumps({
+            'entries': [{'id': 3, 'relevance': 9, 'category': 'Models', 'analysis': 'Fresh', 'cluster': 'new'}]
+        }))
+        result = analyzer.analyze_feeds(make_entries(4))
+        
+        prompt = analyzer.client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        assert '"AI News 3"' in prompt and '"AI News 0"' not in prompt
+        assert 'Analysis 0' in result and 'Fresh' in result
+
+def test_structured_mode_rejects_invalid_json(sample_entries):
+    """Test that an unparseable structured answer raises a clear error"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(structured=True)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response("# Not JSON")
+        
+        with pytest.raises(ValueError, match='structured response'):
+            analyzer.analyze_feeds(sample_entries)
+
+def test_serializer_and_link_ids(sample_entries):
+    """Test that the configured format is used and entry links are restored"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        with pytest.raises(ValueError, match='Unknown serializer'):
+            AIAnalyzer(serializer='xml')
+        
+        analyzer = AIAnalyzer(serializer='tsv', link_ids=True)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_response("# News\n[AI News](entry:0)")
+        
+        result = analyzer.analyze_feeds(sample_entries)
+        
+        prompt = analyzer.client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        assert 'tab-separated format' in prompt
+        assert 'http://example.com' not in prompt
+        assert result == "# News\n[AI News](http://example.com)"
+
+def make_stream(parts, total_tokens=50):
+    """Create mock streaming chunks, ending with a usage chunk"""
+    chunks = []
+    for part in parts:
+        chunk = MagicMock()
+        chunk.usage = None
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = part
+        chunks.append(chunk)
+    chunks.append(MagicMock(choices=[], usage=MagicMock(total_tokens=total_tokens)))
+    return iter(chunks)
+
+def test_streaming_writes_chunks_to_output(tmp_path, sample_entries):
+    """Test that the response is written while it arrives and cached afterwards"""
+    from src.response_cache import ResponseCache
+    from src.summary_writer import SummaryWriter
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        cache = ResponseCache(str(tmp_path / 'responses.db'))
+        analyzer = AIAnalyzer(cache=cache, link_ids=True)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = make_stream(["# News\n", "[AI](entry", ":0)"])
+        
+        writer = SummaryWriter(str(tmp_path / 'summaries'))
+        result = analyzer.process_feeds(sample_entries, output=writer)
+        
+        assert analyzer.client.chat.completions.create.call_args.kwargs['stream'] is True
+        with open(writer.partial_file) as f:
+            assert f.read() == "# News\n[AI](http://example.com)"
+        assert result == "# News\n[AI](http://example.com)"
+        
+        # The same request is answered from the cache and still written out
+        second = SummaryWriter(str(tmp_path / 'again'))
+        assert analyzer.process_feeds(sample_entries, output=second) == result
+        assert analyzer.client.chat.completions.create.call_count == 1
+        with open(second.partial_file) as f:
+            assert f.read() == result
+
+def test_entry_budget_fits_single_request():
+    """Test that entries within the entry budget are analyzed in one request"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=3000, max_tokens=1000)
+        entries = make_entries(200)
+        
+        budget = analyzer.entry_budget()
+        used = 0
+        fitting = []
+        for entry in entries:
+            if used + analyzer.entry_cost(entry) > budget:
+                break
+            fitting.append(entry)
+            used += analyzer.entry_cost(entry)
+        
+        assert 0 < len(fitting) < len(entries)
+        assert len(analyzer._pack(fitting, analyzer._create_analysis_prompt, analyzer.max_tokens)) == 1
+
+def test_analyze_stream_starts_chunks_before_input_ends():
+    """Test that the first map request is sent while entries are still arriving"""
+    first_request = threading.Event()
+    
+    def entries():
+        yield from make_entries(40)
+        # The generator is only resumed after the first chunk went out
+        assert first_request.wait(timeout=5)
+        yield from make_entries(1)
+    
+    def create(**kwargs):
+        if kwargs['max_tokens'] == 200:
+            first_request.set()
+            return make_response("## Partial")
+        return make_response("# Final")
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        analyzer = AIAnalyzer(context_tokens=2500, max_tokens=800, map_max_tokens=200,
+                              tokens_per_minute=1000000)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.side_effect = create
+        
+        assert analyzer.analyze_stream(entries()) == "# Final"
+        assert analyzer.client.chat.completions.create.call_count > 2
+
+def test_openai_is_imported_lazily():
+    """Test that creating an analyzer does not load openai before the first request"""
+    code = ("import os, sys\n"
+            "os.environ['OPENAI_API_KEY'] = 'dummy-key'\n"
+            "import main\n"
+            "from src.ai_analyzer import AIAnalyzer\n"
+            "AIAnalyzer()\n"
+            "assert 'openai' not in sys.modules, 'openai imported'\n"
+            "assert 'feedparser' not in sys.modules, 'feedparser imported'\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+def test_focus_limits_the_system_prompt():
+    """Test that a digest focus is added to the system prompt of every request"""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+        general = AIAnalyzer()
+        policy = AIAnalyzer(focus='AI policy and regulation', scheduler=general.scheduler)
+    assert policy.scheduler is general.scheduler
+    assert 'AI policy and regulation' in policy._messages('prompt')[0]['content']
+    assert general._messages('prompt')[0]['content'] == SYSTEM_PROMPT
@@ -0,0 +1,120 @@
+"""
+Testing the long-running news daemon
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_daemon.py
+from datetime import datetime
+import pytest
+from src.daemon import NewsDaemon, next_digest_time
+from src.poll_scheduler import PollScheduler
+
+class FakeReader:
+    """Feed reader returning fixed entries per feed"""
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+        self.polled = []
+        self.new_keys = []
+        self.feed_stats = {}
+
+    def iter_entries(self, urls):
+        self.polled.append(list(urls))
+        self.new_keys = []
+        self.feed_stats = {}
+        for url in urls:
+            keys = []
+            for entry in self.feeds[url]:
+                keys.append(entry['link'])
+                self.new_keys.append(entry['link'])
+                yield entry
+            self.feed_stats[url] = {'keys': keys, 'not_modified': False}
+
+class FakeSeenIndex:
+    """Seen index remembering the marked keys"""
+
+    def __init__(self):
+        self.seen = []
+        self.pruned = 0
+
+    def mark_seen(self, keys):
+        self.seen.extend(keys)
+
+    def prune(self):
+        self.pruned += 1
+        return 0
+
+def make_daemon(feeds, digest=lambda entries: 'summary.md', seen_index=None):
+    """Create a daemon over fake feeds"""
+    reader = FakeReader(feeds)
+    scheduler = PollScheduler(min_interval=60, backoff=2)
+    return NewsDaemon(list(feeds), reader, scheduler, digest, seen_index=seen_index), reader, scheduler
+
+def test_next_digest_time():
+    """Test that the next of several daily times is chosen"""
+    now = datetime(2024, 11, 20, 12, 0)
+    assert next_digest_time(['07:00', '18:00'], now) == datetime(2024, 11, 20, 18, 0)
+    assert next_digest_time(['07:00'], now) == datetime(2024, 11, 21, 7, 0)
+
+def test_poll_collects_due_feeds_once():
+    """Test that only due feeds are polled and repeated entries are pending once"""
+    feeds = {'a': [{'link': 'a1'}], 'b': [{'link': 'b1'}]}
+    daemon, reader, scheduler = make_daemon(feeds)
+
+    assert daemon.poll(now=0) == 2
+    assert daemon.poll(now=30) == 0
+    assert reader.polled == [['a', 'b']]
+
+    # Same entries again: no news, so both feeds back off
+    assert daemon.poll(now=60) == 0
+    assert len(daemon.pending) == 2
+    assert scheduler.interval('a') == 120
+
+def test_digest_marks_entries_seen():
+    """Test that a digest receives the pending entries and forgets them"""
+    digested = []
+    seen_index = FakeSeenIndex()
+    daemon, _, _ = make_daemon({'a': [{'link': 'a1'}, {'link': 'a2'}]},
+                               digest=lambda entries: digested.append(entries) or 'summary.md',
+                               seen_index=seen_index)
+    daemon.poll(now=0)
+
+    assert daemon.write_digest() == 'summary.md'
+    assert digested == [[{'link': 'a1'}, {'link': 'a2'}]]
+    assert seen_index.seen == ['a1', 'a2']
+    assert seen_index.pruned == 1
+    assert daemon.pending == {}
+    assert daemon.write_digest() is None
+
+def test_failed_digest_keeps_entries():
+    """Test that entries survive a failed digest"""
+    def digest(entries):
+        raise RuntimeError("API down")
+
+    seen_index = FakeSeenIndex()
+    daemon, _, _ = make_daemon({'a': [{'link': 'a1'}]}, digest=digest, seen_index=seen_index)
+    daemon.poll(now=0)
+
+    with pytest.raises(RuntimeError):
+        daemon.write_digest()
+    assert list(daemon.pending) == ['a1']
+    assert seen_index.seen == []
+
+def test_pending_entries_are_bounded():
+    """Test that entries waiting for failing digests are dropped by age and count"""
+    feeds = {'a': [{'link': 'a1'}], 'b': [{'link': 'b1'}, {'link': 'b2'}], 'c': [{'link': 'c1'}]}
+    reader = FakeReader(feeds)
+    scheduler = PollScheduler(min_interval=60, backoff=2)
+    daemon = NewsDaemon(['a'], reader, scheduler, lambda entries: None, max_pending=2, max_pending_age=3600)
+
+    daemon.poll(now=0)
+    daemon.feed_urls = ['b']
+    daemon.poll(now=1800)
+    assert list(daemon.pending) == ['b1', 'b2']
+
+    daemon.feed_urls = ['c']
+    daemon.poll(now=7200)
+    assert list(daemon.pending) == ['c1']
@@ -0,0 +1,71 @@
+"""
+Testing the near-duplicate detection
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_deduplicator.py
+from unittest.mock import patch
+from src.deduplicator import Deduplicator, shingles
+
+def make_entry(title, description, feed_title, link):
+    """Create a feed entry"""
+    return {'title': title, 'description': description, 'published': 'Today',
+            'link': link, 'feed_title': feed_title}
+
+def test_same_story_from_several_feeds_is_merged():
+    """Test that copies are merged into the first one, which lists all sources"""
+    entries = [
+        make_entry('OpenAI launches GPT-5, its most capable model', 'OpenAI announced GPT-5 today with better reasoning',
+                   'Feed A', 'https://a.com/gpt5'),
+        make_entry('New phones tested', 'We tested the new phones', 'Feed A', 'https://a.com/phones'),
+        make_entry('OpenAI unveils GPT-5, its most capable model yet', 'OpenAI announced GPT-5 on Thursday with better reasoning',
+                   'Feed B', 'https://b.com/gpt5')
+    ]
+    
+    result = Deduplicator().deduplicate(entries)
+    
+    assert [entry['link'] for entry in result] == ['https://a.com/gpt5', 'https://a.com/phones']
+    assert result[0]['sources'] == [{'feed_title': 'Feed A', 'link': 'https://a.com/gpt5'},
+                                    {'feed_title': 'Feed B', 'link': 'https://b.com/gpt5'}]
+    assert 'sources' not in result[1]
+    assert 'sources' not in entries[0]  # The input entries are untouched
+
+def test_different_stories_and_empty_entries_are_kept():
+    """Test that unrelated stories and entries without text are not merged"""
+    entries = [
+        make_entry('Google releases Gemini 2', 'Google announced Gemini 2 today', 'Feed A', 'a'),
+        make_entry('OpenAI launches GPT-5', 'OpenAI announced GPT-5 today', 'Feed B', 'b'),
+        make_entry('', '', 'Feed C', 'c'),
+        make_entry('', '', 'Feed D', 'd')
+    ]
+    
+    assert Deduplicator().deduplicate(entries) == entries
+    assert shingles(entries[0]) == ['2', 'announced', 'gemini', 'google', 'releases', 'today']
+
+def test_only_lsh_candidates_are_compared():
+    """Test that an entry is only compared with entries sharing a band"""
+    entries = [make_entry(' '.join(f'title{index}w{word}' for word in range(5)),
+                          ' '.join(f'text{index}w{word}' for word in range(10)), 'Feed', str(index))
+               for index in range(200)]
+    
+    with patch('src.deduplicator.np.count_nonzero', wraps=__import__('numpy').count_nonzero) as comparisons:
+        result = Deduplicator().deduplicate(entries)
+    
+    assert len(result) == 200
+    assert comparisons.call_count < 200 * 199 / 2 / 10
+
+def test_iter_unique_adds_later_sources():
+    """Test that copies arriving later are added to the entry yielded before"""
+    entries = iter([
+        make_entry('Anthropic releases new Claude model', 'The new model is faster', 'Feed A', 'a'),
+        make_entry('Anthropic releases new Claude model today', 'The new model is faster', 'Feed B', 'b')
+    ])
+    
+    stream = Deduplicator().iter_unique(entries)
+    first = next(stream)
+    assert 'sources' not in first
+    assert list(stream) == []
+    assert [source['link'] for source in first['sources']] == ['a', 'b']
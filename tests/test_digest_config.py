@@ -0,0 +1,49 @@
+"""
+Testing the digest definitions
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_digest_config.py
+import json
+import os
+import pytest
+from src.digest_config import load_digests
+
+def write_digests(tmp_path, definitions):
+    """Write digest definitions to a JSON file"""
+    file_path = tmp_path / 'digests.json'
+    file_path.write_text(json.dumps(definitions))
+    return str(file_path)
+
+def test_defaults(tmp_path):
+    """Test that missing settings get defaults and a subdirectory per digest"""
+    file_path = write_digests(tmp_path, [
+        {'name': 'llm-research', 'focus': 'LLM research', 'vocabulary': ['llm', 'paper']},
+        {'name': 'ai-policy', 'threshold': 0.05, 'output_dir': '/tmp/policy'}
+    ])
+    digests = load_digests(file_path, 'summaries')
+
+    assert digests[0] == {'name': 'llm-research', 'focus': 'LLM research', 'vocabulary': ['llm', 'paper'],
+                          'threshold': 0.1, 'top_k': None, 'output_dir': os.path.join('summaries', 'llm-research')}
+    assert digests[1]['vocabulary'] is None
+    assert digests[1]['threshold'] == 0.05
+    assert digests[1]['output_dir'] == '/tmp/policy'
+
+@pytest.mark.parametrize('definitions', [
+    [],
+    [{'name': 'a b'}],
+    [{'name': 'news'}, {'name': 'news'}],
+    [{'name': 'news', 'prompt': 'typo'}]
+])
+def test_invalid_definitions(tmp_path, definitions):
+    """Test that empty lists, bad or duplicate names and unknown settings are rejected"""
+    with pytest.raises(ValueError):
+        load_digests(write_digests(tmp_path, definitions), 'summaries')
+
+def test_missing_file(tmp_path):
+    """Test the error for a missing file"""
+    with pytest.raises(FileNotFoundError):
+        load_digests(str(tmp_path / 'missing.json'), 'summaries')
@@ -0,0 +1,95 @@
+"""
+Testing the SQLite entry archive
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_entry_archive.py
+import pytest
+from src.entry_archive import EntryArchive
+
+def make_entry(title, description='', feed_title='AI Blog', published='Wed, 20 Nov 2024 11:00:00 GMT'):
+    """Create a structured feed entry"""
+    return {'title': title, 'description': description, 'published': published,
+            'link': f"https://example.com/{title.replace(' ', '-')}", 'feed_title': feed_title}
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = EntryArchive(str(tmp_path / 'archive.db'))
+    yield archive
+    archive.close()
+
+def test_entries_are_stored_once(archive):
+    """Test that archiving the same entry again updates it instead of adding a copy"""
+    archive.add([make_entry('Llama 4 released', 'Open weights')])
+    archive.add([make_entry('Llama 4 released', 'Open weights for everyone')])
+
+    assert len(archive) == 1
+    assert archive.search('everyone')[0]['title'] == 'Llama 4 released'
+    assert archive.search('weights NOT everyone') == []
+
+def test_invalid_query(archive):
+    """Test that a malformed query is reported as such"""
+    with pytest.raises(ValueError):
+        archive.search('AND OR')
+
+def test_iter_add_passes_entries_on(archive):
+    """Test that entries are archived while streaming through"""
+    entries = [make_entry(f"Story {index}") for index in range(5)]
+    assert list(archive.iter_add(iter(entries), batch_size=2)) == entries
+    assert len(archive) == 5
+
+def test_search_by_feed_and_date(archive):
+    """Test the feed and date range filters, newest first without a query"""
+    archive.add([
+        make_entry('Old robotics news', feed_title='Robot Weekly', published='Mon, 01 Jan 2024 10:00:00 GMT'),
+        make_entry('New robotics news', feed_title='Robot Weekly', published='Wed, 20 Nov 2024 10:00:00 GMT'),
+        make_entry('Model release', feed_title='AI Blog', published='Wed, 20 Nov 2024 11:00:00 GMT')
+    ])
+
+    assert [entry['title'] for entry in archive.search()] == ['Model release', 'New robotics news', 'Old robotics news']
+    assert [entry['title'] for entry in archive.search(feed='robot')] == ['New robotics news', 'Old robotics news']
+    assert [entry['title'] for entry in archive.search('robotics', since='2024-06-01')] == ['New robotics news']
+    assert [entry['title'] for entry in archive.search(until='2024-06-01')] == ['Old robotics news']
+
+def test_search_ranks_title_matches_first(archive):
+    """Test that stemmed matches in the title rank above matches in the description"""
+    archive.add([
+        make_entry('Weekly roundup', 'Also: new agents for coding'),
+        make_entry('Coding agent benchmark', 'A new benchmark')
+    ])
+    assert [entry['title'] for entry in archive.search('agent')] == ['Coding agent benchmark', 'Weekly roundup']
+
+def test_runs_link_summaries_to_entries(archive):
+    """Test that a run is stored with the entries it analyzed"""
+    entries = [make_entry('Llama 4 released'), make_entry('Gemini update')]
+    run_id = archive.record_run(entries, '# Summary', 'gpt-4', 'summaries/summary.md')
+
+    entry_id = archive.search('gemini')[0]['id']
+    runs = archive.runs(entry_id=entry_id)
+    assert [run['id'] for run in runs] == [run_id]
+    assert runs[0]['summary'] == '# Summary'
+    assert archive.runs()[0]['output_file'] == 'summaries/summary.md'
+
+def test_run_keeps_archived_full_text(archive):
+    """Test that recording a run with shortened entries keeps the archived descriptions"""
+    entry = make_entry('Llama 4 released', 'The full description of the release')
+    archive.add([entry])
+    run_id = archive.record_run([dict(entry, description='The full')], '# Summary', 'gpt-4')
+
+    stored = archive.search('llama')[0]
+    assert stored['description'] == 'The full description of the release'
+    assert [run['id'] for run in archive.runs(entry_id=stored['id'])] == [run_id]
+
+def test_entries_without_link_are_kept_apart(archive):
+    """Test that entries without link or GUID do not overwrite each other"""
+    archive.add([dict(make_entry('First story'), link=''), dict(make_entry('Second story'), link='')])
+
+    assert len(archive) == 2
+
+def test_invalid_dates(archive):
+    """Test that invalid dates are reported as ValueError"""
+    with pytest.raises(ValueError, match='YYYY-MM-DD'):
+        archive.search(since='20.11.2024')
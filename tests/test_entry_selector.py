@@ -0,0 +1,82 @@
+"""
+Testing the budget-constrained entry selection
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_entry_selector.py
+from datetime import datetime, timezone
+from src.entry_selector import EntrySelector, published_at
+
+NOW = datetime(2024, 11, 20, 12, 0, tzinfo=timezone.utc)
+
+def make_entry(title, description='', feed_title='Feed', published='Wed, 20 Nov 2024 11:00:00 GMT'):
+    """Create a feed entry"""
+    return {'title': title, 'description': description, 'published': published,
+            'link': f"https://example.com/{title.replace(' ', '-')}", 'feed_title': feed_title}
+
+def cost(entry):
+    """One token per word plus one for the entry itself"""
+    return 1 + len(entry['title'].split()) + len(entry['description'].split())
+
+def shrink(entry, budget):
+    """Keep as many description words as fit"""
+    words = entry['description'].split()
+    keep = budget - 1 - len(entry['title'].split())
+    if keep < 0:
+        raise ValueError("too large")
+    return dict(entry, description=' '.join(words[:keep]))
+
+def test_everything_fitting_is_kept():
+    """Test that no entry is dropped when the budget suffices"""
+    entries = [make_entry('first story'), make_entry('second story')]
+    selector = EntrySelector(100, cost)
+    
+    assert selector.select(entries) == entries
+    assert selector.dropped == []
+
+def test_best_value_per_token_wins():
+    """Test that relevance, source weight and freshness decide, and the order is kept"""
+    entries = [
+        make_entry('cheap but irrelevant'),
+        make_entry('relevant story'),
+        make_entry('old relevant story', published='Mon, 18 Nov 2024 11:00:00 GMT'),
+        make_entry('trusted source story', feed_title='Trusted')
+    ]
+    selector = EntrySelector(8, cost, source_weights={'Trusted': 2.0})
+    
+    result = selector.select(entries, relevance=[0.1, 0.5, 0.5, 0.4], now=NOW)
+    
+    assert [entry['title'] for entry in result] == ['relevant story', 'trusted source story']
+    assert len(selector.dropped) == 2
+
+def test_novelty_prefers_different_stories():
+    """Test that a second entry about the same story loses against a new story"""
+    entries = [
+        make_entry('openai releases gpt model'),
+        make_entry('openai releases gpt model today'),
+        make_entry('google gemini update')
+    ]
+    result = EntrySelector(10, cost).select(entries, relevance=[1.0, 0.95, 0.8], now=NOW)
+    
+    assert [entry['title'] for entry in result] == ['openai releases gpt model', 'google gemini update']
+
+def test_descriptions_are_shortened_to_fit():
+    """Test that the last entry is shortened instead of dropped"""
+    entries = [make_entry('first', 'one two three'), make_entry('second', 'four five six seven eight')]
+    selector = EntrySelector(9, cost, shrink)
+    
+    result = selector.select(entries, relevance=[1.0, 0.9], now=NOW)
+    
+    assert result == [entries[0], dict(entries[1], description='four five')]
+    assert selector.shortened == 1
+    assert sum(cost(entry) for entry in result) <= 9
+
+def test_published_at_formats():
+    """Test parsing of RSS and Atom dates"""
+    assert published_at({'published': 'Wed, 20 Nov 2024 11:00:00 GMT'}) == datetime(2024, 11, 20, 11, tzinfo=timezone.utc)
+    assert published_at({'published': '2024-11-20T11:00:00Z'}) == datetime(2024, 11, 20, 11, tzinfo=timezone.utc)
+    assert published_at({'published': 'Today'}) is None
+    assert published_at({}) is None
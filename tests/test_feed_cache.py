@@ -0,0 +1,62 @@
+"""
+Testing the feed cache for conditional requests
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_feed_cache.py
+from src.feed_cache import FeedCache
+
+URL = "https://example.com/feed"
+
+def test_request_headers(tmp_path):
+    """Test that stored validators become conditional request headers"""
+    cache = FeedCache(str(tmp_path / 'cache.json'))
+    cache.update(URL, '"abc"', 'Mon, 25 Nov 2024 08:00:00 GMT', 1024, 0.5)
+    
+    assert cache.request_headers(URL) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Mon, 25 Nov 2024 08:00:00 GMT'
+    }
+    assert cache.request_headers("https://other.com/feed") == {}
+
+def test_persisted_across_instances(tmp_path):
+    """Test that the cache survives a save and reload"""
+    cache_file = str(tmp_path / 'state' / 'cache.json')
+    cache = FeedCache(cache_file)
+    cache.update(URL, '"abc"', None, 2048, 1.0)
+    cache.save()
+    
+    reloaded = FeedCache(cache_file)
+    assert reloaded.get(URL)['size'] == 2048
+
+def test_invalidate(tmp_path):
+    """Test dropping single entries and the whole cache"""
+    cache = FeedCache(str(tmp_path / 'cache.json'))
+    cache.update(URL, '"abc"', None, 1, 0.1)
+    cache.update("https://other.com/feed", '"def"', None, 1, 0.1)
+    
+    cache.invalidate(URL)
+    assert cache.get(URL) is None
+    assert cache.get("https://other.com/feed") is not None
+    
+    cache.invalidate()
+    assert cache.get("https://other.com/feed") is None
+
+def test_expired_entries_are_ignored(tmp_path):
+    """Test that entries older than max_age are not used"""
+    cache = FeedCache(str(tmp_path / 'cache.json'), max_age=0)
+    cache.update(URL, '"abc"', None, 1, 0.1)
+    
+    assert cache.get(URL) is None
+    assert cache.request_headers(URL) == {}
+
+def test_broken_cache_file(tmp_path):
+    """Test that an unreadable cache file starts an empty cache"""
+    cache_file = tmp_path / 'cache.json'
+    cache_file.write_text("{not json")
+    
+    cache = FeedCache(str(cache_file), verbose=True)
+    assert cache.get(URL) is None
@@ -11,64 +11,62 @@ import pytest
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from src.feed_reader import FeedReader
+from src.token_counter import TokenCounter
 import time
+import gzip
+import threading
+import httpx
+import feedparser
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fixture answering every download with an empty feed, for tests that patch feedparser.parse"""
+    monkeypatch.setattr(FeedReader, '_download',
+                        lambda self, url, headers=None: make_response(b"<rss version='2.0'></rss>"))
+
+def make_feed(title, entries):
+    """Build the result of feedparser.parse with the given feed title and entries"""
+    feed = MagicMock()
+    feed.feed = feedparser.FeedParserDict(title=title)
+    feed.entries = [feedparser.FeedParserDict(entry) for entry in entries]
+    return feed
 
 @pytest.fixture
 def mock_feed_data():
     """Fixture providing mock RSS feed data"""
-    feed_info = MagicMock()
-    feed_info.title = 'Test Feed'
-    
-    mock_data = MagicMock()
-    mock_data.feed = feed_info
-    mock_data.entries = [
+    return make_feed('Test Feed', [
         {
             'title': 'Test Article',
             'description': 'Test Description',
-            'published': 'Mon, 22 Nov 2024 12:00:00 GMT',
+            'published': 'Today',
+            'published_parsed': time.localtime(),
             'link': 'https://example.com/article1',
         }
-    ]
-    return mock_data
+    ])
 
 @pytest.fixture
 def mock_today_feed_data():
     """Fixture providing mock RSS feed data with today's date"""
-    today = time.localtime()
-    
-    feed_info = MagicMock()
-    feed_info.title = 'Test Feed'
-    
-    mock_data = MagicMock()
-    mock_data.feed = feed_info
-    mock_data.entries = [
+    return make_feed('Test Feed', [
         {
             'title': 'Today Article',
             'description': 'This is a test description that is definitely longer than 200 characters so we can verify that the truncation is working properly. We need to make sure it has more than 200 characters so lets add some more text here to make it longer and longer until we are sure it will be truncated properly.',
             'published': 'Today',
-            'published_parsed': today,
+            'published_parsed': time.localtime(),
             'link': 'https://example.com/today'
         }
-    ]
-    return mock_data
+    ])
 
 @pytest.fixture
 def mock_mixed_dates_feed():
     """Fixture providing feed with both today's and old entries"""
-    today = time.localtime()
     old_date = time.struct_time((2023, 1, 1, 12, 0, 0, 0, 1, -1))
-    
-    feed_info = MagicMock()
-    feed_info.title = 'Test Feed'
-    
-    mock_data = MagicMock()
-    mock_data.feed = feed_info
-    mock_data.entries = [
+    return make_feed('Test Feed', [
         {
             'title': 'Today Article',
             'description': 'Today description',
             'published': 'Today',
-            'published_parsed': today,
+            'published_parsed': time.localtime(),
             'link': 'https://example.com/today'
         },
         {
@@ -78,10 +76,9 @@ def mock_mixed_dates_feed():
             'published_parsed': old_date,
             'link': 'https://example.com/old'
         }
-    ]
-    return mock_data
+    ])
 
-def test_fetch_feeds(mock_feed_data):
+def test_fetch_feeds(offline, mock_feed_data):
     """Test fetching feeds includes feed title"""
     urls = ["https://example.com/feed"]
     reader = FeedReader(urls)
@@ -96,22 +93,18 @@ def test_fetch_feeds(mock_feed_data):
             'title', 'description', 'published', 'link', 'feed_title'
         }
 
-def test_fetch_feeds_missing_attributes(caplog):
+def test_fetch_feeds_missing_attributes(offline, caplog):
     """Test handling of feeds with missing attributes"""
     urls = ["https://example.com/feed"]
     reader = FeedReader(urls, verbose=True)
     
-    feed_info = MagicMock()
-    feed_info.title = 'Unknown Feed'
-    
-    minimal_feed = MagicMock()
-    minimal_feed.feed = feed_info
-    minimal_feed.entries = [
+    minimal_feed = make_feed('Unknown Feed', [
         {
-            'title': 'Test Article'
+            'title': 'Test Article',
+            'published_parsed': time.localtime()
             # Missing other attributes
         }
-    ]
+    ])
     
     with patch('feedparser.parse') as mock_parse:
         mock_parse.return_value = minimal_feed
@@ -122,26 +115,21 @@ def test_fetch_feeds_missing_attributes(caplog):
         assert entries[0]['description'] == ''
         assert entries[0]['feed_title'] == 'Unknown Feed'
 
-def test_fetch_feeds_malformed_response(caplog):
+def test_fetch_feeds_malformed_response(offline, caplog):
     """Test handling of malformed feed responses"""
     urls = ["https://example.com/feed"]
     reader = FeedReader(urls, verbose=True)
     
-    feed_info = MagicMock()
-    feed_info.title = 'Empty Feed'
-    
-    malformed_feed = MagicMock()
-    malformed_feed.feed = feed_info
-    malformed_feed.entries = []
+    malformed_feed = make_feed('Empty Feed', [])
     
     with patch('feedparser.parse') as mock_parse:
         mock_parse.return_value = malformed_feed
         entries = reader.fetch_feeds()
         
         assert entries == []  # Should return empty list for malformed feed
-        assert "Found 0 entries" in caplog.text
+        assert "Found 0 total entries in Empty Feed" in caplog.text
 
-def test_fetch_feeds_none_response(caplog):
+def test_fetch_feeds_none_response(offline, caplog):
     """Test handling of None response"""
     urls = ["https://example.com/feed"]
     reader = FeedReader(urls, verbose=True)
@@ -152,7 +140,7 @@ def test_fetch_feeds_none_response(caplog):
         
         assert entries == []  # Should return empty list for None response
 
-def test_date_filtering(mock_mixed_dates_feed):
+def test_date_filtering(offline, mock_mixed_dates_feed):
     """Test that only today's entries are included"""
     urls = ["https://example.com/feed"]
     
@@ -164,8 +152,8 @@ def test_date_filtering(mock_mixed_dates_feed):
         assert len(entries) == 1
         assert entries[0]['title'] == 'Today Article'
 
-def test_description_truncation(mock_today_feed_data):
-    """Test that descriptions are truncated to 200 characters"""
+def test_description_truncation(offline, mock_today_feed_data):
+    """Test that descriptions are truncated to the token budget at a word boundary"""
     urls = ["https://example.com/feed"]
     
     with patch('feedparser.parse') as mock_parse:
@@ -174,9 +162,10 @@ def test_description_truncation(mock_today_feed_data):
         entries = reader.fetch_feeds()
         
         assert len(entries) == 1
-        assert len(entries[0]['description']) == 200
+        assert TokenCounter().count(entries[0]['description']) <= 50
+        assert mock_today_feed_data.entries[0]['description'].startswith(entries[0]['description'] + ' ')
 
-def test_feed_processing_logs(mock_mixed_dates_feed, caplog):
+def test_feed_processing_logs(offline, mock_mixed_dates_feed, caplog):
     """Test logging of feed processing statistics"""
     urls = ["https://example.com/feed"]
     
@@ -188,4 +177,294 @@ def test_feed_processing_logs(mock_mixed_dates_feed, caplog):
         log_text = caplog.text
         assert "Total entries across all feeds: 2" in log_text
         assert "Entries from today: 1" in log_text
-        assert "Filtered out 1 older entries" in log_text
\ No newline at end of file
+        assert "Filtered out 1 older entries" in log_text
+
+def make_rss(title, items):
+    """Build a minimal RSS document with the given (title, link) items dated today"""
+    pub_date = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    rows = ''.join(
+        f"<item><title>{t}</title><link>{l}</link><description>{t} text</description>"
+        f"<pubDate>{pub_date}</pubDate></item>"
+        for t, l in items
+    )
+    return (f"<?xml version='1.0'?><rss version='2.0'><channel><title>{title}</title>"
+            f"{rows}</channel></rss>").encode('utf-8')
+
+def make_response(content, status=200, etag=None, last_modified=None):
+    """Build the dict returned by FeedReader._download"""
+    return {'status': status, 'content': content, 'etag': etag, 'last_modified': last_modified}
+
+def test_concurrent_fetch_keeps_feed_order():
+    """Test that entries keep the URL order even when later feeds finish first"""
+    urls = [f"https://host{i}.example.com/feed" for i in range(4)]
+    delays = {url: 0.05 * (4 - i) for i, url in enumerate(urls)}
+    
+    def fake_download(url, headers=None):
+        time.sleep(delays[url])
+        return make_response(make_rss(f"Feed {url[12]}", [(f"Article {url[12]}", url + '/1')]))
+    
+    reader = FeedReader(urls, max_workers=4)
+    with patch.object(reader, '_download', side_effect=fake_download):
+        entries = reader.fetch_feeds()
+    
+    assert [e['feed_title'] for e in entries] == ['Feed 0', 'Feed 1', 'Feed 2', 'Feed 3']
+
+def test_per_host_limit():
+    """Test that no more than per_host_limit requests hit the same host at once"""
+    urls = [f"https://same.example.com/feed{i}" for i in range(6)]
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+    
+    def fake_download(url, headers=None):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.02)
+        with lock:
+            active['now'] -= 1
+        return make_response(make_rss('Same Feed', []))
+    
+    reader = FeedReader(urls, max_workers=6, per_host_limit=2)
+    with patch.object(reader, '_download', side_effect=fake_download):
+        reader.fetch_feeds()
+    
+    assert active['max'] == 2
+
+class TrickleStream(httpx.SyncByteStream):
+    """Response body that sends a few bytes at a time, slowly"""
+    def __iter__(self):
+        for _ in range(20):
+            time.sleep(0.05)
+            yield b' '
+
+def test_slow_feed_times_out_without_stopping_others():
+    """Test that a feed trickling bytes is cut off after the timeout"""
+    urls = ["https://slow.example.com/feed", "https://fast.example.com/feed"]
+    
+    def handler(request):
+        if request.url.host == 'slow.example.com':
+            return httpx.Response(200, stream=TrickleStream())
+        return httpx.Response(200, content=make_rss('Fast Feed', [('Fast Article', 'https://fast.example.com/1')]))
+    
+    # Every single read is quick, only the total time is too long
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    reader = FeedReader(urls, verbose=True, timeout=0.2, client=client)
+    start = time.monotonic()
+    entries = reader.fetch_feeds()
+    
+    assert [e['title'] for e in entries] == ['Fast Article']
+    assert time.monotonic() - start < 0.6
+    with pytest.raises(TimeoutError):
+        reader._download(urls[0])
+
+def test_conditional_get_skips_unchanged_feed(tmp_path, caplog):
+    """Test that stored validators are sent and a 304 skips parsing"""
+    from src.feed_cache import FeedCache
+    url = "https://cached.example.com/feed"
+    cache_file = str(tmp_path / 'feed_cache.json')
+    document = make_rss('Cached Feed', [('Cached Article', url + '/1')])
+    
+    reader = FeedReader([url], cache=FeedCache(cache_file))
+    with patch.object(reader, '_download', return_value=make_response(document, etag='"v1"')):
+        assert len(reader.fetch_feeds()) == 1
+    reader.save_cache()
+    
+    # Next run loads the validators from disk
+    reader = FeedReader([url], verbose=True, cache=FeedCache(cache_file))
+    with patch.object(reader, '_download', return_value=make_response(b'', status=304)) as mock_download, \
+         patch('feedparser.parse') as mock_parse:
+        entries = reader.fetch_feeds()
+    
+    assert entries == []
+    mock_download.assert_called_once_with(url, {'If-None-Match': '"v1"'})
+    mock_parse.assert_not_called()
+    assert f"Feeds not modified: 1 (saved {len(document)/1024:.1f}KB" in caplog.text
+
+def test_seen_entries_are_not_returned_again(tmp_path):
+    """Test that a second run only returns entries no earlier run has processed"""
+    from src.seen_index import SeenIndex
+    urls = ["https://a.example.com/feed", "https://b.example.com/feed"]
+    documents = {
+        urls[0]: make_rss('Feed A', [('Story', 'https://news.example.com/story?utm_source=a')]),
+        # The same story syndicated by a second feed
+        urls[1]: make_rss('Feed B', [('Story', 'https://news.example.com/story'),
+                                     ('Other', 'https://news.example.com/other')])
+    }
+    index = SeenIndex(str(tmp_path / 'seen.db'))
+    
+    reader = FeedReader(urls, cache=None, seen_index=index)
+    with patch.object(reader, '_download', side_effect=lambda url, headers=None: make_response(documents[url])):
+        first = reader.fetch_feeds()
+        assert [e['feed_title'] for e in first] == ['Feed A', 'Feed B']
+        reader.mark_seen()
+        
+        documents[urls[1]] = make_rss('Feed B', [('Other', 'https://news.example.com/other'),
+                                                 ('Fresh', 'https://news.example.com/fresh')])
+        second = reader.fetch_feeds()
+    
+    assert [e['title'] for e in second] == ['Fresh']
+
+def test_download_uses_shared_client():
+    """Test that all feeds go through one client and compressed bodies are decoded"""
+    requests_seen = []
+    
+    def handler(request):
+        requests_seen.append(request)
+        body = gzip.compress(make_rss('Zipped Feed', [('Zipped', str(request.url) + '/1')]))
+        return httpx.Response(200, content=body,
+                              headers={'Content-Encoding': 'gzip', 'ETag': '"z"'})
+    
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    urls = ["https://a.example.com/feed", "https://a.example.com/other"]
+    reader = FeedReader(urls, client=client)
+    entries = reader.fetch_feeds()
+    reader.close()
+    
+    assert [e['feed_title'] for e in entries] == ['Zipped Feed', 'Zipped Feed']
+    assert len(requests_seen) == 2
+    assert not client.is_closed  # A client passed in is owned by the caller
+
+def test_download_not_modified_and_errors():
+    """Test 304 handling and that HTTP errors are raised"""
+    
+    def handler(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(500)
+    
+    reader = FeedReader([], client=httpx.Client(transport=httpx.MockTransport(handler)))
+    assert reader._download("https://a.example.com/feed", {'If-None-Match': '"v1"'})['status'] == 304
+    with pytest.raises(httpx.HTTPStatusError):
+        reader._download("https://a.example.com/feed")
+
+def test_cache_is_only_saved_after_processing(tmp_path):
+    """Test that a run failing after the fetch does not lose its entries"""
+    from src.feed_cache import FeedCache
+    url = "https://cached.example.com/feed"
+    cache_file = str(tmp_path / 'feed_cache.json')
+    document = make_rss('Cached Feed', [('Cached Article', url + '/1')])
+    
+    def handler(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=document, headers={'ETag': '"v1"'})
+    
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    
+    # First run fetches, but the analysis fails before save_cache()
+    assert len(FeedReader([url], cache=FeedCache(cache_file), client=client).fetch_feeds()) == 1
+    
+    reader = FeedReader([url], cache=FeedCache(cache_file), client=client)
+    assert len(reader.fetch_feeds()) == 1
+    reader.save_cache()
+    
+    assert FeedReader([url], cache=FeedCache(cache_file), client=client).fetch_feeds() == []
+
+def test_not_modified_refreshes_cache_entry(tmp_path):
+    """Test that a 304 keeps an unchanged feed from expiring"""
+    from src.feed_cache import FeedCache
+    url = "https://cached.example.com/feed"
+    cache = FeedCache(str(tmp_path / 'feed_cache.json'))
+    with patch('time.time', return_value=time.time() - 3600):
+        cache.update(url, '"v1"', None, 100, 0.5)
+    
+    reader = FeedReader([url], cache=cache)
+    with patch.object(reader, '_download', return_value=make_response(b'', status=304)):
+        reader.fetch_feeds()
+    
+    assert time.time() - cache.get(url)['stored_at'] < 60
+
+def test_iter_entries_yields_before_later_feeds_finish():
+    """Test that entries of a finished feed are handed on while later feeds still download"""
+    release = threading.Event()
+    
+    def fake_download(url, headers=None):
+        if url.endswith('slow'):
+            assert release.wait(timeout=5)
+        return make_response(make_rss(url, [(f"Article {url}", url + '/1')]))
+    
+    urls = iter(["https://fast.example.com/fast", "https://slow.example.com/slow"])
+    reader = FeedReader([], max_workers=2)
+    with patch.object(reader, '_download', side_effect=fake_download):
+        entries = reader.iter_entries(urls)
+        first = next(entries)
+        assert first['title'] == "Article https://fast.example.com/fast"
+        
+        release.set()
+        rest = list(entries)
+    
+    assert [e['title'] for e in rest] == ["Article https://slow.example.com/slow"]
+    assert len(reader.new_keys) == 2
+
+class ChunkedStream(httpx.SyncByteStream):
+    """Response body sent in small chunks, counting the chunks that were read"""
+    def __init__(self, content, size=256):
+        self.chunks = [content[i:i + size] for i in range(0, len(content), size)]
+        self.read = 0
+    
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+def make_dated_rss(dates):
+    """Build an RSS document with one item per date, newest first as given"""
+    rows = ''.join(
+        f"<item><title>Article {i}</title><link>https://example.com/{i}</link>"
+        f"<description>{'Long text ' * 50}</description><pubDate>{date}</pubDate></item>"
+        for i, date in enumerate(dates)
+    )
+    return (f"<?xml version='1.0'?><rss version='2.0'><channel><title>Dated Feed</title>"
+            f"{rows}</channel></rss>").encode('utf-8')
+
+def chunked_client(document):
+    """Client answering every request with the document in chunks"""
+    streams = []
+    
+    def handler(request):
+        streams.append(ChunkedStream(document))
+        return httpx.Response(200, stream=streams[-1])
+    return httpx.Client(transport=httpx.MockTransport(handler)), streams
+
+def test_byte_cap_keeps_first_entries():
+    """Test that a feed is only read up to max_bytes, keeping the entries within them"""
+    from src.metrics import RunMetrics
+    today = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    document = make_dated_rss([today] * 50)
+    
+    for stream_parse in (False, True):
+        client, streams = chunked_client(document)
+        metrics = RunMetrics()
+        reader = FeedReader(["https://big.example.com/feed"], client=client, metrics=metrics,
+                            max_bytes=4096, stream_parse=stream_parse)
+        entries = reader.fetch_feeds()
+        
+        assert 0 < len(entries) < 50
+        assert streams[0].read <= 4096 // 256 + 1
+        assert metrics.counters['feeds_truncated'] == 1
+        assert metrics.counters['bytes_downloaded'] == 4096
+
+def test_stream_parse_stops_at_older_entries():
+    """Test that streaming stops downloading a feed sorted newest first once entries are older than today"""
+    today = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    document = make_dated_rss([today] * 2 + ['Mon, 01 Jan 2024 12:00:00 +0000'] * 200)
+    client, streams = chunked_client(document)
+    
+    reader = FeedReader(["https://long.example.com/feed"], client=client, stream_parse=True)
+    entries = reader.fetch_feeds()
+    
+    assert [e['title'] for e in entries] == ['Article 0', 'Article 1']
+    assert entries[0]['feed_title'] == 'Dated Feed'
+    assert streams[0].read < len(streams[0].chunks) / 4
+
+def test_stream_parse_falls_back_to_feedparser():
+    """Test that a feed that is not well-formed XML is parsed by feedparser instead"""
+    today = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    document = make_dated_rss([today]).replace(b'Long text', b'Long&nbsp;text')
+    client, streams = chunked_client(document)
+    
+    reader = FeedReader(["https://html.example.com/feed"], client=client, stream_parse=True)
+    entries = reader.fetch_feeds()
+    
+    assert [e['title'] for e in entries] == ['Article 0']
+    assert len(streams) == 2
@@ -10,29 +10,37 @@ License: MIT
 import pytest
 from unittest.mock import patch, MagicMock
 import json
+import os
 from src.url_parser import URLFileParser
 from src.feed_reader import FeedReader
 from src.ai_analyzer import AIAnalyzer
 import time
+import feedparser
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fixture answering every download with an empty feed, for tests that patch feedparser.parse"""
+    monkeypatch.setattr(FeedReader, '_download', lambda self, url, headers=None: {
+        'status': 200, 'content': b"<rss version='2.0'></rss>", 'etag': None, 'last_modified': None})
+
+def make_feed(title, entries):
+    """Build the result of feedparser.parse with the given feed title and entries"""
+    return feedparser.FeedParserDict(feed=feedparser.FeedParserDict(title=title),
+                                     entries=[feedparser.FeedParserDict(entry) for entry in entries])
 
 @pytest.fixture
 def mock_feed_data():
     """Create mock feed data with today's entry"""
     today = time.localtime()
-    return {
-        'feed': {
-            'title': 'Test Feed'
-        },
-        'entries': [
-            {
-                'title': 'Today AI News',
-                'description': 'Test description',
-                'published': 'Today',
-                'published_parsed': today,
-                'link': 'http://example.com/today'
-            }
-        ]
-    }
+    return make_feed('Test Feed', [
+        {
+            'title': 'Today AI News',
+            'description': 'Test description',
+            'published': 'Today',
+            'published_parsed': today,
+            'link': 'http://example.com/today'
+        }
+    ])
 
 @pytest.fixture
 def mock_openai_response():
@@ -51,7 +59,7 @@ def mock_openai_response():
     
     return MockResponse("# AI News Summary\n\nTest summary")
 
-def test_full_pipeline(tmp_path, mock_feed_data, mock_openai_response):
+def test_full_pipeline(offline, tmp_path, mock_feed_data, mock_openai_response):
     """Test the complete pipeline with all components"""
     # Setup test files
     source_file = tmp_path / "news_sources.txt"
@@ -80,8 +88,9 @@ def test_full_pipeline(tmp_path, mock_feed_data, mock_openai_response):
             assert len(entries[0]['description']) <= 200
             
             # Test API processing
-            analyzer = AIAnalyzer(verbose=True)
-            result = analyzer.process_feeds(entries)
+            with patch.dict(os.environ, {'OPENAI_API_KEY': 'dummy-key'}):
+                analyzer = AIAnalyzer(verbose=True)
+                result = analyzer.process_feeds(entries)
             
             # Verify final output
             assert result.startswith("# AI News Summary")
@@ -90,21 +99,18 @@ def test_full_pipeline(tmp_path, mock_feed_data, mock_openai_response):
             entries_json = json.dumps(entries)
             assert len(entries_json)/1024 < 100  # Should be well under 100KB
 
-def test_pipeline_with_no_today_entries(tmp_path, mock_openai_response):
+def test_pipeline_with_no_today_entries(offline, tmp_path, mock_openai_response):
     """Test pipeline behavior when no today's entries are found"""
     source_file = tmp_path / "news_sources.txt"
     source_file.write_text("https://example.com/feed")
     
-    old_feed_data = {
-        'feed': {'title': 'Test Feed'},
-        'entries': [{
-            'title': 'Old News',
-            'description': 'Old description',
-            'published': 'Old',
-            'published_parsed': time.struct_time((2023, 1, 1, 12, 0, 0, 0, 1, -1)),
-            'link': 'http://example.com/old'
-        }]
-    }
+    old_feed_data = make_feed('Test Feed', [{
+        'title': 'Old News',
+        'description': 'Old description',
+        'published': 'Old',
+        'published_parsed': time.struct_time((2023, 1, 1, 12, 0, 0, 0, 1, -1)),
+        'link': 'http://example.com/old'
+    }])
     
     with patch('feedparser.parse') as mock_parse:
         mock_parse.return_value = old_feed_data
@@ -115,4 +121,145 @@ def test_pipeline_with_no_today_entries(tmp_path, mock_openai_response):
         feed_reader = FeedReader(urls, verbose=True)
         entries = feed_reader.fetch_feeds()
         
-        assert len(entries) == 0
\ No newline at end of file
+        assert len(entries) == 0
+def test_digests_share_one_fetch(tmp_path):
+    """Test that every digest gets its own relevant entries and a failing digest does not stop the others"""
+    from main import summarize_digests
+
+    entries = [
+        {'title': 'New LLM beats benchmark', 'description': 'A language model paper on transformer training',
+         'published': '', 'link': 'http://example.com/llm', 'feed_title': 'Research'},
+        {'title': 'EU passes AI Act', 'description': 'New regulation and policy for artificial intelligence',
+         'published': '', 'link': 'http://example.com/act', 'feed_title': 'Policy'}
+    ]
+    analyzed = {}
+
+    def make_digest(name, vocabulary, fail=False):
+        analyzer = AIAnalyzer(api_key='dummy-key', focus=name)
+
+        def process_feeds(digest_entries, output=None):
+            if fail:
+                raise RuntimeError("API down")
+            assert isinstance(digest_entries, list)
+            analyzed[name] = [entry['title'] for entry in digest_entries]
+            return f"# {name}"
+
+        analyzer.process_feeds = process_feeds
+        return {'name': name, 'vocabulary': vocabulary, 'threshold': 0.1, 'top_k': None,
+                'output_dir': str(tmp_path / name), 'analyzer': analyzer}
+
+    digests = [make_digest('research', ['llm', 'benchmark', 'transformer']),
+               make_digest('policy', ['regulation', 'policy', 'ai act'])]
+    output_files = summarize_digests(iter(entries), digests, MagicMock())
+
+    assert analyzed == {'research': ['New LLM beats benchmark'], 'policy': ['EU passes AI Act']}
+    assert len(output_files) == 2
+    assert open(output_files[1]).read() == '# policy'
+
+    # Digests written at the same time into one directory get files of their own
+    shared = [make_digest('research', ['llm']), make_digest('policy', ['policy'])]
+    for digest in shared:
+        digest['output_dir'] = str(tmp_path / 'shared')
+    summarize_digests(iter(entries), shared, MagicMock())
+    assert sorted(name.split('_')[0] for name in os.listdir(tmp_path / 'shared')) == ['policy', 'research']
+
+    # top_k keeps the best scoring entries only
+    top = make_digest('top', ['llm', 'benchmark', 'regulation'])
+    top['threshold'] = 0.0
+    top['top_k'] = 1
+    summarize_digests(iter(entries), [top], MagicMock())
+    assert analyzed['top'] == ['New LLM beats benchmark']
+
+    digests = [make_digest('llm', ['llm']), make_digest('broken', ['policy'], fail=True)]
+    with pytest.raises(RuntimeError):
+        summarize_digests(iter(entries), digests, MagicMock())
+    assert len(os.listdir(tmp_path / 'llm')) == 1
+
+def test_merge_skips_seen_and_repeated_entries(tmp_path):
+    """Test that the merge analyzes new entries once and only then marks them seen"""
+    from main import merge_shards
+    from src.seen_index import SeenIndex
+    from src.sharding import write_shard
+
+    directory = str(tmp_path / 'shards')
+    write_shard([('old', {'title': 'Old'}), ('new', {'title': 'New'})], directory, 0, 2)
+    write_shard([('new', {'title': 'New again'}), ('other', {'title': 'Other'})], directory, 1, 2)
+    seen_index = SeenIndex(str(tmp_path / 'seen.db'))
+    seen_index.mark_seen(['old'])
+
+    analyzed = []
+    merge_shards(directory, lambda entries: analyzed.extend(entries), seen_index, MagicMock())
+
+    assert [entry['title'] for entry in analyzed] == ['New', 'Other']
+    assert seen_index.seen_keys(['new', 'other']) == {'new', 'other'}
+    assert os.listdir(directory) == []
+
+def test_resume_after_failed_analysis(tmp_path, monkeypatch):
+    """Test that a run failing at the analysis keeps its entries and resumes without fetching again"""
+    import main
+    from src.seen_index import SeenIndex
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'dummy-key')
+    sources_file = tmp_path / 'sources.txt'
+    sources_file.write_text("https://feed1.example.com/rss\nhttps://feed2.example.com/rss\n"
+                            "https://feed3.example.com/rss\n")
+    state_dir = tmp_path / 'state'
+    argv = ['--sources', str(sources_file), '--output-dir', str(tmp_path / 'summaries'), '--state-dir', str(state_dir)]
+
+    pub_date = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    downloads = []
+
+    stories = {'https://feed1.example.com/rss': ('New LLM from feed1', 'A language model tops the benchmark'),
+               'https://feed2.example.com/rss': ('New LLM from feed2', 'GPU prices fall as training demand cools'),
+               # Syndicated, merged into the entry of feed1 after that was passed on
+               'https://feed3.example.com/rss': ('New LLM from feed1', 'A language model tops the benchmark')}
+
+    def fake_download(self, url, headers=None):
+        downloads.append(url)
+        title, description = stories[url]
+        item = (f"<item><title>{title}</title><link>{url}/1</link>"
+                f"<description>{description}</description><pubDate>{pub_date}</pubDate></item>")
+        content = f"<?xml version='1.0'?><rss version='2.0'><channel><title>{url}</title>{item}</channel></rss>"
+        return {'status': 200, 'content': content.encode('utf-8'), 'etag': None, 'last_modified': None}
+
+    def failing_analysis(self, entries, output=None):
+        raise RuntimeError("API timeout")
+
+    analyzed = []
+    sources = {}
+
+    def analysis(self, entries, output=None):
+        analyzed.extend(entry['title'] for entry in entries)
+        sources.update((entry['title'], len(entry.get('sources', []))) for entry in entries)
+        return "# AI News Summary"
+
+    monkeypatch.setattr(FeedReader, '_download', fake_download)
+    monkeypatch.setattr(AIAnalyzer, 'process_feeds', failing_analysis)
+    with pytest.raises(RuntimeError):
+        main.main(argv)
+
+    run_id = os.listdir(state_dir / 'runs')[0]
+    with open(state_dir / 'runs' / run_id / 'manifest.json') as f:
+        assert list(json.load(f)['stages']) == ['urls', 'entries', 'unique']
+    assert len(downloads) == 3
+
+    monkeypatch.setattr(AIAnalyzer, 'process_feeds', analysis)
+    main.main(argv + ['--resume', run_id])
+
+    assert len(downloads) == 3
+    assert sorted(analyzed) == ['New LLM from feed1', 'New LLM from feed2']
+    assert sources == {'New LLM from feed1': 2, 'New LLM from feed2': 0}
+    assert len(os.listdir(tmp_path / 'summaries')) == 1
+    assert os.listdir(state_dir / 'runs') == []
+    seen_index = SeenIndex(str(state_dir / 'seen.db'))
+    assert len(seen_index) == 3
+
+def test_search_reports_invalid_input(tmp_path, capsys):
+    """Test that invalid dates and query syntax are reported without a traceback"""
+    import main
+
+    main.main(['--state-dir', str(tmp_path), '--search', 'llama', '--since', '20.11.2024'])
+    assert "Invalid date '20.11.2024'" in capsys.readouterr().err
+
+    main.main(['--state-dir', str(tmp_path), '--search', 'llama AND'])
+    assert "Invalid search query" in capsys.readouterr().err
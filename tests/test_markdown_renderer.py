@@ -0,0 +1,60 @@
+"""
+Testing the local markdown rendering of structured analysis
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_markdown_renderer.py
+from datetime import datetime
+from src.markdown_renderer import render_markdown
+
+ENTRIES = [
+    {'title': 'New model released', 'link': 'https://a.com/1', 'feed_title': 'Feed A'},
+    {'title': 'Phone review', 'link': 'https://a.com/2', 'feed_title': 'Feed A'},
+    {'title': 'Model launch coverage', 'link': 'https://b.com/1', 'feed_title': 'Feed B'},
+    {'title': 'AI regulation vote', 'link': 'https://b.com/2', 'feed_title': 'Feed B'}
+]
+
+RESULTS = [
+    {'relevance': 9, 'category': 'Models', 'analysis': 'Big step.', 'cluster': 'model-launch'},
+    {'relevance': 1, 'category': 'Gadgets', 'analysis': '', 'cluster': 'phone'},
+    {'relevance': 7, 'category': 'Models', 'analysis': 'Same story.', 'cluster': 'model-launch'},
+    {'relevance': 8, 'category': 'Policy', 'analysis': 'New rules.', 'cluster': 'eu-vote'}
+]
+
+def test_render_groups_and_links():
+    """Test that titles and links come from the entries and clusters are grouped"""
+    markdown = render_markdown(ENTRIES, RESULTS, summary='Busy day.', date=datetime(2024, 11, 22))
+    
+    assert markdown.startswith('# AI News Summary - 2024-11-22')
+    assert 'Busy day.' in markdown
+    assert '### [New model released](https://a.com/1)' in markdown
+    assert '- [Model launch coverage](https://b.com/1) (Feed B)' in markdown
+    assert 'Phone review' not in markdown
+    # The larger category comes first
+    assert markdown.index('## Models') < markdown.index('## Policy')
+
+def test_render_without_summary_or_results():
+    """Test the fallback summary and entries without results"""
+    markdown = render_markdown(ENTRIES, [None, None, None, RESULTS[3]])
+    
+    assert '1 relevant stories in 1 categories.' in markdown
+    assert 'AI regulation vote' in markdown
+
+def test_render_malformed_results():
+    """Test that results with wrong types from the model are coerced instead of failing"""
+    results = [
+        {'relevance': '9', 'category': None, 'analysis': None, 'cluster': 3},
+        {'relevance': 'high', 'category': 'Gadgets', 'analysis': 'Skipped.'},
+        {'relevance': None, 'category': ['Models'], 'analysis': {'text': 'x'}},
+        'not an object'
+    ]
+    markdown = render_markdown(ENTRIES, results)
+    
+    assert '## Other' in markdown
+    assert '### [New model released](https://a.com/1)' in markdown
+    assert 'Skipped.' not in markdown
+    assert 'AI regulation vote' not in markdown
+    assert '1 relevant stories in 1 categories.' in markdown
@@ -0,0 +1,81 @@
+"""
+Testing the run metrics
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_metrics.py
+import json
+import time
+from src.metrics import RunMetrics, DISABLED
+
+def test_nested_stages_are_exclusive():
+    """Test that time of a nested stage only counts for the inner stage"""
+    metrics = RunMetrics()
+    with metrics.stage('analyze'):
+        time.sleep(0.02)
+        with metrics.stage('api'):
+            time.sleep(0.05)
+
+    assert metrics.stages['api']['seconds'] >= 0.05
+    assert 0.02 <= metrics.stages['analyze']['seconds'] < 0.05
+    assert metrics.stages['analyze']['calls'] == 1
+
+def test_iter_stage_charges_producing_the_items():
+    """Test that a lazy stage is charged for producing items, not for consuming them"""
+    metrics = RunMetrics()
+
+    def slow_items():
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    items = []
+    with metrics.stage('analyze'):
+        for item in metrics.iter_stage(slow_items(), 'fetch'):
+            items.append(item)
+            time.sleep(0.02)
+
+    assert items == [0, 1, 2]
+    assert 0.03 <= metrics.stages['fetch']['seconds'] < 0.06
+    assert metrics.stages['fetch']['calls'] == 4  # The last call ends the iteration
+    assert metrics.stages['analyze']['seconds'] >= 0.06
+
+def test_report_and_prometheus(tmp_path):
+    """Test the JSON report and the Prometheus textfile"""
+    metrics = RunMetrics(run_id='test')
+    with metrics.stage('parse'):
+        pass
+    metrics.count('entries_parsed', 12)
+    metrics.count('entries_parsed', 3)
+    metrics.feed('https://example.com/feed?a="1"', download_seconds=0.5, bytes=2048)
+    metrics.request(seconds=1.2, prompt_tokens=900, completion_tokens=300)
+
+    metrics.write_json(str(tmp_path / 'run.json'))
+    report = json.loads((tmp_path / 'run.json').read_text())
+    assert report['run_id'] == 'test'
+    assert report['counters'] == {'entries_parsed': 15}
+    assert report['stages']['parse']['calls'] == 1
+    assert report['requests'][0]['prompt_tokens'] == 900
+
+    metrics.write_prometheus(str(tmp_path / 'newspipe.prom'))
+    text = (tmp_path / 'newspipe.prom').read_text()
+    assert '# TYPE newspipe_entries_parsed gauge\nnewspipe_entries_parsed 15\n' in text
+    assert 'newspipe_stage_seconds{stage="parse"} ' in text
+    assert 'newspipe_feed_bytes{feed="https://example.com/feed?a=\\"1\\""} 2048' in text
+    assert 'newspipe_feed_entries' not in text
+
+def test_disabled_metrics_record_nothing():
+    """Test that disabled metrics pass items through without recording"""
+    with DISABLED.stage('fetch'):
+        assert list(DISABLED.iter_stage(iter([1, 2]), 'parse')) == [1, 2]
+    DISABLED.count('entries_parsed')
+    DISABLED.feed('https://example.com/feed', entries=1)
+    DISABLED.request(seconds=1)
+
+    assert DISABLED.stages == {}
+    assert DISABLED.counters == {}
+    assert DISABLED.feeds == {}
+    assert DISABLED.requests == []
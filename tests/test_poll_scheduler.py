@@ -0,0 +1,49 @@
+"""
+Testing the adaptive polling intervals
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_poll_scheduler.py
+from src.poll_scheduler import PollScheduler
+
+URL = 'https://example.com/feed'
+
+def test_new_feeds_are_due():
+    """Test that feeds never polled are due immediately"""
+    scheduler = PollScheduler(min_interval=60)
+    assert scheduler.due([URL], now=0) == [URL]
+    scheduler.record(URL, changed=True, now=0)
+    assert scheduler.due([URL], now=30) == []
+    assert scheduler.due([URL], now=60) == [URL]
+
+def test_busy_feed_is_polled_at_half_its_update_gap():
+    """Test that a feed updating every hour is polled every half hour"""
+    scheduler = PollScheduler(min_interval=60, max_interval=86400)
+    for hour in range(5):
+        scheduler.record(URL, changed=True, now=hour * 3600)
+    assert scheduler.interval(URL) == 1800
+    assert scheduler.next_poll([URL]) == 4 * 3600 + 1800
+
+def test_quiet_feed_backs_off_up_to_the_maximum():
+    """Test that polls without news stretch the interval"""
+    scheduler = PollScheduler(min_interval=60, max_interval=600, backoff=2)
+    scheduler.record(URL, changed=True, now=0)
+    scheduler.record(URL, changed=False, now=60)
+    assert scheduler.interval(URL) == 120
+    for step in range(10):
+        scheduler.record(URL, changed=False, now=1000 + step)
+    assert scheduler.interval(URL) == 600
+
+def test_intervals_survive_a_restart(tmp_path):
+    """Test that the learned intervals are stored"""
+    file_path = str(tmp_path / 'poll_state.json')
+    scheduler = PollScheduler(file_path, min_interval=60, backoff=2)
+    scheduler.record(URL, changed=False, now=0)
+    scheduler.save()
+
+    restarted = PollScheduler(file_path, min_interval=60)
+    assert restarted.interval(URL) == 120
+    assert restarted.due([URL], now=100) == []
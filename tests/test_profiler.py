@@ -0,0 +1,100 @@
+"""
+Testing the stage profiler
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_profiler.py
+import pstats
+import tracemalloc
+import pytest
+from src.metrics import RunMetrics
+from src.profiler import StageProfiler
+
+def parse_feed():
+    return sum(range(1000))
+
+def build_prompt():
+    return [str(number) * 100 for number in range(1000)]
+
+def functions(path):
+    """Names of the functions in a .prof file"""
+    return {function for _, _, function in pstats.Stats(str(path)).stats}
+
+def test_cpu_profiles_are_scoped_to_stages(tmp_path):
+    """Test that a nested stage pauses the profile of the enclosing stage"""
+    profiler = StageProfiler('cpu')
+    metrics = RunMetrics(profiler=profiler)
+    with metrics.stage('fetch'):
+        with metrics.stage('parse'):
+            parse_feed()
+        build_prompt()
+
+    files = profiler.dump(str(tmp_path))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['cpu.txt', 'fetch.prof', 'parse.prof']
+    assert len(files) == 3
+    assert 'parse_feed' in functions(tmp_path / 'parse.prof')
+    assert 'parse_feed' not in functions(tmp_path / 'fetch.prof')
+    assert 'build_prompt' in functions(tmp_path / 'fetch.prof')
+    assert '== parse ==' in (tmp_path / 'cpu.txt').read_text()
+
+def test_memory_reports_allocations_of_traced_calls(tmp_path):
+    """Test that memory kept by a stage is reported and tracing stops after the traced calls"""
+    profiler = StageProfiler('memory', memory_calls=2)
+    kept = []
+    for _ in range(3):
+        with profiler.stage('build_prompt'):
+            kept.append(build_prompt())
+    assert not tracemalloc.is_tracing()
+
+    profiler.dump(str(tmp_path))
+    report = (tmp_path / 'memory.txt').read_text()
+
+    assert report.startswith('== build_prompt: 2 of 3 calls traced')
+    assert 'test_profiler.py' in report
+    assert 'profiler.py:' not in report.replace('test_profiler.py', '')
+
+def test_unknown_mode():
+    """Test that an unknown mode is rejected"""
+    with pytest.raises(ValueError):
+        StageProfiler('heap')
+
+@pytest.mark.parametrize('single_profiler', [False, True])
+def test_threads_profiled_at_once(tmp_path, monkeypatch, single_profiler):
+    """Test that stages on several threads at once are profiled or skipped without errors"""
+    import threading
+    import src.profiler
+    monkeypatch.setattr(src.profiler, 'SINGLE_PROFILER', single_profiler)
+    profiler = StageProfiler('cpu')
+    metrics = RunMetrics(profiler=profiler)
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def fetch():
+        try:
+            with metrics.stage('parse'):
+                barrier.wait(timeout=5)
+                parse_feed()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    profiler.dump(str(tmp_path))
+
+    assert errors == []
+    assert 'parse_feed' in functions(tmp_path / 'parse.prof')
+    report = (tmp_path / 'cpu.txt').read_text()
+    assert ('3 calls not profiled' in report) == single_profiler
+
+    # The profiler is free again once the threads left their stages
+    with metrics.stage('fetch'):
+        build_prompt()
+    profiler.dump(str(tmp_path))
+    assert 'build_prompt' in functions(tmp_path / 'fetch.prof')
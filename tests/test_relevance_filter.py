@@ -0,0 +1,52 @@
+"""
+Testing the local relevance filter
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_relevance_filter.py
+from src.relevance_filter import RelevanceFilter, tokenize
+
+ENTRIES = [
+    {'title': 'Best smartphones of the year', 'description': 'We tested phones and their cameras'},
+    {'title': 'OpenAI releases a new GPT model', 'description': 'The large language model beats benchmarks'},
+    {'title': 'Startup raises money', 'description': 'A fintech round, the product uses AI to find fraud'},
+    {'title': 'Weekend recipes', 'description': ''}
+]
+
+def test_tokenize_adds_word_pairs():
+    """Test that phrases of the vocabulary can be matched"""
+    assert tokenize("Large Language-Model") == ['large', 'language', 'model', 'large language', 'language model']
+
+def test_scores_rank_ai_stories_first():
+    """Test that AI stories score above unrelated ones"""
+    scores = RelevanceFilter().score(ENTRIES)
+    
+    assert scores[1] > scores[2] > scores[0]
+    assert scores[0] == 0 and scores[3] == 0
+
+def test_filter_keeps_order_and_reports_drops():
+    """Test that relevant entries are kept in feed order and dropped tokens are counted"""
+    relevance_filter = RelevanceFilter()
+    kept = relevance_filter.filter(ENTRIES)
+    
+    assert kept == [ENTRIES[1], ENTRIES[2]]
+    assert relevance_filter.dropped == [ENTRIES[0], ENTRIES[3]]
+    assert relevance_filter.dropped_tokens > 0
+
+def test_top_k_and_custom_vocabulary():
+    """Test the top-k cutoff and a vocabulary for another topic"""
+    assert RelevanceFilter(top_k=1).filter(ENTRIES) == [ENTRIES[1]]
+    assert RelevanceFilter(vocabulary=['smartphones', 'phones']).filter(ENTRIES) == [ENTRIES[0]]
+    assert RelevanceFilter().filter([]) == []
+
+def test_iter_filter_streams_in_batches():
+    """Test that a stream is filtered batch by batch with the same result"""
+    relevance_filter = RelevanceFilter()
+    kept = list(relevance_filter.iter_filter(iter(ENTRIES), batch_size=3))
+    
+    assert kept == [ENTRIES[1], ENTRIES[2]]
+    assert len(relevance_filter.scores) == 2
+    assert relevance_filter.dropped == [ENTRIES[0], ENTRIES[3]]
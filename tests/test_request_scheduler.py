@@ -0,0 +1,178 @@
+"""
+Testing the rate limit aware request scheduler
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_request_scheduler.py
+import threading
+import time
+import httpx
+import openai
+import pytest
+from src.request_scheduler import RequestScheduler, retry_after
+
+REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+
+def rate_limit_error(headers=None, code=None):
+    """Create a 429 error as raised by the OpenAI client"""
+    response = httpx.Response(429, headers=headers or {}, request=REQUEST)
+    return openai.RateLimitError("Rate limit reached", response=response,
+                                 body={'code': code} if code else None)
+
+def server_error():
+    """Create a 500 error as raised by the OpenAI client"""
+    response = httpx.Response(500, request=REQUEST)
+    return openai.InternalServerError("Server error", response=response, body=None)
+
+def test_results_keep_their_order():
+    """Test that results come back in request order, not completion order"""
+    scheduler = RequestScheduler(max_concurrency=4)
+    requests = [(lambda i=i: time.sleep(0.01 * (4 - i)) or i, 10) for i in range(4)]
+
+    assert scheduler.run(requests) == [0, 1, 2, 3]
+
+def test_concurrency_cap():
+    """Test that never more than max_concurrency requests run at once"""
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.02)
+        with lock:
+            active['now'] -= 1
+
+    scheduler = RequestScheduler(max_concurrency=2, tokens_per_minute=10 ** 6)
+    scheduler.run([(call, 10) for _ in range(6)])
+
+    assert active['max'] == 2
+
+def test_requests_per_minute_gating():
+    """Test that requests beyond the request budget wait for the window"""
+    starts = []
+    scheduler = RequestScheduler(max_concurrency=4, requests_per_minute=2, window=0.2)
+
+    start = time.monotonic()
+    scheduler.run([(lambda: starts.append(time.monotonic() - start), 1) for _ in range(4)])
+
+    assert sorted(starts)[1] < 0.1
+    assert sorted(starts)[2] >= 0.2
+
+def test_tokens_per_minute_gating():
+    """Test that requests beyond the token budget wait, smaller ones fill the gap"""
+    starts = {}
+    scheduler = RequestScheduler(max_concurrency=4, tokens_per_minute=100, window=0.2)
+
+    def request(name, tokens):
+        return (lambda: starts.setdefault(name, time.monotonic() - start), tokens)
+
+    start = time.monotonic()
+    scheduler.run([request('a', 60), request('b', 60), request('c', 30)])
+
+    assert starts['a'] < 0.1
+    assert starts['c'] < 0.1  # 60 + 30 still fits, so c does not wait behind b
+    assert starts['b'] >= 0.2
+
+def test_rate_limit_pauses_all_new_requests():
+    """Test that a 429 with retry-after-ms holds back every request"""
+    starts = {}
+    attempts = []
+    scheduler = RequestScheduler(max_concurrency=2, tokens_per_minute=10 ** 6)
+
+    def limited():
+        attempts.append(time.monotonic() - start)
+        if len(attempts) == 1:
+            raise rate_limit_error({'retry-after-ms': '200'})
+        return 'limited'
+
+    def quick(name):
+        return lambda: starts.setdefault(name, time.monotonic() - start) and name
+
+    start = time.monotonic()
+    results = scheduler.run([(limited, 10), (lambda: time.sleep(0.05) or 'slow', 10), (quick('c'), 10)])
+
+    assert results[0] == 'limited'
+    assert attempts[1] >= 0.2
+    assert starts['c'] >= 0.2
+
+def test_retry_after_header():
+    """Test reading the delay from the retry-after headers"""
+    assert retry_after(rate_limit_error({'retry-after-ms': '1500'})) == 1.5
+    assert retry_after(rate_limit_error({'retry-after': '3'})) == 3.0
+    assert retry_after(rate_limit_error({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'})) is None
+    assert retry_after(ValueError()) is None
+
+def test_retries_are_charged_to_the_budget():
+    """Test that every attempt of a retried request counts as a request"""
+    attempts = []
+    scheduler = RequestScheduler(requests_per_minute=2, backoff=0.001, window=0.3)
+
+    def flaky():
+        attempts.append(time.monotonic() - start)
+        if len(attempts) < 3:
+            raise server_error()
+        return 'ok'
+
+    start = time.monotonic()
+    assert scheduler.run([(flaky, 1)]) == ['ok']
+    # The third attempt has to wait until the first one left the window
+    assert attempts[2] >= 0.3
+
+def test_backoff_gives_up_after_max_retries():
+    """Test that transient errors are retried max_retries times and then raised"""
+    calls = []
+    scheduler = RequestScheduler(max_retries=2, backoff=0.001)
+
+    def failing():
+        calls.append(1)
+        raise server_error()
+
+    with pytest.raises(openai.InternalServerError):
+        scheduler.run([(failing, 1)])
+    assert len(calls) == 3
+
+def test_connection_errors_are_retried():
+    """Test that connection failures get another attempt"""
+    calls = []
+    scheduler = RequestScheduler(backoff=0.001)
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise openai.APIConnectionError(request=REQUEST)
+        return 'ok'
+
+    assert scheduler.run([(flaky, 1)]) == ['ok']
+
+def test_insufficient_quota_is_not_retried():
+    """Test that an exhausted quota fails immediately"""
+    calls = []
+    scheduler = RequestScheduler(backoff=0.001)
+
+    def no_quota():
+        calls.append(1)
+        raise rate_limit_error(code='insufficient_quota')
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.run([(no_quota, 1)])
+    assert len(calls) == 1
+
+def test_first_error_is_raised():
+    """Test that the error of the first failing request is raised and no new requests start"""
+    calls = []
+
+    def fail(message):
+        def call():
+            calls.append(message)
+            raise ValueError(message)
+        return call
+
+    scheduler = RequestScheduler(max_concurrency=1)
+    with pytest.raises(ValueError, match='first'):
+        scheduler.run([(lambda: 'ok', 1), (fail('first'), 1), (fail('second'), 1)])
+    assert calls == ['first']
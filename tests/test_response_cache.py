@@ -0,0 +1,63 @@
+"""
+Testing the cache of OpenAI responses
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_response_cache.py
+import time
+from unittest.mock import patch
+from src.response_cache import ResponseCache, request_key
+
+PARAMS = {
+    'model': 'gpt-4',
+    'messages': [{'role': 'user', 'content': 'Summarize'}],
+    'temperature': 0.7,
+    'max_tokens': 100
+}
+
+def test_request_key():
+    """Test that every parameter is part of the key, but not the key order"""
+    reordered = dict(reversed(list(PARAMS.items())))
+    assert request_key(PARAMS) == request_key(reordered)
+    assert request_key(PARAMS) != request_key(dict(PARAMS, model='gpt-4o'))
+    assert request_key(PARAMS) != request_key(dict(PARAMS, max_tokens=200))
+
+def test_hits_and_misses(tmp_path):
+    """Test that stored responses are found again after reopening"""
+    db_path = str(tmp_path / 'responses.db')
+    cache = ResponseCache(db_path)
+    assert cache.get('a') is None
+    cache.put('a', '# Summary')
+    cache.close()
+    
+    cache = ResponseCache(db_path)
+    assert cache.get('a') == '# Summary'
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_ttl(tmp_path):
+    """Test that expired responses are not returned"""
+    cache = ResponseCache(str(tmp_path / 'responses.db'), ttl=60)
+    with patch('time.time', return_value=time.time() - 120):
+        cache.put('old', 'stale')
+    
+    assert cache.get('old') is None
+
+def test_lru_eviction(tmp_path):
+    """Test that the least recently used responses are evicted first"""
+    cache = ResponseCache(str(tmp_path / 'responses.db'), max_bytes=25)
+    now = time.time()
+    with patch('time.time', return_value=now - 30):
+        cache.put('a', 'x' * 10)
+    with patch('time.time', return_value=now - 20):
+        cache.put('b', 'x' * 10)
+    with patch('time.time', return_value=now - 10):
+        cache.get('a')  # a is now more recent than b
+    cache.put('c', 'x' * 10)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert len(cache) == 2
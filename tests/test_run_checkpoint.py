@@ -0,0 +1,74 @@
+"""
+Testing the run checkpoints
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_run_checkpoint.py
+import os
+import pytest
+from src.run_checkpoint import RunCheckpoint
+
+def test_stage_completes_when_consumed(tmp_path):
+    """Test that a streamed stage only counts as completed once all records passed"""
+    checkpoint = RunCheckpoint(str(tmp_path), 'run1')
+    stream = checkpoint.iter_save('urls', ({'url': f"https://feed{index}.example.com"} for index in range(3)))
+
+    assert next(stream) == {'url': 'https://feed0.example.com'}
+    assert not checkpoint.done('urls')
+    assert len(list(stream)) == 2
+    assert checkpoint.done('urls')
+
+    resumed = RunCheckpoint.resume(str(tmp_path), 'run1')
+    assert resumed.stages() == ['urls']
+    assert [record['url'] for record in resumed.load('urls')][-1] == 'https://feed2.example.com'
+
+def test_finish_writes_unconsumed_records(tmp_path):
+    """Test that finishing a stage a later stage gave up on writes the remaining records"""
+    checkpoint = RunCheckpoint(str(tmp_path), 'run1')
+    stream = checkpoint.iter_save('entries', ({'title': str(index)} for index in range(5)))
+    next(stream)
+
+    assert stream.finish()
+    assert len(list(checkpoint.load('entries'))) == 5
+
+def test_broken_stage_is_not_completed(tmp_path):
+    """Test that a stage whose own input failed is not completed"""
+    def fetch():
+        yield {'title': 'First'}
+        raise ConnectionError("Feed server gone")
+
+    checkpoint = RunCheckpoint(str(tmp_path), 'run1')
+    stream = checkpoint.iter_save('entries', fetch())
+    with pytest.raises(ConnectionError):
+        list(stream)
+
+    assert not stream.finish()
+    assert not checkpoint.done('entries')
+    with pytest.raises(KeyError):
+        checkpoint.load('entries')
+
+def test_resume_and_remove(tmp_path):
+    """Test that resuming an unknown run fails and a removed run is gone"""
+    with pytest.raises(FileNotFoundError):
+        RunCheckpoint.resume(str(tmp_path), 'missing')
+
+    checkpoint = RunCheckpoint(str(tmp_path), 'run1')
+    checkpoint.save('summary', [{'output_file': 'summary.md'}])
+    checkpoint.remove()
+    assert not os.path.exists(checkpoint.path)
+
+def test_save_at_end_keeps_later_changes(tmp_path):
+    """Test that records changed after they were passed on are written with the changes"""
+    checkpoint = RunCheckpoint(str(tmp_path), 'run1')
+    records = [{'title': 'Story'}, {'title': 'Other'}]
+    stream = checkpoint.iter_save_at_end('unique', records)
+
+    first = next(stream)
+    first['sources'] = [{'link': 'https://a.example.com'}, {'link': 'https://b.example.com'}]
+    assert not checkpoint.done('unique')
+    assert len(list(stream)) == 1
+
+    assert list(checkpoint.load('unique'))[0]['sources'][1] == {'link': 'https://b.example.com'}
@@ -0,0 +1,56 @@
+"""
+Testing the index of already seen entries
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_seen_index.py
+import time
+from unittest.mock import patch
+from src.seen_index import SeenIndex, canonical_link, entry_key
+
+def test_canonical_link():
+    """Test that tracking parameters, fragments and case do not change the key"""
+    assert canonical_link("HTTPS://Example.com/Story/?utm_source=rss&id=3#comments") == \
+        "https://example.com/Story?id=3"
+    assert canonical_link("https://example.com/") == "https://example.com/"
+    assert canonical_link("") == ''
+
+def test_entry_key_prefers_guid():
+    """Test that the GUID is used when the feed provides one"""
+    assert entry_key({'id': 'guid-1', 'link': 'https://example.com/a'}) == 'guid-1'
+    assert entry_key({'link': 'https://example.com/a/'}) == 'https://example.com/a'
+
+def test_entry_key_without_guid_or_link():
+    """Test that entries without GUID and link are told apart by title and date"""
+    first = entry_key({'title': 'First', 'published': 'Wed, 20 Nov 2024 11:00:00 GMT', 'description': 'Long'})
+    
+    assert first.startswith('sha1:')
+    assert first == entry_key({'title': 'First', 'published': 'Wed, 20 Nov 2024 11:00:00 GMT', 'link': ''})
+    assert first != entry_key({'title': 'Second', 'published': 'Wed, 20 Nov 2024 11:00:00 GMT'})
+
+def test_mark_and_lookup(tmp_path):
+    """Test that marked keys are found again after reopening the index"""
+    db_path = str(tmp_path / 'seen.db')
+    index = SeenIndex(db_path)
+    index.mark_seen(['a', 'b', ''])
+    index.close()
+    
+    index = SeenIndex(db_path)
+    assert index.is_seen('a')
+    assert not index.is_seen('c')
+    assert index.seen_keys(['a', 'c']) == {'a'}
+    assert len(index) == 2
+
+def test_retention(tmp_path):
+    """Test that keys older than the retention period are pruned"""
+    index = SeenIndex(str(tmp_path / 'seen.db'), retention_days=1)
+    with patch('time.time', return_value=time.time() - 2 * 24 * 3600):
+        index.mark_seen(['old'])
+    index.mark_seen(['new'])
+    
+    assert index.prune() == 1
+    assert not index.is_seen('old')
+    assert index.is_seen('new')
@@ -0,0 +1,75 @@
+"""
+Testing the serializers of the prompt payload
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_serializers.py
+import json
+from src.serializers import to_json, to_minified_json, to_tsv, replace_links, restore_links, LinkRestorer
+
+ENTRIES = [
+    {'title': 'First', 'description': 'Line one\nline\ttwo', 'published': 'Today',
+     'link': 'https://a.com/1', 'feed_title': 'A Very Long Feed Title'},
+    {'title': 'Second', 'description': 'Text', 'published': 'Today',
+     'link': 'https://b.com/2', 'feed_title': 'Other Feed'},
+    {'title': 'Third', 'description': 'More', 'published': 'Today',
+     'link': 'https://a.com/3', 'feed_title': 'A Very Long Feed Title'}
+]
+
+def test_json_formats_are_equivalent():
+    """Test that minified JSON holds the same data in fewer characters"""
+    assert json.loads(to_minified_json(ENTRIES)) == json.loads(to_json(ENTRIES))
+    assert len(to_minified_json(ENTRIES)) < len(to_json(ENTRIES))
+
+def test_tsv_deduplicates_feed_titles():
+    """Test that feed titles are written once and rows stay on one line"""
+    tsv = to_tsv(ENTRIES)
+    lines = tsv.split('\n')
+    
+    assert tsv.count('A Very Long Feed Title') == 1
+    assert lines[:3] == ['feed_id\tfeed_title', 'F1\tA Very Long Feed Title', 'F2\tOther Feed']
+    assert lines[4] == 'feed_id\ttitle\tdescription\tpublished\tlink'
+    assert lines[5] == 'F1\tFirst\tLine one line two\tToday\thttps://a.com/1'
+    assert len(lines) == 8
+
+def test_replace_and_restore_links():
+    """Test that links become ids and are restored in the response"""
+    compact, links = replace_links(ENTRIES)
+    
+    assert 'link' not in compact[0] and compact[2]['id'] == 2
+    assert 'link' in ENTRIES[0]  # The original entries are untouched
+    assert restore_links("[Third](entry:2) and [x](entry:9)", links) == \
+        "[Third](https://a.com/3) and [x](entry:9)"
+
+def test_link_restorer_handles_split_references():
+    """Test that references split across chunks are restored"""
+    class Output:
+        text = ''
+        def write(self, text):
+            self.text += text
+        def reset(self):
+            self.text = ''
+        def flush(self):
+            pass
+    
+    output = Output()
+    restorer = LinkRestorer(output, {12: 'https://a.com/12'})
+    for chunk in ["See [A](en", "try:1", "2) and the", " end"]:
+        restorer.write(chunk)
+    restorer.flush()
+    
+    assert output.text == "See [A](https://a.com/12) and the end"
+
+def test_merged_sources_get_link_ids():
+    """Test that the links of merged duplicates are replaced and restored as well"""
+    entry = dict(ENTRIES[0], sources=[{'feed_title': 'A', 'link': 'https://a.com/1'},
+                                      {'feed_title': 'B', 'link': 'https://b.com/9'}])
+    compact, links = replace_links([entry, ENTRIES[1]])
+    
+    assert compact[0]['sources'] == [{'feed_title': 'A', 'id': 0}, {'feed_title': 'B', 'id': 1}]
+    assert compact[1]['id'] == 2
+    assert links == {0: 'https://a.com/1', 1: 'https://b.com/9', 2: 'https://b.com/2'}
+    assert 'sources' in to_tsv(compact).split('\n')[4]
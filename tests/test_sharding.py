@@ -0,0 +1,107 @@
+"""
+Testing the sharded fetch and merge
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_sharding.py
+import os
+from collections import Counter
+import pytest
+from src import sharding
+from src.sharding import (shard_of, shard_urls, write_shard, find_shards, read_shards, commit_shards,
+                          cache_path, run_shard)
+
+URLS = [f"https://feeds{index}.example.com/rss" for index in range(1000)]
+
+def test_shards_are_stable_and_balanced():
+    """Test that a feed always lands in the same shard and shards get similar shares"""
+    assert [shard_of(url, 8) for url in URLS] == [shard_of(url, 8) for url in URLS]
+    assert shard_of('HTTPS://Feeds1.example.com/rss/', 8) == shard_of(URLS[1], 8)
+
+    counts = Counter(shard_of(url, 8) for url in URLS)
+    assert sorted(counts) == list(range(8))
+    assert max(counts.values()) < 2 * min(counts.values())
+
+    shares = [set(shard_urls(URLS, shard, 8)) for shard in range(8)]
+    assert set().union(*shares) == set(URLS)
+    assert sum(len(share) for share in shares) == len(URLS)
+
+def test_roundtrip_and_completeness(tmp_path):
+    """Test that the merge reads what workers wrote, only once all shards exist"""
+    directory = str(tmp_path)
+    write_shard([('a1', {'title': 'Ä'}), ('a2', {'title': 'B'})], directory, 0, 2)
+
+    with pytest.raises(ValueError):
+        find_shards(directory)
+
+    write_shard([], directory, 1, 2)
+    shards, paths = find_shards(directory)
+    assert shards == 2
+    assert list(read_shards(paths)) == [('a1', {'title': 'Ä'}), ('a2', {'title': 'B'})]
+
+def test_mixed_splits_are_rejected(tmp_path):
+    """Test that leftovers of a run with a different number of shards are noticed"""
+    write_shard([], str(tmp_path), 0, 1)
+    write_shard([], str(tmp_path), 0, 2)
+    with pytest.raises(ValueError):
+        find_shards(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        find_shards(str(tmp_path / 'missing'))
+
+class FakeReader:
+    """Feed reader returning one entry per feed"""
+
+    created = []
+
+    def __init__(self, urls, verbose=False, cache=None, **options):
+        self.urls = urls
+        self.cache = cache
+        self.options = options
+        FakeReader.created.append(self)
+        self.new_keys = []
+        self.feed_stats = {}
+
+    def iter_entries(self):
+        for url in self.urls:
+            self.cache.update(url, '"etag"', None, 100, 0.1)
+            self.new_keys.append(f"{url}#1")
+            self.feed_stats[url] = {'keys': [f"{url}#1"], 'not_modified': False}
+            yield {'title': url}
+
+    def close(self):
+        pass
+
+def test_worker_cache_waits_for_the_merge(tmp_path, monkeypatch):
+    """Test that a worker writes its share and its feed cache only becomes current after the merge"""
+    monkeypatch.setattr(sharding, 'FeedReader', FakeReader)
+    sources_file = tmp_path / 'news_sources.txt'
+    sources_file.write_text('\n'.join(URLS[:20]))
+    directory = str(tmp_path / 'shards')
+
+    for shard in range(2):
+        run_shard(str(sources_file), shard, 2, directory)
+
+    _, paths = find_shards(directory)
+    keyed_entries = list(read_shards(paths))
+    assert sorted(entry['title'] for _, entry in keyed_entries) == sorted(URLS[:20])
+    assert all(key == f"{entry['title']}#1" for key, entry in keyed_entries)
+    assert not os.path.exists(cache_path(directory, 0, 2))
+
+    commit_shards(directory, 2)
+    assert os.path.exists(cache_path(directory, 0, 2))
+    assert not os.path.exists(cache_path(directory, 0, 2, pending=True))
+    with pytest.raises(FileNotFoundError):
+        find_shards(directory)
+
+def test_worker_passes_fetch_options(tmp_path, monkeypatch):
+    """Test that the byte cap and streaming parse reach the reader of a worker"""
+    monkeypatch.setattr(sharding, 'FeedReader', FakeReader)
+    sources_file = tmp_path / 'news_sources.txt'
+    sources_file.write_text('\n'.join(URLS[:4]))
+
+    run_shard(str(sources_file), 0, 1, str(tmp_path / 'shards'), max_bytes=1024, stream_parse=True)
+
+    assert FakeReader.created[-1].options == {'max_bytes': 1024, 'stream_parse': True}
@@ -0,0 +1,76 @@
+"""
+Testing the streaming feed parser
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_stream_parser.py
+import time
+import feedparser
+from src.stream_parser import FeedStreamParser
+
+TODAY = time.strftime('%a, %d %b %Y 12:00:00 +0000', time.gmtime())
+OLD = 'Mon, 01 Jan 2024 12:00:00 +0000'
+
+def in_window(entry):
+    return entry.get('published') == TODAY
+
+def rss(dates):
+    items = ''.join(f"<item><title>Story {index}</title><link>https://example.com/{index}</link>"
+                    f"<guid>id-{index}</guid><pubDate>{date}</pubDate>"
+                    f"<content:encoded><![CDATA[<p>Full text {index}</p>]]></content:encoded></item>"
+                    for index, date in enumerate(dates))
+    return (f"<?xml version='1.0'?><rss version='2.0' xmlns:content='http://purl.org/rss/1.0/modules/content/'>"
+            f"<channel><title>News</title>{items}</channel></rss>").encode('utf-8')
+
+def parse(document, chunk_size=64, **kwargs):
+    parser = FeedStreamParser(in_window, **kwargs)
+    for start in range(0, len(document), chunk_size):
+        parser.feed(document[start:start + chunk_size])
+    parser.close()
+    return parser
+
+def test_entries_match_feedparser():
+    """Test that RSS and Atom entries get the fields feedparser gives them"""
+    atom = ("<?xml version='1.0'?><feed xmlns='http://www.w3.org/2005/Atom'><title>Atom News</title>"
+            "<entry><title type='html'>A &amp;amp; B</title><id>urn:1</id>"
+            "<link rel='self' href='https://example.com/self'/><link href='https://example.com/1'/>"
+            "<published>2024-06-01T23:30:00-02:00</published><updated>2024-06-02T00:00:00Z</updated>"
+            "<summary>Short</summary><content>Long</content></entry></feed>").encode('utf-8')
+
+    for document in (rss([TODAY]), atom):
+        expected = feedparser.parse(document)
+        parser = FeedStreamParser(lambda entry: True)
+        parser.feed(document)
+        parser.close()
+        entry = parser.entries[0]
+
+        assert parser.feed_title == expected.feed.title
+        for field in ('title', 'link', 'id', 'published', 'description', 'published_parsed'):
+            assert getattr(entry, field) == expected.entries[0][field]
+
+def test_stops_at_older_entries():
+    """Test that a feed sorted newest first is only read until several entries are older"""
+    parser = parse(rss([TODAY, TODAY] + [OLD] * 10), stop_after=3)
+
+    assert parser.finished
+    assert [entry['title'] for entry in parser.entries] == ['Story 0', 'Story 1']
+    assert parser.total == 5
+
+def test_unsorted_feed_is_read_to_the_end():
+    """Test that older entries before newer ones, like pinned posts, do not stop reading"""
+    parser = parse(rss([OLD] * 3 + [TODAY] + [OLD] * 3), stop_after=5)
+
+    assert not parser.finished
+    assert parser.total == 7
+    assert [entry['id'] for entry in parser.entries] == ['id-3']
+
+def test_malformed_document_sets_error():
+    """Test that a document that is not well-formed XML is reported, not raised"""
+    parser = parse(b"<html><body>Not a feed &nbsp;</body></html>")
+
+    assert parser.error is not None
+    assert parser.done
+    assert parser.entries == []
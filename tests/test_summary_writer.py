@@ -0,0 +1,51 @@
+"""
+Testing the incremental summary writer
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_summary_writer.py
+import os
+import pytest
+from src.summary_writer import SummaryWriter
+
+def test_text_is_readable_while_written(tmp_path):
+    """Test that chunks reach the partial file before the summary is complete"""
+    writer = SummaryWriter(str(tmp_path / 'summaries'))
+    writer.write("# AI News")
+    
+    with open(writer.partial_file) as f:
+        assert f.read() == "# AI News"
+    assert not os.path.exists(writer.output_file)
+    
+    output_file = writer.commit("# AI News\nDone")
+    
+    assert output_file == writer.output_file
+    assert not os.path.exists(writer.partial_file)
+    with open(output_file) as f:
+        assert f.read() == "# AI News\nDone"
+
+def test_reset_discards_written_text(tmp_path):
+    """Test that a retried request does not duplicate the text"""
+    writer = SummaryWriter(str(tmp_path))
+    writer.write("first attempt")
+    writer.reset()
+    writer.write("second")
+    writer.flush()
+    
+    with open(writer.partial_file) as f:
+        assert f.read() == "second"
+    writer.abort()
+
+def test_failure_keeps_partial_file(tmp_path):
+    """Test that a crash leaves the partial summary behind"""
+    with pytest.raises(RuntimeError):
+        with SummaryWriter(str(tmp_path)) as writer:
+            writer.write("# AI News\nHalf")
+            raise RuntimeError("API timeout")
+    
+    assert not os.path.exists(writer.output_file)
+    with open(writer.partial_file) as f:
+        assert f.read() == "# AI News\nHalf"
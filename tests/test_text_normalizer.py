@@ -0,0 +1,53 @@
+"""
+Testing the text normalization of feed entries
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_text_normalizer.py
+from unittest.mock import patch
+from src.text_normalizer import TextNormalizer, clean_text
+
+def test_clean_text_strips_markup_and_boilerplate():
+    """Test that tags, entities, whitespace and boilerplate are removed"""
+    raw = ('<p><img src="https://example.com/pixel.gif" width="1">OpenAI &amp; Microsoft\n\n  announce '
+           '<a href="#">a&nbsp;deal</a>.</p><script>track();</script>'
+           '<p>The post <a href="#">Big deal</a> appeared first on Example News.</p>')
+    
+    assert clean_text(raw) == "OpenAI & Microsoft announce a deal ."
+    assert clean_text("Some text [&#8230;]") == "Some text"
+    assert clean_text("Summary. Continue reading on the website") == "Summary."
+    assert clean_text("Summary. Read more →") == "Summary."
+    assert clean_text(None) == ""
+
+def test_clean_text_keeps_prose_mentioning_read_more():
+    """Test that "read more" inside ordinary sentences is not taken for a link text"""
+    text = "Users read more news on phones than ever. Models summarize it for them."
+    
+    assert clean_text(text) == text
+    assert clean_text("Read more about the model in the paper. It is open source.") == \
+        "Read more about the model in the paper. It is open source."
+
+def test_truncation_prefers_sentence_boundaries():
+    """Test that long text is cut after a sentence, or else after a word"""
+    normalizer = TextNormalizer(max_tokens=10)
+    
+    with patch.object(normalizer.token_counter, 'count', side_effect=lambda text: len(text.split())):
+        assert normalizer.truncate("One two three four five six seven. Eight nine ten eleven twelve.") == \
+            "One two three four five six seven."
+        assert normalizer.truncate("One. Two three four five six seven eight nine ten eleven") == \
+            "One. Two three four five six seven eight nine ten"
+        assert normalizer.truncate("Short text.") == "Short text."
+
+def test_normalize_is_memoized():
+    """Test that unchanged texts are not processed again"""
+    normalizer = TextNormalizer()
+    
+    with patch('src.text_normalizer.clean_text', wraps=clean_text) as clean:
+        first = normalizer.normalize("<b>Same</b> entry")
+        second = normalizer.normalize("<b>Same</b> entry")
+    
+    assert first == second == "Same entry"
+    assert clean.call_count == 1
@@ -0,0 +1,32 @@
+"""
+Testing the token counter
+
+Author: Oliver Schwarz
+Version: 1.0
+Contributor: claude.ai
+License: MIT
+"""
+# tests/test_token_counter.py
+from src.token_counter import TokenCounter, context_window, CHARS_PER_TOKEN
+
+def test_context_window():
+    """Test known and unknown models"""
+    assert context_window('gpt-4') == 8192
+    assert context_window('gpt-4o') == 128000
+    assert context_window('some-new-model') == 8192
+
+def test_count_without_tokenizer():
+    """Test the character based estimate when no tokenizer is available"""
+    counter = TokenCounter('gpt-4')
+    counter.encoding = None
+    
+    assert counter.count('') == 0
+    assert counter.count('a' * CHARS_PER_TOKEN) == 1
+    assert counter.count('a' * (CHARS_PER_TOKEN + 1)) == 2
+
+def test_count_messages_adds_overhead():
+    """Test that every message costs more than its content"""
+    counter = TokenCounter('gpt-4')
+    messages = [{'role': 'user', 'content': 'hello world'}]
+    
+    assert counter.count_messages(messages) > counter.count('hello world')
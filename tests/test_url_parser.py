@@ -83,4 +83,14 @@ http://another-valid.com/rss
     
     parser = URLFileParser(str(source_file), verbose=True)
     urls = parser.parse()
-    assert len(urls) == 2
\ No newline at end of file
+    assert len(urls) == 2
+
+def test_iter_urls_is_lazy(tmp_path):
+    """Test that URLs are yielded while the file is read"""
+    sources = tmp_path / 'sources.txt'
+    sources.write_text("https://example.com/feed\n# comment\nnot a url\nhttps://example.org/rss\n")
+    
+    urls = URLFileParser(str(sources)).iter_urls()
+    
+    assert next(urls) == "https://example.com/feed"
+    assert list(urls) == ["https://example.org/rss"]